@@ -0,0 +1,89 @@
+# agendador.py
+# Tick do Alter Ego com um único líder por implantação.
+#
+# Cada worker do gunicorn pode agendar o tick, mas só o processo que segura o
+# lock de arquivo (flock) executa. Se o líder morrer o sistema operacional
+# solta o lock e outro worker assume no próximo intervalo.
+#
+# Também dá para rodar o tick num processo separado e desligar nos workers:
+#   DUAL_YOU_AGENDADOR=0 gunicorn app:app
+#   python -m agendador
+
+import os
+import time
+import metricas
+
+try:
+    import fcntl
+except ImportError:  # Windows (desenvolvimento): processo único, sem eleição
+    fcntl = None
+
+INTERVALO_PADRAO = 15  # segundos
+
+class Lider:
+    """Eleição de líder por lock exclusivo num arquivo"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = None
+
+    def sou_lider(self):
+        """Tenta virar líder (não bloqueia). Depois de eleito, continua líder até morrer"""
+        if self._arquivo is not None or fcntl is None:
+            return True
+        os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+        arquivo = open(self.caminho, 'a+')
+        try:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            arquivo.close()
+            return False
+        arquivo.seek(0)
+        arquivo.truncate()
+        arquivo.write(str(os.getpid()))
+        arquivo.flush()
+        self._arquivo = arquivo
+        return True
+
+def tick_do_lider(lider, tarefa, app):
+    """Envolve a tarefa para que só o líder a execute (no contexto do app, com duração e erros em metricas)"""
+    def tick():
+        if not lider.sou_lider():
+            return
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            with app.app_context():
+                tarefa()
+        except Exception:
+            erro = True
+            raise  # o APScheduler registra o traceback
+        finally:
+            metricas.registrar_tick(tarefa.__name__, time.perf_counter() - inicio, erro)
+    return tick
+
+def iniciar(app, tarefa, segundos=INTERVALO_PADRAO, bloqueante=False, extras=()):
+    """Agenda a tarefa a cada `segundos`, executando só no processo líder
+
+    extras: outras tarefas [(tarefa, segundos)] com o mesmo líder.
+    As tarefas rodam dentro de app.app_context().
+    """
+    # Importado só aqui: quem não liga o scheduler (scripts, import do app) não paga por ele
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.schedulers.blocking import BlockingScheduler
+
+    lider = Lider(app.config['AGENDADOR_LOCK_PATH'])
+    scheduler = BlockingScheduler() if bloqueante else BackgroundScheduler()
+    for funcao, intervalo in [(tarefa, segundos), *extras]:
+        scheduler.add_job(func=tick_do_lider(lider, funcao, app), trigger="interval",
+                          seconds=intervalo, max_instances=1, coalesce=True)
+    scheduler.start()
+    return scheduler
+
+if __name__ == '__main__':
+    # Importar o app não liga o scheduler: o único deste processo é o de baixo
+    from app import app, atualizar_alter_ego, varrer_uploads
+    from uploads import INTERVALO_VARREDURA
+
+    print(f"⏱️  Agendador do Alter Ego rodando (a cada {INTERVALO_PADRAO}s, pid {os.getpid()})")
+    iniciar(app, atualizar_alter_ego, bloqueante=True, extras=[(varrer_uploads, INTERVALO_VARREDURA)])
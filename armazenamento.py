@@ -0,0 +1,71 @@
+# armazenamento.py
+# Perfil do banco de dados: qual banco usar e como conectar.
+#
+# Padrão: SQLite em instance/dual_you.db, ajustado para vários processos
+# (workers do gunicorn + scheduler) escrevendo ao mesmo tempo:
+#   - WAL: leitores não bloqueiam o escritor nem o escritor os leitores
+#   - synchronous=NORMAL: seguro com WAL e bem menos fsync por commit
+#   - busy_timeout: quem encontra o banco travado espera em vez de falhar
+#   - mmap_size / cache_size: leituras servidas da memória
+#
+# Postgres: DATABASE_URL=postgresql://... (precisa do driver: pip install psycopg2-binary)
+# Pool: DUAL_YOU_POOL_SIZE, DUAL_YOU_POOL_OVERFLOW, DUAL_YOU_POOL_RECYCLE (segundos)
+
+import os
+from sqlalchemy import event
+
+URL_PADRAO = 'sqlite:///dual_you.db'
+
+# PRAGMAs aplicados em cada conexão SQLite nova
+PRAGMAS_SQLITE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('DUAL_YOU_SQLITE_BUSY_MS', 10000)),
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32000,  # negativo = KiB (~32 MB por conexão)
+    'temp_store': 'MEMORY',
+}
+
+def url_do_banco():
+    """URL do banco: DATABASE_URL se existir (postgres:// vira postgresql://), senão SQLite"""
+    url = os.environ.get('DATABASE_URL', URL_PADRAO)
+    if url.startswith('postgres://'):
+        # Formato antigo que alguns provedores ainda usam; o SQLAlchemy 2 não aceita
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def _inteiro_do_ambiente(nome, padrao):
+    valor = os.environ.get(nome)
+    return int(valor) if valor else padrao
+
+def opcoes_engine(url):
+    """SQLALCHEMY_ENGINE_OPTIONS para a URL (pool configurável pelo ambiente)"""
+    opcoes = {
+        'pool_size': _inteiro_do_ambiente('DUAL_YOU_POOL_SIZE', 5),
+        'max_overflow': _inteiro_do_ambiente('DUAL_YOU_POOL_OVERFLOW', 10),
+        'pool_recycle': _inteiro_do_ambiente('DUAL_YOU_POOL_RECYCLE', 1800),
+    }
+    if url.startswith('sqlite'):
+        if ':memory:' in url or url.rstrip('/') == 'sqlite:':
+            return {}  # banco em memória: o SQLAlchemy usa uma conexão só
+        # A conexão pode ser usada pela thread do scheduler e pelas das requisições
+        opcoes['connect_args'] = {'check_same_thread': False}
+    else:
+        # Conexões derrubadas pelo servidor são detectadas antes do uso
+        opcoes['pool_pre_ping'] = True
+    return opcoes
+
+def aplicar_pragmas(conexao_dbapi, registro_conexao=None):
+    """Listener de 'connect': ajusta cada conexão SQLite nova"""
+    cursor = conexao_dbapi.cursor()
+    try:
+        for nome, valor in PRAGMAS_SQLITE.items():
+            cursor.execute(f"PRAGMA {nome}={valor}")
+    finally:
+        cursor.close()
+
+def init_app(app, db):
+    """Liga os PRAGMAs nas engines SQLite do app (chamar depois de db.init_app)"""
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', aplicar_pragmas)
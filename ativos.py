@@ -0,0 +1,190 @@
+# ativos.py
+# Arquivos estáticos com impressão digital (hash do conteúdo) na URL.
+#
+# Nos templates, {{ ativo('manifest.json') }} vira /static/manifest.json?v=<hash>.
+# Quando o ?v= bate com o conteúdo atual a resposta é imutável e fica um
+# ano no cache do navegador; sem ?v= (ou com um hash velho) o navegador
+# revalida pelo ETag e recebe 304 se nada mudou. Mudou o arquivo, muda a
+# URL: não existe versão para atualizar à mão.
+# O service worker (/sw.js) é gerado com a lista destes URLs (lista_precache).
+#
+# CSS e JS saem em pacotes (PACOTES): os arquivos são juntados, minificados
+# e comprimidos (gzip/brotli) uma vez, em memória, e servidos em /pacotes/.
+
+import os
+import re
+import glob
+import hashlib
+from collections import namedtuple
+from flask import current_app, request, url_for, send_file, abort, Response
+import compressao
+
+UM_ANO = 365 * 24 * 3600
+
+# Arquivos da raiz do projeto servidos por rotas próprias (fora de /static)
+ARQUIVOS_RAIZ = {'alter.png': 'alter_image', 'background.jpg': 'background_image'}
+
+# Pacotes servidos em /pacotes/<nome>: arquivos (globs relativos a /static) em ordem
+PACOTES = {
+    'app.css': ['style.css', 'css/*.css'],
+    'app.js': ['script.js'],
+}
+TIPOS_PACOTE = {'.css': 'text/css', '.js': 'application/javascript'}
+
+# Guardados pelo caminho + mtime + tamanho: só recalcula se o arquivo mudar
+_impressoes = {}
+
+def impressao(caminho):
+    """Hash curto do conteúdo do arquivo (None se não existe)"""
+    try:
+        info = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    chave = (caminho, info.st_mtime_ns, info.st_size)
+    if chave not in _impressoes:
+        resumo = hashlib.sha256()
+        with open(caminho, 'rb') as arquivo:
+            for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+                resumo.update(bloco)
+        _impressoes[chave] = resumo.hexdigest()[:12]
+    return _impressoes[chave]
+
+# ========== PACOTES (CSS/JS MINIFICADOS) ==========
+
+def minificar_css(texto):
+    """Tira comentários e espaços que não mudam o significado do CSS"""
+    texto = re.sub(r'/\*.*?\*/', '', texto, flags=re.S)
+    texto = re.sub(r'\s+', ' ', texto)
+    texto = re.sub(r'\s*([{};,>])\s*', r'\1', texto)
+    texto = re.sub(r':\s+', ':', texto)
+    return texto.replace(';}', '}').strip()
+
+def minificar_js(texto):
+    """Minificação conservadora: tira indentação, linhas vazias e linhas só de comentário.
+
+    Mantém as quebras de linha (o JS depende delas sem ponto e vírgula).
+    Template strings de várias linhas perdem a indentação: só vale para CSS (cssText).
+    """
+    linhas = (linha.strip() for linha in texto.splitlines())
+    return '\n'.join(linha for linha in linhas if linha and not linha.startswith('//'))
+
+MINIFICADORES = {'.css': minificar_css, '.js': minificar_js}
+
+# conteudo: bytes minificados; variantes: {'br'|'gzip': bytes comprimidos}
+Pacote = namedtuple('Pacote', 'conteudo versao variantes mimetype')
+
+# nome -> (assinatura dos arquivos, Pacote): refaz só se algum arquivo mudar
+_pacotes = {}
+
+def arquivos_do_pacote(nome):
+    arquivos = []
+    for padrao in PACOTES[nome]:
+        for caminho in sorted(glob.glob(os.path.join(current_app.static_folder, padrao))):
+            if caminho not in arquivos:
+                arquivos.append(caminho)
+    return arquivos
+
+def obter_pacote(nome):
+    """Pacote pronto (junta, minifica e comprime na primeira vez ou se mudou)"""
+    arquivos = arquivos_do_pacote(nome)
+    assinatura = tuple((caminho, os.stat(caminho).st_mtime_ns, os.stat(caminho).st_size)
+                       for caminho in arquivos)
+    guardado = _pacotes.get(nome)
+    if guardado and guardado[0] == assinatura:
+        return guardado[1]
+
+    extensao = os.path.splitext(nome)[1]
+    partes = []
+    for caminho in arquivos:
+        with open(caminho, encoding='utf-8') as arquivo:
+            partes.append(arquivo.read())
+    conteudo = MINIFICADORES[extensao]('\n'.join(partes)).encode('utf-8')
+    pacote = Pacote(conteudo=conteudo,
+                    versao=hashlib.sha256(conteudo).hexdigest()[:12],
+                    variantes=compressao.variantes(conteudo),
+                    mimetype=TIPOS_PACOTE[extensao])
+    _pacotes[nome] = (assinatura, pacote)
+    return pacote
+
+def enviar_pacote(nome):
+    """Resposta de /pacotes/<nome> com a variante comprimida que o navegador aceita"""
+    if nome not in PACOTES:
+        abort(404)
+    pacote = obter_pacote(nome)
+    codificacao = compressao.escolher_codificacao(pacote.variantes)
+    if pacote.versao in request.if_none_match:
+        resposta = Response(status=304)
+    else:
+        resposta = Response(pacote.variantes.get(codificacao, pacote.conteudo), mimetype=pacote.mimetype)
+        if codificacao:
+            resposta.headers['Content-Encoding'] = codificacao
+    resposta.vary.add('Accept-Encoding')
+    resposta.set_etag(compressao.etag_codificado(pacote.versao, codificacao))
+    return aplicar_cache(resposta, nome)
+
+# ========== ARQUIVOS ==========
+
+def versao_ativo(nome):
+    """Hash do conteúdo do pacote ou do arquivo (None se não existe)"""
+    if nome in PACOTES:
+        return obter_pacote(nome).versao
+    return impressao(caminho_ativo(nome))
+
+def existe(nome):
+    return nome in PACOTES or os.path.exists(caminho_ativo(nome))
+
+def caminho_ativo(nome):
+    if nome in ARQUIVOS_RAIZ:
+        return os.path.join(current_app.root_path, nome)
+    return os.path.join(current_app.static_folder, nome)
+
+def url_ativo(nome):
+    """URL com ?v=<hash> do arquivo (usado nos templates como ativo('...'))"""
+    if nome in PACOTES:
+        endpoint, argumentos = 'pacote', {'nome': nome}
+    elif nome in ARQUIVOS_RAIZ:
+        endpoint, argumentos = ARQUIVOS_RAIZ[nome], {}
+    else:
+        endpoint, argumentos = 'static', {'filename': nome}
+    versao = versao_ativo(nome)
+    if versao:
+        argumentos['v'] = versao
+    return url_for(endpoint, **argumentos)
+
+def aplicar_cache(resposta, nome):
+    """Imutável se a URL tem o hash atual; senão o navegador revalida (ETag/304)"""
+    versao = request.args.get('v')
+    if versao and versao == versao_ativo(nome):
+        resposta.headers['Cache-Control'] = f'public, max-age={UM_ANO}, immutable'
+    else:
+        resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
+
+def enviar_raiz(nome, mimetype):
+    """Envia um arquivo de ARQUIVOS_RAIZ com ETag/304 e cache (None se não existe)"""
+    caminho = caminho_ativo(nome)
+    if not os.path.exists(caminho):
+        return None
+    resposta = send_file(caminho, mimetype=mimetype, conditional=True, etag=True)
+    return aplicar_cache(resposta, nome)
+
+def lista_precache():
+    """URLs que o service worker baixa na instalação (só arquivos que existem)
+
+    Só URLs com hash do conteúdo: páginas (como '/') são de cada usuário e
+    nunca entram no cache do service worker.
+    """
+    nomes = list(PACOTES) + ['manifest.json']
+    nomes += sorted(os.path.relpath(p, current_app.static_folder)
+                    for p in glob.glob(os.path.join(current_app.static_folder, 'icons', '*.png')))
+    nomes += list(ARQUIVOS_RAIZ)
+    return [url_ativo(nome) for nome in nomes if existe(nome)]
+
+def init_app(app):
+    app.jinja_env.globals['ativo'] = url_ativo
+
+    @app.after_request
+    def cache_dos_estaticos(resposta):
+        if request.endpoint == 'static' and resposta.status_code in (200, 304):
+            aplicar_cache(resposta, request.view_args['filename'])
+        return resposta
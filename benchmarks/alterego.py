@@ -0,0 +1,171 @@
+# benchmarks/alterego.py
+# Manter o Alter Ego atualizado em N abas: poll de 3 s x poll condicional (304) x SSE.
+#
+# Sobe o app num servidor HTTP de verdade e, durante `segundos`, deixa N abas
+# abertas do mesmo usuário enquanto o tick do agendador roda a cada 15 s.
+# Três formas de acompanhar o estado:
+#   poll de 3 s (antes)   GET /api/alterego sem ETag, remontando o estado a
+#                         cada pedido (o que o endpoint fazia antes do cache)
+#   poll condicional      GET /api/alterego com If-None-Match: 304 até o tick
+#   SSE                   uma conexão /api/alterego/stream por aba
+# Para cada uma: requisições/s que o servidor atende e consultas ao banco
+# por aba e minuto (as do tick ficam de fora: são as mesmas nas três).
+# No fim mede a capacidade: quantas respostas 200 remontadas e quantas 304
+# o servidor entrega por segundo com 8 clientes martelando.
+#
+#   python benchmarks/alterego.py [abas] [segundos]
+
+import sys
+import time
+import random
+import threading
+import http.client
+from datetime import date
+
+from comum import app_temporario, servidor_http
+
+from sqlalchemy import event
+from database import db
+from models import Tarefa, USUARIO_PADRAO
+import app as rotas
+import historias
+import tarefas
+
+INTERVALO_POLL = 3
+INTERVALO_TICK = 15
+CLIENTES_CAPACIDADE = 8
+SEGUNDOS_CAPACIDADE = 3
+
+class Contador:
+    """Consultas ao banco feitas pelo servidor (menos as da thread do tick)"""
+
+    def __init__(self):
+        self.total = 0
+        self.ignorar = set()
+        self._trava = threading.Lock()
+
+    def __call__(self, *argumentos):
+        if threading.get_ident() not in self.ignorar:
+            with self._trava:
+                self.total += 1
+
+def pedir(porta, caminho, etag=None):
+    conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=30)
+    conexao.request('GET', caminho, headers={'If-None-Match': etag} if etag else {})
+    resposta = conexao.getresponse()
+    resposta.read()
+    conexao.close()
+    assert resposta.status in (200, 304), resposta.status
+    return resposta.status, resposta.getheader('ETag') or etag
+
+def aba_que_pergunta(porta, fim, condicional, respostas):
+    time.sleep(random.uniform(0, INTERVALO_POLL))  # as abas não abrem todas no mesmo instante
+    etag = None
+    while time.monotonic() < fim:
+        status, novo = pedir(porta, '/api/alterego?coordenadas=relativas', etag if condicional else None)
+        etag = novo
+        respostas.append(status)
+        time.sleep(INTERVALO_POLL)
+
+def aba_com_stream(porta, respostas):
+    conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+    conexao.request('GET', '/api/alterego/stream?coordenadas=relativas')
+    resposta = conexao.getresponse()
+    respostas.append(resposta.status)
+    for linha in resposta:  # o servidor fecha depois de ALTER_STREAM_DURACAO
+        if linha.startswith(b'data:'):
+            respostas.append('evento')
+    conexao.close()
+
+def agendador(app, fim, contador):
+    contador.ignorar.add(threading.get_ident())
+    with app.app_context():
+        while time.monotonic() < fim:
+            time.sleep(min(INTERVALO_TICK, max(0, fim - time.monotonic())))
+            rotas.atualizar_alter_ego()
+            db.session.remove()
+
+def rodada(app, porta, abas, segundos, modo, contador):
+    """(requisições, consultas, eventos SSE, respostas 304) de `abas` abas durante `segundos`"""
+    rotas._estados_alter.clear()
+    contador.total = 0
+    respostas = []
+    fim = time.monotonic() + segundos
+    if modo == 'sse':
+        threads = [threading.Thread(target=aba_com_stream, args=(porta, respostas)) for _ in range(abas)]
+    else:
+        threads = [threading.Thread(target=aba_que_pergunta, args=(porta, fim, modo == 'condicional', respostas))
+                   for _ in range(abas)]
+    threads.append(threading.Thread(target=agendador, args=(app, fim, contador)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    eventos = respostas.count('evento')
+    return len(respostas) - eventos, contador.total, eventos, respostas.count(304)
+
+def capacidade(porta, etag):
+    """Respostas por segundo com CLIENTES_CAPACIDADE clientes seguidos"""
+    atendidas = []
+    fim = time.monotonic() + SEGUNDOS_CAPACIDADE
+
+    def martelar():
+        while time.monotonic() < fim:
+            pedir(porta, '/api/alterego?coordenadas=relativas', etag)
+            atendidas.append(1)
+
+    threads = [threading.Thread(target=martelar) for _ in range(CLIENTES_CAPACIDADE)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(atendidas) / SEGUNDOS_CAPACIDADE
+
+if __name__ == '__main__':
+    abas = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    segundos = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+
+    with app_temporario(ALTER_STREAM_DURACAO=segundos) as app:
+        historias.carregar_pacote()
+        hoje = tarefas.DIAS_SEMANA[date.today().weekday()]
+        db.session.add_all([Tarefa(descricao=f'tarefa {i}', dia_semana=hoje) for i in range(5)])
+        db.session.commit()
+        rotas.alter_do_usuario(USUARIO_PADRAO)
+        tarefas.materializar_dia(USUARIO_PADRAO, date.today(), hoje, '1')
+        db.session.commit()
+        db.session.remove()
+
+        contador = Contador()
+        event.listen(db.engine, 'before_cursor_execute', contador)
+        minutos = segundos / 60
+        print(f"🧪 {abas} abas do mesmo usuário por {segundos} s, tick a cada {INTERVALO_TICK} s")
+
+        resultados = {}
+        with servidor_http(app) as porta:
+            maximo_original = rotas.MAXIMO_ESTADOS_ALTER
+            rotas.MAXIMO_ESTADOS_ALTER = 0  # sem estado guardado: cada pedido vai ao banco
+            resultados['poll de 3 s (antes)'] = rodada(app, porta, abas, segundos, 'antes', contador)
+            rotas.MAXIMO_ESTADOS_ALTER = maximo_original
+            resultados['poll condicional'] = rodada(app, porta, abas, segundos, 'condicional', contador)
+            resultados['SSE'] = rodada(app, porta, abas, segundos, 'sse', contador)
+
+            for rotulo, (requisicoes, consultas, eventos, nao_mudou) in resultados.items():
+                extra = f"{eventos} eventos" if rotulo == 'SSE' else f"{nao_mudou / requisicoes:4.0%} 304"
+                print(f"   {rotulo:<20} {requisicoes / segundos:6.2f} req/s   "
+                      f"{consultas / abas / minutos:6.2f} consultas por aba-minuto   {extra}")
+
+            rotas.MAXIMO_ESTADOS_ALTER = 0
+            remontando = capacidade(porta, None)
+            rotas.MAXIMO_ESTADOS_ALTER = maximo_original
+            _, etag = pedir(porta, '/api/alterego?coordenadas=relativas')
+            condicional = capacidade(porta, etag)
+            print(f"   capacidade com {CLIENTES_CAPACIDADE} clientes: {remontando:,.0f} respostas/s remontando, "
+                  f"{condicional:,.0f} respostas/s com 304")
+        event.remove(db.engine, 'before_cursor_execute', contador)
+
+    antes = resultados['poll de 3 s (antes)'][1]
+    ok = resultados['poll condicional'][1] < antes and resultados['SSE'][1] < antes
+    print(f"{'✅' if ok else '❌'} consultas por aba-minuto: {antes / abas / minutos:.1f} no poll antigo, "
+          f"{resultados['poll condicional'][1] / abas / minutos:.2f} no condicional, "
+          f"{resultados['SSE'][1] / abas / minutos:.2f} no SSE")
+    sys.exit(0 if ok else 1)
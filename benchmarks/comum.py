@@ -0,0 +1,105 @@
+# benchmarks/comum.py
+# O que todos os benchmarks usam: um app completo sobre um banco descartável.
+#
+# Os benchmarks rodam da pasta do projeto, cada um é um script:
+#   python benchmarks/usuarios.py
+# Nenhum toca no dual_you.db de verdade nem em static/uploads.
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import make_server, WSGIServer, WSGIRequestHandler
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from database import db
+import carimbos
+import migracoes
+
+CARIMBOS = ('ALTER_VERSAO_PATH', 'HISTORIAS_VERSAO_PATH', 'PLANO_VERSAO_PATH', 'CONFIG_VERSAO_PATH')
+
+@contextmanager
+def pasta_temporaria(prefixo='dual_you_bench_'):
+    pasta = tempfile.mkdtemp(prefix=prefixo)
+    try:
+        yield pasta
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+def config_temporaria(pasta, **extras):
+    """Banco, carimbos, lock do agendador e uploads dentro de `pasta`"""
+    os.makedirs(pasta, exist_ok=True)
+    config = {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(pasta, 'dual_you.db')}",
+        'AGENDADOR_LOCK_PATH': os.path.join(pasta, 'agendador.lock'),
+        'UPLOAD_FOLDER': os.path.join(pasta, 'static', 'uploads'),
+        'METRICAS_DIR': None,
+    }
+    config.update({chave: os.path.join(pasta, chave.lower()) for chave in CARIMBOS})
+    config.update(extras)
+    return config
+
+@contextmanager
+def app_temporario(**extras):
+    """App completo (create_app) com o banco migrado e o contexto aberto"""
+    from app import create_app
+    with pasta_temporaria() as pasta:
+        app = create_app(config_temporaria(pasta, **extras))
+        with app.app_context():
+            migracoes.migrar()
+            for chave in CARIMBOS:
+                carimbos.marcar(app.config[chave])
+            try:
+                yield app
+            finally:
+                db.session.remove()
+                db.engine.dispose()
+
+class ServidorComThreads(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+class SemLog(WSGIRequestHandler):
+    def log_message(self, *argumentos):
+        pass
+
+@contextmanager
+def servidor_http(app):
+    """Serve o app numa porta livre (wsgiref com uma thread por conexão) e devolve a porta
+
+    O servidor de desenvolvimento do werkzeug não serve para medir: depois de
+    cada resposta ele reserva 10 MB para esvaziar o socket.
+    """
+    servidor = make_server('127.0.0.1', 0, app, ServidorComThreads, SemLog)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        yield servidor.server_port
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+def cronometrar(funcao, vezes):
+    """Milissegundos de cada uma das `vezes` chamadas"""
+    tempos = []
+    for _ in range(vezes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+def consultas_da_resposta(resposta):
+    """Consultas SQL da requisição (cabeçalho Server-Timing do perfilador)"""
+    for valor in resposta.headers.getlist('Server-Timing'):
+        if valor.startswith('db;'):
+            return int(valor.split('desc="')[1].split()[0])
+    return None
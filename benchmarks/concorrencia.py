@@ -0,0 +1,202 @@
+# benchmarks/concorrencia.py
+# Leitores, escritores e o agendador no mesmo SQLite, em processos separados.
+#
+# Como no gunicorn: cada papel é um processo (fork) com as suas conexões.
+#   leitores    GET /api/planejamento, /api/estatisticas e /diario sem parar
+#   escritores  POST /concluir_tarefa e /adicionar_momento sem parar
+#   agendador   o tick do Alter Ego (todos os avatares numa transação) a cada segundo
+# Roda duas vezes, cada uma num banco novo: sem ajuste (journal DELETE,
+# synchronous FULL, só o timeout de 5 s do pysqlite) e com o perfil de
+# armazenamento.py (WAL, synchronous NORMAL, busy_timeout, mmap, cache).
+# Para cada papel: operações, mediana, p99, esperas por lock e erros
+# "database is locked".
+#
+# Para contar as esperas, o busy handler do SQLite é trocado por um igual em
+# Python (busy_timeout=0 na conexão; o cursor tenta de novo com o mesmo
+# recuo de 1, 2, 5, 10... ms até o mesmo limite): cada operação que precisou
+# esperar pelo lock conta uma vez, com os milissegundos esperados.
+#
+#   python benchmarks/concorrencia.py [segundos] [leitores] [escritores]
+
+import sys
+import time
+import sqlite3
+import multiprocessing
+from datetime import date, timedelta
+
+from comum import app_temporario, percentil
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from database import db
+from models import AlterEgo, Usuario, Tarefa, TarefaDia, USUARIO_PADRAO
+import armazenamento
+import app as rotas
+import historias
+import tarefas
+
+AVATARES = 500
+TAREFAS = 200
+DIAS = 30                  # ocorrências pendentes: TAREFAS x DIAS para os escritores concluírem
+INTERVALO_AGENDADOR = 1.0  # segundos (15 s em produção: aqui acelerado para forçar disputa)
+RECUO_MS = (1, 2, 5, 10, 15, 20, 25, 25, 25, 50, 50, 100)  # o mesmo do sqliteDefaultBusyCallback
+LEITURAS = ('/api/planejamento', '/api/estatisticas', '/diario')
+SEM_AJUSTE = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+TIMEOUT_PYSQLITE = 5.0     # segundos: o que o sqlite3 do Python espera quando ninguém configura
+
+# ========== BUSY HANDLER QUE CONTA ==========
+
+esperas = {'limite': TIMEOUT_PYSQLITE, 'ms': 0.0}  # por processo
+
+def esperando_o_lock(funcao):
+    """Chama funcao() de novo enquanto o banco estiver travado, como o busy handler do SQLite"""
+    inicio, tentativa = None, 0
+    while True:
+        try:
+            resultado = funcao()
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            inicio = inicio or time.perf_counter()
+            if time.perf_counter() - inicio >= esperas['limite']:
+                raise
+            time.sleep(RECUO_MS[min(tentativa, len(RECUO_MS) - 1)] / 1000)
+            tentativa += 1
+            continue
+        if inicio:
+            esperas['ms'] += (time.perf_counter() - inicio) * 1000
+        return resultado
+
+class CursorQueEspera(sqlite3.Cursor):
+    def execute(self, *argumentos):
+        return esperando_o_lock(lambda: sqlite3.Cursor.execute(self, *argumentos))
+
+    def executemany(self, *argumentos):
+        return esperando_o_lock(lambda: sqlite3.Cursor.executemany(self, *argumentos))
+
+class ConexaoQueEspera(sqlite3.Connection):
+    def cursor(self, factory=CursorQueEspera):
+        return super().cursor(factory)
+
+    def commit(self):
+        return esperando_o_lock(lambda: sqlite3.Connection.commit(self))
+
+def opcoes_com_espera_contada():
+    opcoes = armazenamento.opcoes_engine(armazenamento.URL_PADRAO)
+    opcoes['connect_args'].update(factory=ConexaoQueEspera, timeout=0)
+    return opcoes
+
+def semear():
+    historias.carregar_pacote()
+    hoje = date.today()
+    dia = tarefas.DIAS_SEMANA[hoje.weekday()]
+    with db.engine.begin() as conexao:
+        conexao.execute(insert(Usuario.__table__), [{'id': i, 'nome': f'usuario{i}'}
+                                                    for i in range(2, AVATARES + 1)])
+        conexao.execute(insert(AlterEgo.__table__), [{'usuario_id': i} for i in range(1, AVATARES + 1)])
+        conexao.execute(insert(Tarefa.__table__), [{'id': i, 'usuario_id': USUARIO_PADRAO,
+                                                    'descricao': f'tarefa {i}', 'dia_semana': dia}
+                                                   for i in range(1, TAREFAS + 1)])
+        conexao.execute(insert(TarefaDia.__table__), [{'usuario_id': USUARIO_PADRAO, 'tarefa_id': t,
+                                                       'data': hoje - timedelta(days=d), 'concluida': False}
+                                                      for d in range(DIAS) for t in range(1, TAREFAS + 1)])
+
+def medir(papel, operacao):
+    """(papel, ms, ms esperando o lock, 'ok' | 'travado')"""
+    esperado = esperas['ms']
+    inicio = time.perf_counter()
+    try:
+        operacao()
+        resultado = 'ok'
+    except OperationalError as e:
+        if 'locked' not in str(e):
+            raise
+        db.session.rollback()
+        resultado = 'travado'
+    return papel, (time.perf_counter() - inicio) * 1000, esperas['ms'] - esperado, resultado
+
+def trabalhar(app, papel, numero, total_do_papel, fim, fila):
+    db.session.remove()
+    db.engine.dispose(close=False)  # conexões do pai não atravessam o fork
+    cliente = app.test_client()
+    medidas = []
+    if papel == 'leitor':
+        i = numero
+        while time.time() < fim:
+            medidas.append(medir(papel, lambda: cliente.get(LEITURAS[i % len(LEITURAS)])))
+            i += 1
+    elif papel == 'escritor':
+        # Cada escritor conclui a sua fatia das ocorrências pendentes e registra momentos
+        pendente = numero + 1
+        while time.time() < fim:
+            medidas.append(medir(papel, lambda: cliente.post(f'/concluir_tarefa/{pendente}')))
+            medidas.append(medir(papel, lambda: cliente.post('/adicionar_momento', data={
+                'titulo': 'Obrigado', 'descricao': 'pelo dia', 'tipo': 'gratidao'})))
+            pendente += total_do_papel
+    else:
+        with app.app_context():
+            while time.time() < fim:
+                medidas.append(medir(papel, rotas.atualizar_alter_ego))
+                db.session.remove()
+                time.sleep(INTERVALO_AGENDADOR)
+    fila.put(medidas)
+
+def rodada(pragmas, segundos, leitores, escritores):
+    """{papel: [(ms, ms esperando, resultado)]} de uma rodada num banco novo com esses PRAGMAs"""
+    # O limite de espera é o do perfil; quem espera é o handler acima
+    esperas['limite'] = pragmas.get('busy_timeout', TIMEOUT_PYSQLITE * 1000) / 1000
+    armazenamento.PRAGMAS_SQLITE = dict(pragmas, busy_timeout=0)
+    with app_temporario(PROPAGATE_EXCEPTIONS=True, SQLALCHEMY_ENGINE_OPTIONS=opcoes_com_espera_contada()) as app:
+        semear()
+        db.session.remove()
+        db.engine.dispose()
+        contexto = multiprocessing.get_context('fork')
+        fila = contexto.Queue()
+        fim = time.time() + segundos
+        papeis = ([('leitor', i, leitores) for i in range(leitores)]
+                  + [('escritor', i, escritores) for i in range(escritores)] + [('agendador', 0, 1)])
+        processos = [contexto.Process(target=trabalhar, args=(app, papel, numero, total, fim, fila))
+                     for papel, numero, total in papeis]
+        for processo in processos:
+            processo.start()
+        medidas = [medida for _ in processos for medida in fila.get(timeout=segundos + 120)]
+        for processo in processos:
+            processo.join(30)
+    por_papel = {}
+    for papel, *medida in medidas:
+        por_papel.setdefault(papel, []).append(medida)
+    return por_papel
+
+if __name__ == '__main__':
+    segundos = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    leitores = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    escritores = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    print(f"🧪 {leitores} leitores, {escritores} escritores e o agendador por {segundos} s "
+          f"({AVATARES} avatares, tick a cada {INTERVALO_AGENDADOR:.0f} s)")
+    perfil = armazenamento.PRAGMAS_SQLITE
+    resultados = {}
+    for rotulo, pragmas in (('sem ajuste', SEM_AJUSTE), ('perfil armazenamento', perfil)):
+        resultados[rotulo] = rodada(pragmas, segundos, leitores, escritores)
+        print(f"   {rotulo} ({', '.join(f'{k}={v}' for k, v in pragmas.items())})")
+        for papel in ('leitor', 'escritor', 'agendador'):
+            medidas = resultados[rotulo].get(papel, [])
+            tempos = [ms for ms, _, _ in medidas] or [0]
+            esperaram = [espera for _, espera, _ in medidas if espera]
+            travados = sum(1 for _, _, resultado in medidas if resultado == 'travado')
+            print(f"      {papel:<10} {len(medidas):6} operações   mediana {percentil(tempos, 50):7.1f} ms"
+                  f"   p99 {percentil(tempos, 99):8.1f} ms   {len(esperaram):5} esperas por lock "
+                  f"({sum(esperaram):7.0f} ms)   travados {travados}")
+    armazenamento.PRAGMAS_SQLITE = perfil
+
+    def p99(rotulo, papel):
+        return percentil([ms for ms, _, _ in resultados[rotulo][papel]], 99)
+
+    def travados(rotulo):
+        return sum(1 for medidas in resultados[rotulo].values() for _, _, resultado in medidas if resultado == 'travado')
+
+    ok = travados('perfil armazenamento') == 0 and p99('perfil armazenamento', 'leitor') <= p99('sem ajuste', 'leitor')
+    print(f"{'✅' if ok else '❌'} p99 dos leitores {p99('sem ajuste', 'leitor'):.0f} ms -> "
+          f"{p99('perfil armazenamento', 'leitor'):.0f} ms, travados {travados('sem ajuste')} -> "
+          f"{travados('perfil armazenamento')}")
+    sys.exit(0 if ok else 1)
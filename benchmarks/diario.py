@@ -0,0 +1,196 @@
+# benchmarks/diario.py
+# Peso e tempo de renderização de um diário com 500 fotos.
+#
+# Cada conquista ganha uma foto própria do tamanho das que já estão em
+# static/uploads (~500 KB, 1600x1200). O diário é percorrido inteiro como
+# quem rola a página (/diario e depois /api/diario?cursor=...), e para cada
+# <picture> escolhe o que um navegador baixaria: o primeiro <source> de
+# formato suportado e, no srcset, a menor largura que cobre o card (400 px
+# em tela 1x). A comparação é com o que as páginas baixavam antes: a
+# original em todos os cards.
+# As miniaturas são geradas como no upload (gerar_miniaturas, fora da
+# requisição); o tempo por foto sai no relatório.
+#
+#   python benchmarks/diario.py [fotos]
+
+import os
+import sys
+import time
+import hashlib
+from io import BytesIO
+from datetime import date, timedelta
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from comum import RAIZ, app_temporario, percentil, consultas_da_resposta
+
+from sqlalchemy import insert
+from database import db
+from models import Tarefa, Conquista, USUARIO_PADRAO
+import uploads
+
+LARGURA_FOTO, ALTURA_FOTO = 1600, 1200
+LARGURA_CARD = 400            # px do card no diário (sizes="... 400px"), tela 1x
+LIMITE_PESO = 0.1             # peso do diário com miniaturas / peso com as originais
+VOLTAS = 5                    # vezes que o diário é percorrido para medir (mais uma para aquecer)
+
+class Imagens(HTMLParser):
+    """O que o navegador baixaria de cada <picture> (e de cada <img> solta)"""
+
+    def __init__(self, largura):
+        super().__init__()
+        self.largura = largura
+        self.escolhidas, self.originais = [], []
+        self._fontes = None
+
+    def handle_starttag(self, tag, atributos):
+        atributos = dict(atributos)
+        if tag == 'picture':
+            self._fontes = []
+        elif tag == 'source' and self._fontes is not None:
+            self._fontes.append(atributos['srcset'])
+        elif tag == 'img' and '/uploads/' in atributos.get('src', ''):
+            self.originais.append(atributos['src'])
+            self.escolhidas.append(self.escolher(self._fontes) or atributos['src'])
+
+    def handle_endtag(self, tag):
+        if tag == 'picture':
+            self._fontes = None
+
+    def escolher(self, fontes):
+        if not fontes:
+            return None
+        candidatas = sorted((int(largura.rstrip('w')), url)
+                            for url, largura in (item.split() for item in fontes[0].split(', ')))
+        return next((url for largura, url in candidatas if largura >= self.largura), candidatas[-1][1])
+
+def foto(numero):
+    """JPEG ~500 KB: gradiente com ruído, diferente a cada número (nada de dedup)"""
+    rng = np.random.default_rng(numero)
+    y, x = np.mgrid[0:ALTURA_FOTO, 0:LARGURA_FOTO]
+    base = np.stack([x * 255 / LARGURA_FOTO, y * 255 / ALTURA_FOTO, np.full(x.shape, numero % 255)], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    saida = BytesIO()
+    Image.fromarray(pixels).save(saida, format='JPEG', quality=85)
+    return saida.getvalue()
+
+def semear(app, total):
+    """`total` conquistas, cada uma com a sua foto gravada pelo sha256 (como guardar_foto)"""
+    tarefa = Tarefa(descricao='Lavar louça', dia_semana='Segunda-feira')
+    db.session.add(tarefa)
+    db.session.commit()
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    def gravar(numero):
+        conteudo = foto(numero)
+        nome = f"{hashlib.sha256(conteudo).hexdigest()}.jpg"
+        with open(os.path.join(app.config['UPLOAD_FOLDER'], nome), 'wb') as f:
+            f.write(conteudo)
+        return f"uploads/{nome}"
+
+    with ThreadPoolExecutor(os.cpu_count()) as pool:
+        fotos = list(pool.map(gravar, range(total)))
+    hoje = date.today()
+    with db.engine.begin() as conexao:
+        conexao.execute(insert(Conquista.__table__), [
+            {'usuario_id': USUARIO_PADRAO, 'tarefa_id': tarefa.id, 'data': hoje - timedelta(days=i),
+             'sentimento': 'Orgulho', 'descricao': f'Dia {i}', 'foto': caminho}
+            for i, caminho in enumerate(fotos)])
+    return fotos
+
+def static_temporario(app):
+    """static/ do app numa pasta temporária: os arquivos do projeto + uploads/ do benchmark"""
+    pasta = os.path.dirname(app.config['UPLOAD_FOLDER'])
+    projeto = os.path.join(RAIZ, 'static')
+    for nome in os.listdir(projeto):
+        if nome != 'uploads':
+            os.symlink(os.path.join(projeto, nome), os.path.join(pasta, nome))
+    app.static_folder = pasta
+
+def percorrer(cliente):
+    """(corpos HTML das páginas, [ms por página], consultas, bytes de HTML) do diário inteiro"""
+    corpos, tempos, consultas, html = [], [], 0, 0
+    url = '/diario'
+    while url:
+        inicio = time.perf_counter()
+        resposta = cliente.get(url)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        assert resposta.status_code == 200, resposta.status_code
+        consultas += consultas_da_resposta(resposta) or 0
+        html += len(resposta.get_data())
+        if resposta.is_json:
+            dados = resposta.get_json()
+            corpos.append(dados['html'])
+            url = dados['proxima']
+        else:
+            corpos.append(resposta.get_data(as_text=True))
+            url = proxima_da_pagina(corpos[-1])
+    return corpos, tempos, consultas, html
+
+def medir(app, cliente):
+    """(páginas, [ms por página], consultas, bytes de HTML, bytes de imagem baixados, fotos)"""
+    percorrer(cliente)  # aquece (templates, grafo, caches de arquivos)
+    tempos = []
+    for _ in range(VOLTAS):
+        corpos, tempos_volta, consultas, html = percorrer(cliente)
+        tempos += tempos_volta
+    leitor = Imagens(LARGURA_CARD)
+    for corpo in corpos:
+        leitor.feed(corpo)
+
+    def tamanho(url):
+        return os.path.getsize(os.path.join(app.static_folder, urlsplit(url).path[len('/static/'):]))
+
+    return len(corpos), tempos, consultas, html, sum(map(tamanho, leitor.escolhidas)), len(leitor.originais)
+
+def proxima_da_pagina(corpo):
+    """URL da API que a rolagem infinita pede depois da primeira página (data-proxima)"""
+    if 'data-proxima="' not in corpo:
+        return None
+    return corpo.split('data-proxima="', 1)[1].split('"', 1)[0].replace('&amp;', '&')
+
+def cronometrar_miniatura(pasta_static, foto):
+    """ms para gerar as miniaturas de uma foto (o trabalho do pool depois do upload)"""
+    inicio = time.perf_counter()
+    uploads.gerar_miniaturas(pasta_static, foto)
+    return (time.perf_counter() - inicio) * 1000
+
+if __name__ == '__main__':
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    with app_temporario(PERFILADOR=True) as app:
+        static_temporario(app)
+        inicio = time.perf_counter()
+        fotos = semear(app, total)
+        originais = sum(os.path.getsize(os.path.join(app.static_folder, f)) for f in fotos)
+        print(f"🧪 {total} conquistas com foto, {originais / total / 1024:.0f} KB por original "
+              f"({time.perf_counter() - inicio:.1f} s para semear)")
+        cliente = app.test_client()
+
+        sem = medir(app, cliente)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(os.cpu_count()) as pool:
+            tempos_miniatura = list(pool.map(lambda f: cronometrar_miniatura(app.static_folder, f), fotos))
+        duracao = time.perf_counter() - inicio
+        print(f"   miniaturas ({', '.join(uploads.formatos_suportados())} em {uploads.LARGURAS}): "
+              f"mediana {percentil(tempos_miniatura, 50):.0f} ms por foto no pool, {duracao:.1f} s para todas")
+
+        com = medir(app, cliente)
+
+        for rotulo, (paginas, tempos, consultas, html, baixado, cards) in (('só originais', sem), ('com miniaturas', com)):
+            print(f"   {rotulo:<15} {paginas} páginas, {cards} fotos   renderização mediana {percentil(tempos, 50):6.1f} ms"
+                  f"   p95 {percentil(tempos, 95):6.1f} ms   {consultas} consultas   "
+                  f"HTML {html / 1024:6.0f} KB   imagens {baixado / 1024 / 1024:7.1f} MB")
+
+        primeira = com[1][0]
+        razao = com[4] / sem[4]
+        lentidao = percentil(com[1], 50) / percentil(sem[1], 50)
+        ok = razao <= LIMITE_PESO and com[5] == total
+        print(f"{'✅' if ok else '❌'} diário inteiro: {sem[4] / 1024 / 1024:.1f} MB -> {com[4] / 1024 / 1024:.1f} MB "
+              f"({razao:.1%}); renderizar com srcset custa {lentidao:.2f}x (primeira página em {primeira:.1f} ms)")
+        sys.exit(0 if ok else 1)
@@ -0,0 +1,117 @@
+# benchmarks/exportacao.py
+# Vazão do `flask dual-you export/import` com um histórico sintético.
+#
+# Gera `linhas` TarefaDia (1 milhão por padrão) num banco temporário,
+# exporta e importa em dois destinos:
+#   - banco vazio: os IDs do arquivo estão livres e são mantidos
+#   - banco com outro usuário ocupando os mesmos IDs (e o mesmo ID de
+#     usuário): tudo é remapeado para depois dos IDs existentes
+# e confere que nos dois casos os dados chegaram inteiros.
+# --memoria mede o pico de memória do Python (tracemalloc, deixa tudo mais lento).
+#
+#   python benchmarks/exportacao.py [linhas] [--memoria]
+
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from comum import pasta_temporaria, config_temporaria
+
+from sqlalchemy import insert, select, func
+from database import db
+from fabrica import contexto_cli
+from models import Usuario, Tarefa, TarefaDia
+from exportacao import exportar, importar, LOTE
+import historias
+import migracoes
+
+TAREFAS_POR_DIA = 20
+USUARIO = 2  # o dono do histórico (o padrão, 1, fica vazio)
+
+def semear(usuario_id, nome, linhas):
+    """Usuário com TAREFAS_POR_DIA tarefas e `linhas` TarefaDia, gravados em lotes"""
+    with db.engine.begin() as conexao:
+        conexao.execute(insert(Usuario.__table__), [{'id': usuario_id, 'nome': nome}])
+        primeira_tarefa = (conexao.execute(select(func.max(Tarefa.id))).scalar() or 0) + 1
+        conexao.execute(insert(Tarefa.__table__), [
+            {'id': primeira_tarefa + i, 'usuario_id': usuario_id, 'descricao': f"Tarefa {i + 1}",
+             'dia_semana': 'Segunda-feira'} for i in range(TAREFAS_POR_DIA)])
+    dias = -(-linhas // TAREFAS_POR_DIA)
+    primeiro_dia = date.today() - timedelta(days=dias)
+    lote = []
+    for i in range(linhas):
+        lote.append({'usuario_id': usuario_id, 'data': primeiro_dia + timedelta(days=i // TAREFAS_POR_DIA),
+                     'tarefa_id': primeira_tarefa + i % TAREFAS_POR_DIA, 'concluida': i % 3 == 0})
+        if len(lote) == LOTE or i == linhas - 1:
+            with db.engine.begin() as conexao:
+                conexao.execute(insert(TarefaDia.__table__), lote)
+            lote = []
+
+def contagem(nome):
+    """(tarefas, ocorrências, ocorrências apontando para tarefa de outro usuário) do usuário `nome`"""
+    usuario_id = db.session.execute(select(Usuario.id).where(Usuario.nome == nome)).scalar()
+    tarefas = db.session.execute(select(func.count()).where(Tarefa.usuario_id == usuario_id)).scalar()
+    ocorrencias = db.session.execute(select(func.count()).where(TarefaDia.usuario_id == usuario_id)).scalar()
+    cruzadas = db.session.execute(
+        select(func.count()).select_from(TarefaDia).join(Tarefa, Tarefa.id == TarefaDia.tarefa_id)
+        .where(TarefaDia.usuario_id == usuario_id, Tarefa.usuario_id != usuario_id)).scalar()
+    return tarefas, ocorrencias, cruzadas
+
+if __name__ == '__main__':
+    argumentos = [argumento for argumento in sys.argv[1:] if argumento != '--memoria']
+    linhas = int(argumentos[0]) if argumentos else 1_000_000
+    medir_memoria = '--memoria' in sys.argv
+
+    def medir(funcao, *argumentos):
+        """(resultado, segundos, pico de memória do Python em MB ou None)"""
+        if medir_memoria:
+            # Só o heap do Python: o RSS cresce com o cache e o mmap do SQLite, que têm limite próprio
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        resultado = funcao(*argumentos)
+        duracao = time.perf_counter() - inicio
+        pico = None
+        if medir_memoria:
+            pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+        return resultado, duracao, pico
+
+    def relatar(rotulo, resumo, duracao, pico, extra=''):
+        total = sum(resumo['tabelas'].values())
+        memoria = f", pico de memória {pico:.1f} MB" if pico is not None else ''
+        print(f"{rotulo}: {total:,} registros em {duracao:.1f} s ({total / duracao:,.0f}/s){extra}{memoria}")
+
+    falhas = []
+    with pasta_temporaria() as pasta:
+        arquivo = os.path.join(pasta, 'exportacao.tar.gz')
+        with contexto_cli(config_temporaria(os.path.join(pasta, 'origem'))):
+            migracoes.migrar()
+            historias.carregar_pacote()
+            print(f"🧪 Gerando {linhas:,} TarefaDia sintéticas ({TAREFAS_POR_DIA} tarefas por dia)...")
+            semear(USUARIO, 'bia', linhas)
+            esperado = contagem('bia')
+            resumo, duracao, pico = medir(exportar, arquivo, USUARIO)
+            relatar("📦 Exportação", resumo, duracao, pico,
+                    f", arquivo de {os.path.getsize(arquivo) / 1024 / 1024:.1f} MB")
+
+        for destino, ocupar in (('vazio', False), ('ocupado', True)):
+            with contexto_cli(config_temporaria(os.path.join(pasta, destino))):
+                migracoes.migrar()
+                if ocupar:
+                    # Outro usuário com o mesmo ID e os mesmos IDs de tarefas e ocorrências
+                    semear(USUARIO, 'davi', linhas)
+                    antes = contagem('davi')
+                relatar(f"📥 Importação ({destino})", *medir(importar, arquivo))
+                chegou = contagem('bia')
+                if chegou != esperado:
+                    falhas.append(f"{destino}: bia tinha {esperado}, chegou {chegou}")
+                if ocupar and contagem('davi') != antes:
+                    falhas.append(f"{destino}: os dados de davi mudaram")
+
+    for falha in falhas:
+        print(f"❌ {falha}")
+    if not falhas:
+        print("✅ Dados conferidos nos dois destinos")
+    sys.exit(1 if falhas else 0)
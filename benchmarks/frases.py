@@ -0,0 +1,71 @@
+# benchmarks/frases.py
+# Sortear a frase motivacional com 100 mil histórias no banco.
+#
+# Compara o baralho em memória (get_frase_motivacional) com o que ele
+# substituiu: ORDER BY RANDOM() no capítulo motivacional a cada chamada.
+# As frases usam {tarefa} e {contador}, então o baralho ainda faz as
+# consultas da tarefa pendente e do contador (o custo que sobra).
+#
+#   python benchmarks/frases.py [historias] [repeticoes]
+
+import sys
+import time
+from datetime import date
+
+from comum import app_temporario, cronometrar, percentil
+
+from sqlalchemy import insert
+from database import db
+from models import Historia, Tarefa, TarefaDia, USUARIO_PADRAO
+import historias
+
+MOTIVACIONAIS = 0.2  # fração das histórias no capítulo motivacional
+FRASES = ('Você não está esquecendo de algo? {tarefa} ainda te espera...',
+          'Já são {contador} tarefas hoje!',
+          'Respira fundo. Uma coisa de cada vez.')
+
+def semear(total):
+    motivacionais = int(total * MOTIVACIONAIS)
+    linhas = [{'capitulo': 'motivacional', 'parte': i + 1, 'frase': FRASES[i % len(FRASES)]}
+              for i in range(motivacionais)]
+    linhas += [{'capitulo': f'capitulo{i // 100}', 'parte': i % 100 + 1, 'frase': f'História {i}.'}
+               for i in range(total - motivacionais)]
+    with db.engine.begin() as conexao:
+        for inicio in range(0, len(linhas), 10_000):
+            conexao.execute(insert(Historia.__table__), linhas[inicio:inicio + 10_000])
+    tarefa = Tarefa(descricao='Lavar louça', dia_semana='Segunda-feira')
+    db.session.add(tarefa)
+    db.session.flush()
+    db.session.add(TarefaDia(data=date.today(), tarefa_id=tarefa.id))
+    db.session.commit()
+
+def order_by_random():
+    """O sorteio de antes: varre e ordena o capítulo inteiro"""
+    return Historia.query.filter_by(capitulo='motivacional').order_by(db.func.random()).first()
+
+if __name__ == '__main__':
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with app_temporario():
+        inicio = time.perf_counter()
+        semear(total)
+        print(f"🧪 {total:,} histórias, {int(total * MOTIVACIONAIS):,} motivacionais "
+              f"({time.perf_counter() - inicio:.1f} s para semear)")
+
+        inicio = time.perf_counter()
+        historias.obter_grafo()
+        print(f"   grafo montado em {(time.perf_counter() - inicio) * 1000:.0f} ms (uma vez por processo)")
+
+        baralho = historias.obter_grafo().baralho('motivacional')
+        resultados = {
+            'baralho (só tirar)': cronometrar(baralho.tirar, repeticoes),
+            'get_frase_motivacional': cronometrar(lambda: historias.get_frase_motivacional(USUARIO_PADRAO), repeticoes),
+            'ORDER BY RANDOM()': cronometrar(order_by_random, max(10, repeticoes // 10)),
+        }
+        for rotulo, tempos in resultados.items():
+            print(f"   {rotulo:<24} mediana {percentil(tempos, 50):8.3f} ms   p95 {percentil(tempos, 95):8.3f} ms")
+
+        ganho = percentil(resultados['ORDER BY RANDOM()'], 50) / percentil(resultados['get_frase_motivacional'], 50)
+        print(f"{'✅' if ganho > 1 else '❌'} get_frase_motivacional {ganho:.0f}x mais rápido que ORDER BY RANDOM()")
+        sys.exit(0 if ganho > 1 else 1)
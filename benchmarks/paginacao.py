@@ -0,0 +1,80 @@
+# benchmarks/paginacao.py
+# Custo de uma página do diário no começo e no fim de um histórico grande.
+#
+# Com o cursor (data, id) a página 1 e a página 3.000 custam o mesmo; com
+# OFFSET (o que a paginação substituiu) o custo cresce com a profundidade.
+# Mede também a rota /api/diario inteira (consultas pelo perfilador).
+#
+#   python benchmarks/paginacao.py [linhas] [repeticoes]
+
+import sys
+import time
+from datetime import date, timedelta
+
+from comum import app_temporario, cronometrar, percentil, consultas_da_resposta
+
+from sqlalchemy import insert
+from database import db
+from models import Tarefa, Conquista, USUARIO_PADRAO
+import paginacao
+
+POR_DIA = 5
+LIMITE_PROFUNDIDADE = 2.0  # página do fundo / primeira página, com cursor
+
+def semear(linhas):
+    with db.engine.begin() as conexao:
+        conexao.execute(insert(Tarefa.__table__), [{'id': 1, 'usuario_id': USUARIO_PADRAO, 'descricao': 'feito',
+                                                    'dia_semana': 'Segunda-feira'}])
+        inicio = date.today() - timedelta(days=linhas // POR_DIA)
+        for lote in range(0, linhas, 10_000):
+            conexao.execute(insert(Conquista.__table__), [
+                {'usuario_id': USUARIO_PADRAO, 'tarefa_id': 1, 'data': inicio + timedelta(days=i // POR_DIA),
+                 'descricao': f'conquista {i}'} for i in range(lote, min(linhas, lote + 10_000))])
+
+def consulta():
+    return Conquista.query.filter_by(usuario_id=USUARIO_PADRAO)
+
+def cursor_na_posicao(posicao):
+    """Cursor que começa a página logo depois do item `posicao` (na ordem do diário)"""
+    item = consulta().order_by(Conquista.data.desc(), Conquista.id.desc()).offset(posicao - 1).first()
+    return paginacao.codificar_cursor(item)
+
+def pagina_offset(posicao):
+    return consulta().order_by(Conquista.data.desc(), Conquista.id.desc()) \
+        .offset(posicao).limit(paginacao.TAMANHO_PAGINA).all()
+
+if __name__ == '__main__':
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    fundo = linhas - paginacao.TAMANHO_PAGINA
+
+    with app_temporario(PERFILADOR=True) as app:
+        inicio = time.perf_counter()
+        semear(linhas)
+        print(f"🧪 {linhas:,} conquistas ({time.perf_counter() - inicio:.1f} s para semear)")
+
+        resultados = {}
+        for rotulo, posicao in (('primeira página', 0), (f'posição {fundo:,}', fundo)):
+            cursor = cursor_na_posicao(posicao) if posicao else None
+            com_cursor = cronometrar(lambda: paginacao.pagina(consulta(), Conquista, cursor), repeticoes)
+            com_offset = cronometrar(lambda: pagina_offset(posicao), repeticoes)
+            resultados[posicao] = percentil(com_cursor, 50)
+            print(f"   {rotulo:<18} cursor: mediana {percentil(com_cursor, 50):6.2f} ms, p95 {percentil(com_cursor, 95):6.2f} ms"
+                  f"   OFFSET: mediana {percentil(com_offset, 50):7.2f} ms")
+
+        cliente = app.test_client()
+        url = f"/api/diario?cursor={cursor_na_posicao(fundo)}"
+        tempos, consultas = [], set()
+
+        def pedir():
+            resposta = cliente.get(url)
+            consultas.add(consultas_da_resposta(resposta))
+
+        pedir()
+        tempos = cronometrar(pedir, repeticoes)
+        print(f"   /api/diario no fundo: mediana {percentil(tempos, 50):.2f} ms, consultas {sorted(consultas)}")
+
+        crescimento = resultados[fundo] / resultados[0]
+        ok = crescimento <= LIMITE_PROFUNDIDADE and consultas == {1}
+        print(f"{'✅' if ok else '❌'} fundo / primeira página com cursor: {crescimento:.2f}x")
+        sys.exit(0 if ok else 1)
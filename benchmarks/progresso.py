@@ -0,0 +1,76 @@
+# benchmarks/progresso.py
+# Latência de avançar a história depois de milhares de avanços.
+#
+# Gera um pacote com `partes` histórias (sem portões de tarefa), carrega e
+# clica no Alter Ego até o fim, medindo cada proxima_fala. Com o cursor e o
+# bitset o custo do avanço 5.000 é o mesmo do primeiro e o registro cresce
+# um bit por história (o CSV antigo crescia ~5 bytes por avanço e era
+# relido inteiro a cada requisição).
+#
+#   python benchmarks/progresso.py [partes]
+
+import os
+import sys
+import json
+import time
+
+from comum import app_temporario, cronometrar, percentil
+
+from database import db
+from models import AlterEgo, USUARIO_PADRAO
+import historias
+
+POR_CAPITULO = 500
+JANELA = 200               # avanços por janela medida
+LIMITE_CRESCIMENTO = 2.0   # mediana da última janela / mediana da primeira
+
+def gerar_pacote(caminho, partes):
+    capitulos = [c for c in historias.ORDEM_CAPITULOS if c != 'motivacional']
+    pacote = {'versao': 1, 'capitulos': []}
+    for numero in range(0, partes, POR_CAPITULO):
+        capitulo = capitulos[numero // POR_CAPITULO % len(capitulos)] + (
+            '' if numero // POR_CAPITULO < len(capitulos) else f'_{numero // POR_CAPITULO}')
+        pacote['capitulos'].append({'capitulo': capitulo, 'historias': [
+            {'parte': parte + 1, 'frase': f'História {numero + parte} do capítulo {capitulo}.'}
+            for parte in range(min(POR_CAPITULO, partes - numero))]})
+    # Algumas frases motivacionais para quando a história acaba
+    pacote['capitulos'].append({'capitulo': 'motivacional', 'historias': [
+        {'parte': 1, 'frase': 'Você consegue.'}]})
+    with open(caminho, 'w') as f:
+        json.dump(pacote, f)
+
+if __name__ == '__main__':
+    partes = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+
+    with app_temporario() as app:
+        caminho = os.path.join(os.path.dirname(app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):]),
+                               'historias.json')
+        gerar_pacote(caminho, partes)
+        historias.carregar_pacote(caminho)
+        alter = AlterEgo(usuario_id=USUARIO_PADRAO, historia_atual='inicio', parte_atual=0)
+        db.session.add(alter)
+        db.session.commit()
+
+        print(f"🧪 {partes:,} histórias, {partes // POR_CAPITULO} capítulos")
+        janelas = []
+        inicio = time.perf_counter()
+        while alter.historia_atual != 'completa':
+            tempos = cronometrar(lambda: historias.proxima_fala(alter), JANELA)
+            janelas.append((percentil(tempos, 50), percentil(tempos, 95)))
+            db.session.expire(alter)  # relê do banco, como uma requisição nova
+        total = time.perf_counter() - inicio
+
+        for numero, (mediana, p95) in enumerate(janelas):
+            if numero in (0, len(janelas) // 2, len(janelas) - 1):
+                print(f"   avanços {numero * JANELA + 1:>6}-{(numero + 1) * JANELA:<6} "
+                      f"mediana {mediana:.3f} ms   p95 {p95:.3f} ms")
+        vistas = historias.total_vistas(alter.historias_vistas)
+        print(f"   {vistas:,} histórias vistas em {len(alter.historias_vistas):,} bytes "
+              f"(CSV equivalente: {len(','.join(str(i % POR_CAPITULO + 1) for i in range(vistas))):,} bytes), "
+              f"{total:.1f} s no total")
+
+        # A última janela termina com falas motivacionais (história completa): fica de fora
+        crescimento = janelas[-2][0] / janelas[0][0]
+        ok = crescimento <= LIMITE_CRESCIMENTO and vistas == partes + 1  # + o capítulo motivacional
+        print(f"{'✅' if ok else '❌'} última janela / primeira: {crescimento:.2f}x")
+        sys.exit(0 if ok else 1)
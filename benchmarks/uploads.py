@@ -0,0 +1,114 @@
+# benchmarks/uploads.py
+# Vazão de uploads de 10 MB em paralelo, num servidor HTTP de verdade.
+#
+# Sobe o app num servidor wsgiref com threads e envia fotos de 10 MB por
+# /registrar_conquista com 1, 4 e 8 clientes ao mesmo tempo. Os corpos saem
+# de arquivos em disco (o cliente não segura nada na memória), então o pico
+# de memória do Python (tracemalloc) é o do servidor: com o upload gravado
+# em blocos direto no temporário ele não depende do tamanho da foto.
+# Na última etapa todos enviam a MESMA foto: tem que sobrar um arquivo só.
+#
+# As fotos são bytes aleatórios, então as miniaturas falham (e avisam).
+#
+#   python benchmarks/uploads.py [mb] [envios_por_cliente]
+
+import os
+import sys
+import time
+import uuid
+import hashlib
+import tracemalloc
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+
+from comum import app_temporario, servidor_http, percentil
+
+from database import db
+from models import Tarefa
+
+CLIENTES = (1, 4, 8)
+LIMITE_MEMORIA = 0.5  # pico de memória / tamanho de UMA foto (com 8 uploads ao mesmo tempo)
+
+def corpo_multipart(pasta, megabytes, conteudo=None):
+    """(caminho do corpo em disco, boundary, sha256 da foto)"""
+    conteudo = conteudo if conteudo is not None else os.urandom(megabytes * 1024 * 1024)
+    boundary = uuid.uuid4().hex
+    caminho = os.path.join(pasta, f'corpo_{boundary}')
+    with open(caminho, 'wb') as f:
+        f.write(f'--{boundary}\r\nContent-Disposition: form-data; name="descricao"\r\n\r\nfeito\r\n'.encode())
+        f.write(f'--{boundary}\r\nContent-Disposition: form-data; name="foto"; filename="foto.jpg"\r\n'
+                f'Content-Type: image/jpeg\r\n\r\n'.encode())
+        f.write(conteudo)
+        f.write(f'\r\n--{boundary}--\r\n'.encode())
+    return caminho, boundary, hashlib.sha256(conteudo).hexdigest()
+
+def enviar(porta, tarefa_id, corpo):
+    caminho, boundary, _ = corpo
+    conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=120)
+    inicio = time.perf_counter()
+    with open(caminho, 'rb') as f:
+        conexao.request('POST', f'/registrar_conquista/{tarefa_id}', body=f, headers={
+            'Content-Type': f'multipart/form-data; boundary={boundary}',
+            'Content-Length': str(os.path.getsize(caminho))})
+    resposta = conexao.getresponse()
+    resposta.read()
+    conexao.close()
+    assert resposta.status == 302, resposta.status
+    return (time.perf_counter() - inicio) * 1000
+
+def etapa(porta, tarefa_id, corpos, clientes):
+    """(segundos, [ms por envio], pico de memória em MB) de todos os corpos com `clientes` em paralelo"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(clientes) as pool:
+        tempos = list(pool.map(lambda corpo: enviar(porta, tarefa_id, corpo), corpos))
+    duracao = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return duracao, tempos, pico
+
+if __name__ == '__main__':
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    por_cliente = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with app_temporario(MAX_CONTENT_LENGTH=(megabytes + 1) * 1024 * 1024) as app:
+        pasta = os.path.dirname(app.config['UPLOAD_FOLDER'])
+        app.static_folder = pasta
+        pasta_uploads = app.config['UPLOAD_FOLDER']
+        tarefa = Tarefa(descricao='Lavar louça', dia_semana='Segunda-feira')
+        db.session.add(tarefa)
+        db.session.commit()
+
+        with servidor_http(app) as porta:
+            print(f"🧪 Fotos de {megabytes} MB, {por_cliente} envios por cliente, servidor na porta {porta}")
+
+            falhas = []
+            for clientes in CLIENTES:
+                corpos = [corpo_multipart(pasta, megabytes) for _ in range(clientes * por_cliente)]
+                duracao, tempos, pico = etapa(porta, tarefa.id, corpos, clientes)
+                total = megabytes * len(corpos)
+                print(f"   {clientes} cliente(s): {total / duracao:6.1f} MB/s   mediana {percentil(tempos, 50):6.0f} ms"
+                      f"   p95 {percentil(tempos, 95):6.0f} ms   pico de memória {pico:5.1f} MB")
+                if pico > megabytes * LIMITE_MEMORIA:
+                    falhas.append(f"{clientes} clientes: pico de {pico:.1f} MB para fotos de {megabytes} MB")
+                for caminho, _, sha in corpos:
+                    os.remove(caminho)
+                    if not os.path.exists(os.path.join(pasta_uploads, f'{sha}.jpg')):
+                        falhas.append(f"foto {sha[:12]} não foi gravada")
+
+            # Todos com a mesma foto ao mesmo tempo
+            conteudo = os.urandom(megabytes * 1024 * 1024)
+            corpos = [corpo_multipart(pasta, megabytes, conteudo) for _ in range(CLIENTES[-1])]
+            antes = len(os.listdir(pasta_uploads))
+            duracao, tempos, pico = etapa(porta, tarefa.id, corpos, CLIENTES[-1])
+            novos = len(os.listdir(pasta_uploads)) - antes
+            print(f"   mesma foto x{len(corpos)}: {megabytes * len(corpos) / duracao:6.1f} MB/s, "
+                  f"{novos} arquivo(s) novo(s) na pasta")
+            if novos != 1:
+                falhas.append(f"mesma foto gravou {novos} arquivos")
+
+    for falha in falhas:
+        print(f"❌ {falha}")
+    if not falhas:
+        print("✅ Memória constante por upload e uma cópia só da foto repetida")
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,110 @@
+# benchmarks/usuarios.py
+# Custo por requisição com 1, 100, 1.000 e 10.000 usuários no mesmo banco.
+#
+# Cada usuário ganha o mesmo volume de dados (tarefas da semana, ocorrências
+# dos últimos dias, conquistas e o Alter Ego). As requisições são sempre do
+# usuário padrão: com tudo filtrado por usuario_id nos índices, o tempo e o
+# número de consultas não devem crescer com o total de usuários. O tick do
+# Alter Ego mexe em todos de uma vez, então o que deve ficar constante nele
+# é o custo por avatar.
+#
+#   python benchmarks/usuarios.py [maximo] [repeticoes]
+
+import sys
+import time
+from datetime import date, timedelta
+
+from comum import app_temporario, cronometrar, percentil, consultas_da_resposta
+
+from sqlalchemy import insert
+from database import db
+from models import Usuario, AlterEgo, Tarefa, TarefaDia, Conquista, USUARIO_PADRAO
+import carimbos
+import simulacao
+import tarefas
+
+ETAPAS = (1, 100, 1_000, 10_000)
+TAREFAS_POR_USUARIO = 5
+DIAS_DE_HISTORICO = 7
+CONQUISTAS_POR_USUARIO = 3
+LIMITE_CRESCIMENTO = 2.0  # mediana na maior etapa / mediana com 1 usuário
+
+ROTAS = ['/', '/api/alterego', '/api/planejamento', '/diario', '/api/estatisticas']
+
+def semear(de, ate, contadores):
+    """Dados dos usuários de `de` até `ate` (ids explícitos: inserção em lote sem reler)"""
+    hoje = date.today()
+    dia = tarefas.DIAS_SEMANA[hoje.weekday()]
+    novos = [i for i in range(de, ate + 1) if i != USUARIO_PADRAO]
+    usuarios, alters, planejadas, ocorrencias, conquistas = [], [], [], [], []
+    for usuario_id in range(de, ate + 1):
+        if usuario_id in novos:
+            usuarios.append({'id': usuario_id, 'nome': f'usuario{usuario_id}'})
+        alters.append({'usuario_id': usuario_id})
+        for _ in range(TAREFAS_POR_USUARIO):
+            contadores['tarefa'] += 1
+            tarefa_id = contadores['tarefa']
+            planejadas.append({'id': tarefa_id, 'usuario_id': usuario_id,
+                               'descricao': f'tarefa {tarefa_id}', 'dia_semana': dia})
+            for atras in range(DIAS_DE_HISTORICO):
+                ocorrencias.append({'usuario_id': usuario_id, 'data': hoje - timedelta(days=atras),
+                                    'tarefa_id': tarefa_id, 'concluida': atras % 2 == 0})
+        for i in range(CONQUISTAS_POR_USUARIO):
+            conquistas.append({'usuario_id': usuario_id, 'tarefa_id': contadores['tarefa'],
+                               'data': hoje - timedelta(days=i), 'descricao': 'feito'})
+    with db.engine.begin() as conexao:
+        for modelo, linhas in ((Usuario, usuarios), (AlterEgo, alters), (Tarefa, planejadas),
+                               (TarefaDia, ocorrencias), (Conquista, conquistas)):
+            if linhas:
+                conexao.execute(insert(modelo.__table__), linhas)
+
+def medir_rota(app, cliente, rota, repeticoes):
+    """(mediana ms, p95 ms, consultas) da rota, sem o cache do estado do Alter Ego"""
+    consultas = []
+
+    def pedir():
+        # Carimbo novo a cada pedido: /api/alterego vai ao banco em vez de usar o estado guardado
+        carimbos.marcar(app.config['ALTER_VERSAO_PATH'])
+        resposta = cliente.get(rota)
+        assert resposta.status_code == 200, (rota, resposta.status_code)
+        consultas.append(consultas_da_resposta(resposta))
+
+    pedir()  # aquece (materializa o dia, monta o grafo, compila templates)
+    tempos = cronometrar(pedir, repeticoes)
+    return percentil(tempos, 50), percentil(tempos, 95), max(consultas[1:])
+
+if __name__ == '__main__':
+    maximo = int(sys.argv[1]) if len(sys.argv) > 1 else ETAPAS[-1]
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    etapas = [etapa for etapa in ETAPAS if etapa <= maximo]
+
+    with app_temporario(PERFILADOR=True) as app:
+        cliente = app.test_client()
+        contadores = {'tarefa': 0}
+        resultados = {}
+        semeados = 0
+        for etapa in etapas:
+            inicio = time.perf_counter()
+            semear(semeados + 1, etapa, contadores)
+            semeados = etapa
+            print(f"🧪 {etapa:>6} usuários ({time.perf_counter() - inicio:.1f} s para semear)")
+            for rota in ROTAS:
+                resultados[(etapa, rota)] = medir_rota(app, cliente, rota, repeticoes)
+                mediana, p95, consultas = resultados[(etapa, rota)]
+                print(f"   {rota:<20} mediana {mediana:6.2f} ms   p95 {p95:6.2f} ms   {consultas} consultas")
+            tempos = cronometrar(lambda: simulacao.executar_tick(simulacao.gerador(42)), 3)
+            mediana = percentil(tempos, 50)
+            print(f"   {'tick do Alter Ego':<20} {mediana:8.1f} ms   {mediana * 1000 / etapa:6.1f} µs por avatar")
+
+        print()
+        falhas = []
+        for rota in ROTAS:
+            base, _, consultas_base = resultados[(etapas[0], rota)]
+            topo, _, consultas_topo = resultados[(etapas[-1], rota)]
+            crescimento = topo / base
+            marca = '✅' if crescimento <= LIMITE_CRESCIMENTO and consultas_topo == consultas_base else '❌'
+            if marca == '❌':
+                falhas.append(rota)
+            print(f"{marca} {rota:<20} {base:6.2f} ms -> {topo:6.2f} ms ({crescimento:.2f}x), "
+                  f"{consultas_base} -> {consultas_topo} consultas")
+        sys.exit(1 if falhas else 0)
@@ -0,0 +1,26 @@
+import os
+import time
+
+# ========== CARIMBOS DE VERSÃO ==========
+# Um carimbo é um arquivo minúsculo com um número que muda sempre que algum
+# estado muda. Todos os processos (workers do gunicorn, scheduler, scripts)
+# enxergam o mesmo arquivo, então ler o carimbo é um jeito barato de saber
+# se algo mudou sem ir ao banco.
+
+def marcar(caminho):
+    """Gera uma nova versão e grava no carimbo (troca atômica)"""
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    versao = str(time.time_ns())
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'w') as f:
+        f.write(versao)
+    os.replace(temporario, caminho)
+    return versao
+
+def ler(caminho):
+    """Lê a versão atual do carimbo ('0' se ainda não existe)"""
+    try:
+        with open(caminho) as f:
+            return f.read().strip() or '0'
+    except FileNotFoundError:
+        return '0'
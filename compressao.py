@@ -0,0 +1,127 @@
+# compressao.py
+# Compressão das respostas (Brotli ou gzip, conforme o Accept-Encoding).
+#
+# Páginas HTML, JSON da API, manifest e o service worker são comprimidos no
+# after_request. Os pacotes de CSS/JS (ativos.PACOTES) já vêm com as
+# variantes prontas de ativos.obter_pacote e não passam por aqui de novo.
+# Brotli é opcional (pip install brotli); sem ele fica só o gzip.
+#
+# Bytes transferidos por página, antes e depois:
+#   python compressao.py
+
+import re
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # sem brotli instalado: só gzip
+    brotli = None
+
+TAMANHO_MINIMO = 512  # bytes: abaixo disso os cabeçalhos custam mais que a economia
+NIVEL_GZIP = 6        # por requisição; os pacotes usam o nível máximo (comprimidos uma vez)
+NIVEL_BROTLI = 5
+
+# Sufixo que etag_codificado põe no fim do ETag (antes da aspa final)
+SUFIXO_NO_ETAG = re.compile(r'-(?:br|gzip)"')
+
+TIPOS_COMPRESSIVEIS = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript',
+    'application/javascript', 'application/json', 'application/manifest+json',
+    'image/svg+xml',
+}
+
+def comprimir(conteudo, codificacao, maximo=False):
+    if codificacao == 'br':
+        return brotli.compress(conteudo, quality=11 if maximo else NIVEL_BROTLI)
+    # mtime=0: a mesma entrada dá sempre os mesmos bytes (ETag estável)
+    return gzip.compress(conteudo, compresslevel=9 if maximo else NIVEL_GZIP, mtime=0)
+
+def codificacoes_disponiveis():
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+def variantes(conteudo):
+    """Versões pré-comprimidas (nível máximo) de um conteúdo fixo: {'br': ..., 'gzip': ...}"""
+    return {codificacao: comprimir(conteudo, codificacao, maximo=True)
+            for codificacao in codificacoes_disponiveis()}
+
+def escolher_codificacao(disponiveis=None):
+    """Melhor codificação aceita pelo navegador (None = sem compressão)"""
+    for codificacao in disponiveis or codificacoes_disponiveis():
+        if request.accept_encodings[codificacao]:
+            return codificacao
+    return None
+
+def etag_codificado(etag, codificacao):
+    """ETag da variante comprimida: '<etag>-br' / '<etag>-gzip' (igual ao mod_deflate)"""
+    return f'{etag}-{codificacao}' if codificacao else etag
+
+def deve_comprimir(resposta):
+    return (resposta.status_code == 200
+            and not resposta.direct_passthrough
+            and not resposta.is_streamed
+            and 'Content-Encoding' not in resposta.headers
+            and resposta.mimetype in TIPOS_COMPRESSIVEIS
+            and (resposta.content_length or 0) >= TAMANHO_MINIMO)
+
+def init_app(app):
+    @app.before_request
+    def etags_sem_codificacao():
+        # O navegador devolve o ETag da variante comprimida; as rotas comparam
+        # com o ETag do conteúdo original, então o sufixo sai antes delas lerem
+        cabecalho = request.environ.get('HTTP_IF_NONE_MATCH')
+        if cabecalho:
+            request.environ['HTTP_IF_NONE_MATCH'] = SUFIXO_NO_ETAG.sub('"', cabecalho)
+
+    @app.after_request
+    def comprimir_resposta(resposta):
+        if not deve_comprimir(resposta):
+            return resposta
+        resposta.vary.add('Accept-Encoding')
+        codificacao = escolher_codificacao()
+        if not codificacao:
+            return resposta
+        resposta.set_data(comprimir(resposta.get_data(), codificacao))
+        resposta.headers['Content-Encoding'] = codificacao
+        # O ETag forte é do conteúdo original; a versão comprimida ganha o seu
+        etag, fraco = resposta.get_etag()
+        if etag and not fraco:
+            resposta.set_etag(etag_codificado(etag, codificacao))
+        return resposta
+
+if __name__ == '__main__':
+    import os
+    from app import app
+    import ativos
+    import migracoes
+
+    PAGINAS = ['/', '/diario', '/gratidao', '/importantes', '/planejamento',
+               '/adicionar_momento', '/entrar', '/api/alterego', '/api/casa', '/sw.js']
+
+    def bytes_transferidos(cliente, url, codificacao):
+        cabecalhos = {'Accept-Encoding': codificacao} if codificacao else {}
+        resposta = cliente.get(url, headers=cabecalhos)
+        return resposta.status_code, len(resposta.get_data())
+
+    with app.app_context():
+        migracoes.migrar()
+
+    with app.test_request_context():
+        # Antes: cada arquivo servido como está, sem minificar nem comprimir
+        originais = {nome: sum(os.path.getsize(caminho) for caminho in ativos.arquivos_do_pacote(nome))
+                     for nome in ativos.PACOTES}
+        pacotes = ['/pacotes/' + nome for nome in ativos.PACOTES]
+
+    codificacoes = [None] + codificacoes_disponiveis()
+    cliente = app.test_client()
+    print(f"{'URL':<24}" + ''.join(f"{(c or 'sem'):>10}" for c in codificacoes))
+    for url in PAGINAS + pacotes:
+        tamanhos = [bytes_transferidos(cliente, url, c) for c in codificacoes]
+        if tamanhos[0][0] != 200:
+            print(f"{url:<24}  (status {tamanhos[0][0]})")
+            continue
+        print(f"{url:<24}" + ''.join(f"{t:>10}" for _, t in tamanhos))
+    for nome, tamanho in originais.items():
+        print(f"Antes: {nome} em arquivos separados = {tamanho} B")
+    if not brotli:
+        print("ℹ️ brotli não instalado: só gzip (pip install brotli)")
@@ -0,0 +1,87 @@
+# configuracao.py
+# Configurações do app (tabela Config) com tipo e cache em memória.
+#
+# Todas as linhas de Config são lidas numa consulta e ficam em memória.
+# Gravar pelo definir() recarrega este processo na hora e marca o carimbo
+# de configuração. Os outros workers olham o carimbo no máximo a cada
+# VERIFICAR_CARIMBO segundos: uma leitura velha dura no máximo isso.
+# Mudanças feitas direto no banco (sem definir) aparecem depois de TTL segundos.
+
+import time
+import threading
+from collections import namedtuple
+from flask import current_app
+from database import db
+from models import Config
+import carimbos
+
+TTL = 300               # segundos: recarrega mesmo sem carimbo novo
+VERIFICAR_CARIMBO = 1.0 # segundos entre leituras do carimbo
+
+# tipo converte o texto gravado em Config.valor; padrao já vem no tipo certo
+Ajuste = namedtuple('Ajuste', 'chave tipo padrao')
+
+AJUSTES = {
+    'tarefas_por_dia': Ajuste('tarefas_por_dia', int, 7),
+}
+
+_cache = {'valores': None, 'carimbo': None, 'carregado_em': 0.0, 'verificado_em': 0.0}
+_trava = threading.Lock()
+
+def _caminho_carimbo():
+    return current_app.config['CONFIG_VERSAO_PATH']
+
+def _recarregar(carimbo):
+    valores = dict(db.session.execute(db.select(Config.chave, Config.valor)).all())
+    agora = time.monotonic()
+    _cache.update(valores=valores, carimbo=carimbo, carregado_em=agora, verificado_em=agora)
+    return valores
+
+def _valores():
+    """Todas as configurações (texto), indo ao banco só quando o cache venceu"""
+    agora = time.monotonic()
+    valores = _cache['valores']
+    if valores is not None and agora - _cache['carregado_em'] < TTL:
+        if agora - _cache['verificado_em'] < VERIFICAR_CARIMBO:
+            return valores
+        carimbo = carimbos.ler(_caminho_carimbo())
+        if carimbo == _cache['carimbo']:
+            _cache['verificado_em'] = agora
+            return valores
+    with _trava:
+        # Lê o carimbo ANTES do banco: se mudar no meio, a próxima leitura recarrega
+        return _recarregar(carimbos.ler(_caminho_carimbo()))
+
+def valor_bruto(chave, padrao=None):
+    """Texto gravado para a chave (ou o padrão)"""
+    return _valores().get(chave, padrao)
+
+def obter(chave):
+    """Valor da configuração já convertido para o tipo do ajuste"""
+    ajuste = AJUSTES[chave]
+    texto = valor_bruto(chave)
+    if texto is None:
+        return ajuste.padrao
+    try:
+        return ajuste.tipo(texto)
+    except ValueError:
+        return ajuste.padrao
+
+def definir(chave, valor):
+    """Grava a configuração (valida pelo tipo) e invalida o cache de todos os workers"""
+    ajuste = AJUSTES.get(chave)
+    if ajuste:
+        valor = ajuste.tipo(valor)  # ValueError se não for do tipo certo
+    config = Config.query.filter_by(chave=chave).first()
+    if config:
+        config.valor = str(valor)
+    else:
+        db.session.add(Config(chave=chave, valor=str(valor)))
+    db.session.commit()
+    invalidar()
+    return valor
+
+def invalidar():
+    """Descarta o cache deste processo e avisa os outros workers"""
+    carimbos.marcar(_caminho_carimbo())
+    _cache['valores'] = None
@@ -0,0 +1,139 @@
+# estatisticas.py
+# Resumo diário das tarefas (EstatisticaDia) e sequências de dias cumpridos.
+#
+# Cada linha guarda, por usuário e dia, quantas ocorrências existiam (total),
+# quantas foram concluídas e os pontos. Ela é atualizada na mesma transação
+# que muda TarefaDia: materializar o dia soma ao total e concluir soma às
+# concluídas. Assim o painel e a pontuação nunca varrem TarefaDia:
+# ler N dias é ler N linhas do índice (usuario_id, data).
+#
+# Para (re)construir o resumo a partir de TarefaDia (bancos antigos):
+#   python estatisticas.py
+
+from datetime import timedelta
+from sqlalchemy import select, insert, update, delete, func, case
+from sqlalchemy.exc import IntegrityError
+from database import db
+from models import TarefaDia, EstatisticaDia
+
+PONTOS_POR_TAREFA = 15
+DIAS_PAINEL = 365
+DIAS_MAXIMO = 3 * 366  # limite do ?dias= da API
+
+def _inserir_agregado(*condicoes):
+    """INSERT INTO estatistica_dia SELECT ... FROM tarefa_dia (filtrado) agrupado por usuário e dia"""
+    concluidas = func.sum(case((TarefaDia.concluida == True, 1), else_=0))
+    agregado = select(
+        TarefaDia.usuario_id, TarefaDia.data, func.count(), concluidas, concluidas * PONTOS_POR_TAREFA
+    ).where(*condicoes).group_by(TarefaDia.usuario_id, TarefaDia.data)
+    return insert(EstatisticaDia).from_select(
+        ['usuario_id', 'data', 'total', 'concluidas', 'pontos'], agregado)
+
+# ========== ATUALIZAÇÃO INCREMENTAL ==========
+
+def somar(usuario_id, data, total=0, concluidas=0):
+    """Soma ao resumo do dia (na transação da sessão: o commit é de quem chamou)"""
+    if not total and not concluidas:
+        return
+    atualizadas = db.session.execute(
+        update(EstatisticaDia)
+        .where(EstatisticaDia.usuario_id == usuario_id, EstatisticaDia.data == data)
+        .values(total=EstatisticaDia.total + total,
+                concluidas=EstatisticaDia.concluidas + concluidas,
+                pontos=EstatisticaDia.pontos + concluidas * PONTOS_POR_TAREFA)
+    ).rowcount
+    if atualizadas:
+        return
+    # Primeira mudança do dia: a linha nasce contando o que já existe em TarefaDia
+    # (a sessão faz flush antes, então a mudança atual já está incluída)
+    try:
+        with db.session.begin_nested():
+            db.session.execute(_inserir_agregado(TarefaDia.usuario_id == usuario_id, TarefaDia.data == data))
+    except IntegrityError:
+        # Outro worker criou a linha ao mesmo tempo: agora é só somar
+        somar(usuario_id, data, total, concluidas)
+
+def recalcular_dias(usuario_id, datas):
+    """Refaz o resumo dos dias a partir de TarefaDia (depois de apagar ocorrências)"""
+    datas = sorted(set(datas))
+    if not datas:
+        return
+    db.session.execute(delete(EstatisticaDia).where(
+        EstatisticaDia.usuario_id == usuario_id, EstatisticaDia.data.in_(datas)))
+    db.session.execute(_inserir_agregado(TarefaDia.usuario_id == usuario_id, TarefaDia.data.in_(datas)))
+
+def reconstruir(conexao=None, usuario_id=None):
+    """Apaga e refaz todo o resumo (de um usuário ou de todos) num INSERT ... SELECT"""
+    conexao = conexao or db.session
+    filtro_resumo = [EstatisticaDia.usuario_id == usuario_id] if usuario_id else []
+    filtro_tarefas = [TarefaDia.usuario_id == usuario_id] if usuario_id else []
+    conexao.execute(delete(EstatisticaDia).where(*filtro_resumo))
+    conexao.execute(_inserir_agregado(*filtro_tarefas))
+    return conexao.execute(select(func.count()).select_from(EstatisticaDia).where(*filtro_resumo)).scalar()
+
+# ========== LEITURA ==========
+
+def pontos_do_dia(usuario_id, data):
+    pontos = db.session.execute(select(EstatisticaDia.pontos).where(
+        EstatisticaDia.usuario_id == usuario_id, EstatisticaDia.data == data)).scalar()
+    return pontos or 0
+
+def historico(usuario_id, hoje, dias=DIAS_PAINEL):
+    """Resumo dos últimos `dias` até hoje, um item por dia (dias sem linha vêm zerados)"""
+    inicio = hoje - timedelta(days=dias - 1)
+    linhas = db.session.execute(
+        select(EstatisticaDia.data, EstatisticaDia.total, EstatisticaDia.concluidas, EstatisticaDia.pontos)
+        .where(EstatisticaDia.usuario_id == usuario_id, EstatisticaDia.data.between(inicio, hoje))
+    )
+    por_data = {linha.data: linha for linha in linhas}
+    serie = []
+    for i in range(dias):
+        data = inicio + timedelta(days=i)
+        linha = por_data.get(data)
+        serie.append({'data': data,
+                      'total': linha.total if linha else 0,
+                      'concluidas': linha.concluidas if linha else 0,
+                      'pontos': linha.pontos if linha else 0})
+    return serie
+
+def sequencias(serie):
+    """Sequência atual e a maior da série (dias seguidos com pelo menos uma tarefa concluída)
+
+    A atual termina hoje, ou ontem se hoje ainda não teve conclusão.
+    """
+    maior = corrente = 0
+    for dia in serie:
+        corrente = corrente + 1 if dia['concluidas'] else 0
+        maior = max(maior, corrente)
+    atual = corrente
+    if not atual and len(serie) > 1:
+        for dia in reversed(serie[:-1]):
+            if not dia['concluidas']:
+                break
+            atual += 1
+    return atual, maior
+
+def painel(usuario_id, hoje, dias=DIAS_PAINEL):
+    """Tudo que o painel de estatísticas mostra, com uma consulta só"""
+    serie = historico(usuario_id, hoje, dias)
+    atual, maior = sequencias(serie)
+    total = sum(dia['total'] for dia in serie)
+    concluidas = sum(dia['concluidas'] for dia in serie)
+    return {
+        'serie': serie,
+        'sequencia_atual': atual,
+        'maior_sequencia': maior,
+        'dias_ativos': sum(1 for dia in serie if dia['concluidas']),
+        'total': total,
+        'concluidas': concluidas,
+        'pontos': sum(dia['pontos'] for dia in serie),
+        'taxa': round(100 * concluidas / total) if total else 0,
+    }
+
+if __name__ == '__main__':
+    from fabrica import contexto_cli
+
+    with contexto_cli():
+        linhas = reconstruir()
+        db.session.commit()
+    print(f"📊 Resumo diário reconstruído: {linhas} dias")
@@ -0,0 +1,376 @@
+# exportacao.py
+# Exportar e importar os dados dos usuários num arquivo só.
+#
+#   flask --app app dual-you export backup.tar.gz [--usuario 3]
+#   flask --app app dual-you import backup.tar.gz [--substituir]
+#
+# O arquivo é um tar (comprimido com gzip se o nome terminar em .gz) com:
+#   manifesto.json            formato, versão do esquema, os usuários e colunas/linhas/faixa de IDs de cada tabela
+#   dados/<tabela>.ndjson     um registro JSON por linha, tabelas na ordem das chaves estrangeiras
+#   fotos/uploads/<arquivo>   as fotos usadas pelas conquistas e momentos exportados
+#
+# Memória constante nos dois sentidos: a exportação lê o banco em lotes
+# (yield_per) e escreve cada tabela num temporário em disco (o tar precisa
+# do tamanho antes do conteúdo); a importação lê o tar em modo stream e
+# grava LOTE registros por transação. Se a importação falhar no meio, os
+# lotes já gravados ficam no banco: é só rodar de novo com --substituir.
+#
+# IDs na importação: tudo que pode recusar a importação (usuários, dados
+# que já existem sem --substituir) é conferido numa transação só, antes do
+# primeiro registro gravado. Cada usuário do arquivo vira o usuário de
+# mesmo nome deste banco ou um usuário novo (com o mesmo ID, se estiver
+# livre): os dados de um usuário nunca caem em outro. Os registros mantêm
+# os IDs quando a faixa de IDs da tabela no arquivo está livre; senão a
+# tabela inteira é deslocada para depois do maior ID existente e as chaves
+# estrangeiras (tarefa_id, tarefa_desbloqueio) acompanham o deslocamento.
+# Memória: só o mapa dos usuários, o resto é uma soma por registro.
+#
+# EstatisticaDia não vai no arquivo: é refeita de TarefaDia no fim.
+# historias_vistas do Alter Ego guarda IDs de Historia, que só batem se os
+# dois bancos carregaram o mesmo pacote (a importação avisa).
+#
+# Vazão com 1 milhão de registros: python benchmarks/exportacao.py
+
+import io
+import os
+import json
+import time
+import base64
+import shutil
+import tarfile
+import tempfile
+from datetime import date, datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select, insert, delete, union, func, text, Date, DateTime, LargeBinary
+from database import db
+from models import Usuario, Tarefa, TarefaDia, Conquista, MomentoGratidao, AlterEgo, EstatisticaDia, Config
+import migracoes
+import estatisticas
+import historias
+import carimbos
+import uploads
+
+FORMATO = 2  # 2: usuários e faixas de IDs no manifesto (os IDs podem ser remapeados)
+LOTE = 5000  # registros por lote de leitura e por transação na importação
+NIVEL_GZIP = 6  # o padrão do tarfile (9) custa o dobro do tempo para quase nada menor
+
+# Ordem das chaves estrangeiras: quem é referenciado vem antes (os usuários vão no manifesto)
+TABELAS = [Tarefa, TarefaDia, Conquista, MomentoGratidao, AlterEgo]
+POR_NOME = {modelo.__tablename__: modelo for modelo in TABELAS}
+COM_FOTO = (Conquista, MomentoGratidao)
+
+MANIFESTO = 'manifesto.json'
+PASTA_DADOS = 'dados/'
+PASTA_FOTOS = 'fotos/'
+
+class ErroImportacao(click.ClickException):
+    """Arquivo inválido ou banco em estado que não permite importar"""
+
+def _filtro(modelo, usuario_id):
+    """Condições que restringem a tabela a um usuário (nenhuma = todos)"""
+    if usuario_id is None:
+        return []
+    return [modelo.id == usuario_id] if modelo is Usuario else [modelo.usuario_id == usuario_id]
+
+def _para_json(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, bytes):
+        return base64.b64encode(valor).decode('ascii')
+    return valor
+
+def _conversores(tabela):
+    """{coluna: função} que desfaz o _para_json na importação"""
+    conversores = {}
+    for coluna in tabela.columns:
+        if isinstance(coluna.type, DateTime):
+            conversores[coluna.name] = datetime.fromisoformat
+        elif isinstance(coluna.type, Date):
+            conversores[coluna.name] = date.fromisoformat
+        elif isinstance(coluna.type, LargeBinary):
+            conversores[coluna.name] = base64.b64decode
+    return conversores
+
+def _adicionar(tar, nome, arquivo):
+    """Coloca um arquivo aberto (posicionado em qualquer lugar) no tar com o nome dado"""
+    info = tarfile.TarInfo(nome)
+    info.size = arquivo.seek(0, io.SEEK_END)
+    info.mtime = int(time.time())
+    arquivo.seek(0)
+    tar.addfile(info, arquivo)
+
+# ========== EXPORTAÇÃO ==========
+
+def registros(modelo, usuario_id=None):
+    """Registros da tabela já prontos para JSON, lidos do banco em lotes"""
+    tabela = modelo.__table__
+    consulta = (select(tabela).where(*_filtro(modelo, usuario_id))
+                .order_by(tabela.c.id).execution_options(yield_per=LOTE))
+    for linha in db.session.execute(consulta):
+        yield {coluna: _para_json(valor) for coluna, valor in linha._mapping.items()}
+
+def fotos_usadas(usuario_id=None):
+    """Fotos (sem repetição, o UNION resolve no banco) das conquistas e momentos"""
+    consulta = union(*(select(modelo.foto).where(modelo.foto.isnot(None), *_filtro(modelo, usuario_id))
+                       for modelo in COM_FOTO))
+    for (foto,) in db.session.execute(consulta.execution_options(yield_per=LOTE)):
+        yield foto
+
+def exportar(destino, usuario_id=None):
+    """Grava o arquivo de exportação. Retorna {'tabelas': {nome: linhas}, 'fotos', 'fotos_faltando'}"""
+    pacote = db.session.execute(select(Config.valor).where(Config.chave == 'pacote_historias')).scalar()
+    with db.engine.connect() as conexao:
+        versao_esquema = migracoes.versao_atual(conexao)
+    manifesto = {'formato': FORMATO, 'versao_esquema': versao_esquema, 'pacote_historias': pacote,
+                 'usuario_id': usuario_id, 'criado_em': datetime.utcnow().isoformat(),
+                 'usuarios': list(registros(Usuario, usuario_id)), 'tabelas': {}}
+    temporarios = []
+    try:
+        for modelo in TABELAS:
+            temporario = tempfile.TemporaryFile()
+            temporarios.append((modelo.__tablename__, temporario))
+            linhas, ids = 0, None
+            for registro in registros(modelo, usuario_id):
+                temporario.write(json.dumps(registro, ensure_ascii=False).encode('utf-8') + b'\n')
+                linhas += 1
+                # Em ordem de id: o primeiro é o menor, o último o maior
+                ids = [ids[0] if ids else registro['id'], registro['id']]
+            manifesto['tabelas'][modelo.__tablename__] = {
+                'linhas': linhas, 'ids': ids, 'colunas': [coluna.name for coluna in modelo.__table__.columns]}
+
+        fotos = faltando = 0
+        opcoes = {'mode': 'w:gz', 'compresslevel': NIVEL_GZIP} if destino.endswith('.gz') else {'mode': 'w'}
+        with tarfile.open(destino, **opcoes) as tar:
+            # O manifesto vem primeiro: a importação confere antes de gravar qualquer coisa
+            _adicionar(tar, MANIFESTO, io.BytesIO(json.dumps(manifesto, indent=1).encode('utf-8')))
+            for nome, temporario in temporarios:
+                _adicionar(tar, f"{PASTA_DADOS}{nome}.ndjson", temporario)
+            for foto in fotos_usadas(usuario_id):
+                caminho = uploads.caminho_original(foto)
+                if not os.path.isfile(caminho):
+                    faltando += 1
+                    continue
+                tar.add(caminho, arcname=PASTA_FOTOS + foto, recursive=False)
+                fotos += 1
+    finally:
+        for _, temporario in temporarios:
+            temporario.close()
+    tabelas = {'usuario': len(manifesto['usuarios'])}
+    tabelas.update((nome, dados['linhas']) for nome, dados in manifesto['tabelas'].items())
+    return {'tabelas': tabelas, 'fotos': fotos, 'fotos_faltando': faltando}
+
+# ========== IMPORTAÇÃO ==========
+
+def _conferir_manifesto(conexao, manifesto):
+    if manifesto.get('formato') != FORMATO:
+        raise ErroImportacao(f"Formato {manifesto.get('formato')} não suportado (esperado: {FORMATO})")
+    versao = migracoes.versao_atual(conexao)
+    if manifesto['versao_esquema'] > versao:
+        raise ErroImportacao(f"Arquivo de um banco na versão {manifesto['versao_esquema']}, "
+                             f"este está na {versao}: atualize o app antes de importar")
+    desconhecidas = set(manifesto['tabelas']) - set(POR_NOME)
+    if desconhecidas:
+        raise ErroImportacao(f"Tabelas desconhecidas no arquivo: {', '.join(sorted(desconhecidas))}")
+    pacote = conexao.execute(select(Config.valor).where(Config.chave == 'pacote_historias')).scalar()
+    if manifesto.get('pacote_historias') and manifesto['pacote_historias'] != pacote:
+        print("⚠️  O pacote de histórias é diferente do exportado: as histórias já vistas podem não bater")
+
+def _mapear_usuarios(conexao, usuarios):
+    """{id no arquivo: id neste banco} de cada usuário do arquivo
+
+    Mesmo nome: é a mesma pessoa (o usuário padrão, ou restaurar no mesmo
+    banco). Nome novo: cria o usuário, com o ID do arquivo se estiver livre.
+    Roda na transação da preparação: se a importação for recusada, some junto.
+    """
+    conversores = _conversores(Usuario.__table__)
+    mapa = {}
+    for registro in usuarios:
+        registro = {coluna: conversores[coluna](valor) if coluna in conversores and valor is not None else valor
+                    for coluna, valor in registro.items() if coluna in Usuario.__table__.c}
+        original = registro['id']
+        destino = conexao.execute(select(Usuario.id).where(Usuario.nome == registro['nome'])).scalar()
+        if destino is None:
+            if conexao.execute(select(Usuario.id).where(Usuario.id == original)).first():
+                del registro['id']  # ID de outra pessoa neste banco: o usuário ganha um novo
+            destino = conexao.execute(insert(Usuario.__table__).values(**registro)).inserted_primary_key[0]
+        if destino != original:
+            print(f"👤 {registro['nome']}: id {original} no arquivo, {destino} neste banco")
+        mapa[original] = destino
+    return mapa
+
+def _preparar_banco(conexao, usuario_id, substituir):
+    """Com substituir apaga os dados (do usuário de destino, ou de todos); senão exige que não existam"""
+    for modelo in reversed(TABELAS):
+        filtro = _filtro(modelo, usuario_id)
+        if substituir:
+            conexao.execute(delete(modelo.__table__).where(*filtro))
+        elif conexao.execute(select(modelo.id).where(*filtro).limit(1)).first():
+            raise ErroImportacao(f"O banco já tem dados em {modelo.__tablename__}: "
+                                 f"use --substituir para apagá-los antes de importar")
+    if substituir:
+        conexao.execute(delete(EstatisticaDia).where(*_filtro(EstatisticaDia, usuario_id)))
+
+def _deslocamentos(conexao, manifesto):
+    """{modelo: quanto somar aos IDs}: 0 se a faixa do arquivo está livre, senão depois do maior ID"""
+    deslocamentos = {}
+    for modelo in TABELAS:
+        ids = manifesto['tabelas'].get(modelo.__tablename__, {}).get('ids')
+        deslocamentos[modelo] = 0
+        if ids and conexao.execute(select(modelo.id).where(modelo.id.between(*ids)).limit(1)).first():
+            maior = conexao.execute(select(func.max(modelo.id))).scalar()
+            deslocamentos[modelo] = maior + 1 - ids[0]
+            print(f"   {modelo.__tablename__}: IDs {ids[0]}-{ids[1]} já usados, gravando a partir de {maior + 1}")
+    return deslocamentos
+
+def _tradutor(modelo, usuarios, deslocamentos):
+    """Função que troca, num registro, os IDs do arquivo pelos deste banco"""
+    proprio = deslocamentos[modelo]
+    tarefa = deslocamentos[Tarefa]
+    tarefa_dia = deslocamentos[TarefaDia]
+
+    def traduzir(registro):
+        registro['id'] += proprio
+        try:
+            registro['usuario_id'] = usuarios[registro['usuario_id']]
+        except KeyError:
+            raise ErroImportacao(f"{modelo.__tablename__} {registro['id'] - proprio} é de um usuário "
+                                 f"que não está no arquivo ({registro['usuario_id']})")
+        if registro.get('tarefa_id') is not None:
+            registro['tarefa_id'] += tarefa
+        if registro.get('tarefa_desbloqueio'):
+            registro['tarefa_desbloqueio'] += tarefa_dia
+        return registro
+    return traduzir
+
+def _gravar_lote(modelo, lote):
+    """Um lote, uma transação"""
+    with db.engine.begin() as conexao:
+        conexao.execute(insert(modelo.__table__), lote)
+
+def importar_tabela(modelo, arquivo, colunas, traduzir):
+    """Lê o NDJSON de uma tabela e grava em lotes de LOTE. Retorna quantos registros leu
+
+    traduzir: troca os IDs do arquivo pelos deste banco (_tradutor).
+    """
+    tabela = modelo.__table__
+    # Colunas que não existem mais no esquema são ignoradas; as novas ficam com o padrão
+    colunas = [coluna for coluna in colunas if coluna in tabela.c]
+    conversores = _conversores(tabela)
+    lote, total = [], 0
+    # Linha a linha em bytes (json.loads aceita UTF-8): no tar em stream não dá para usar TextIOWrapper
+    for linha in arquivo:
+        registro = json.loads(linha)
+        lote.append(traduzir({coluna: conversores[coluna](registro[coluna])
+                              if coluna in conversores and registro.get(coluna) is not None else registro.get(coluna)
+                              for coluna in colunas}))
+        if len(lote) >= LOTE:
+            _gravar_lote(modelo, lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        _gravar_lote(modelo, lote)
+        total += len(lote)
+    return total
+
+def restaurar_foto(foto, arquivo):
+    """Grava a foto do arquivo em static/uploads (se ainda não existe). Retorna se gravou"""
+    pasta, nome = os.path.split(foto)
+    if pasta != 'uploads' or not nome or nome.startswith('.'):
+        print(f"⚠️  Foto com caminho inesperado ignorada: {foto}")
+        return False
+    destino = uploads.caminho_original(foto)
+    if os.path.exists(destino):
+        return False
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    # Temporário com o prefixo dos uploads: se o processo morrer, a varredura limpa
+    descritor, temporario = tempfile.mkstemp(prefix=uploads.PREFIXO_TEMPORARIO, dir=os.path.dirname(destino))
+    with os.fdopen(descritor, 'wb') as saida:
+        shutil.copyfileobj(arquivo, saida, uploads.TAMANHO_BLOCO)
+    os.replace(temporario, destino)
+    return True
+
+def _ajustar_sequencias(conexao):
+    """Postgres: os IDs vieram do arquivo, a sequência continua do maior"""
+    if conexao.dialect.name != 'postgresql':
+        return
+    for modelo in [Usuario] + TABELAS:
+        tabela = modelo.__tablename__
+        conexao.execute(text(f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), "
+                             f"COALESCE((SELECT MAX(id) FROM {tabela}), 1))"))
+
+def importar(origem, substituir=False):
+    """Importa o arquivo de exportação. Retorna {'tabelas': {nome: linhas}, 'fotos'}"""
+    migracoes.migrar()
+    historias.carregar_pacote()
+    resumo = {'tabelas': {}, 'fotos': 0}
+    escopo = None
+    with tarfile.open(origem, 'r|*') as tar:
+        membros = iter(tar)
+        primeiro = next(membros, None)
+        if primeiro is None or primeiro.name != MANIFESTO:
+            raise ErroImportacao(f"{origem} não é uma exportação do Dual You (falta {MANIFESTO} no início)")
+        manifesto = json.load(tar.extractfile(primeiro))
+        # Tudo que pode recusar a importação, numa transação, antes de gravar os dados
+        with db.engine.begin() as conexao:
+            _conferir_manifesto(conexao, manifesto)
+            usuarios = _mapear_usuarios(conexao, manifesto['usuarios'])
+            if manifesto.get('usuario_id') is not None:
+                if manifesto['usuario_id'] not in usuarios:
+                    raise ErroImportacao(f"O usuário {manifesto['usuario_id']} não está no arquivo")
+                escopo = usuarios[manifesto['usuario_id']]
+            _preparar_banco(conexao, escopo, substituir)
+            deslocamentos = _deslocamentos(conexao, manifesto)
+        resumo['tabelas']['usuario'] = len(usuarios)
+
+        for membro in membros:
+            if membro.name.startswith(PASTA_DADOS) and membro.name.endswith('.ndjson'):
+                nome = membro.name[len(PASTA_DADOS):-len('.ndjson')]
+                modelo = POR_NOME[nome]
+                inicio = time.perf_counter()
+                linhas = importar_tabela(modelo, tar.extractfile(membro), manifesto['tabelas'][nome]['colunas'],
+                                         _tradutor(modelo, usuarios, deslocamentos))
+                resumo['tabelas'][nome] = linhas
+                print(f"   {nome}: {linhas} registros ({time.perf_counter() - inicio:.1f} s)")
+            elif membro.name.startswith(PASTA_FOTOS) and membro.isfile():
+                resumo['fotos'] += restaurar_foto(membro.name[len(PASTA_FOTOS):], tar.extractfile(membro))
+
+    with db.engine.begin() as conexao:
+        estatisticas.reconstruir(conexao, escopo)
+        _ajustar_sequencias(conexao)
+    # Os workers que estão rodando remontam o Alter Ego e o planejamento
+    carimbos.marcar(current_app.config['ALTER_VERSAO_PATH'])
+    carimbos.marcar(current_app.config['PLANO_VERSAO_PATH'])
+    return resumo
+
+# ========== COMANDOS (flask dual-you ...) ==========
+
+grupo = AppGroup('dual-you', help='Exportar e importar os dados dos usuários.')
+
+@grupo.command('export')
+@click.argument('destino')
+@click.option('--usuario', type=int, default=None, help='Só os dados deste usuário (id).')
+def comando_exportar(destino, usuario):
+    """Exporta tarefas, conquistas, momentos, Alter Ego e fotos para DESTINO (.tar ou .tar.gz)."""
+    inicio = time.perf_counter()
+    resumo = exportar(destino, usuario)
+    print(f"📦 {destino}: {sum(resumo['tabelas'].values())} registros, {resumo['fotos']} fotos "
+          f"({time.perf_counter() - inicio:.1f} s)")
+    if resumo['fotos_faltando']:
+        print(f"⚠️  {resumo['fotos_faltando']} fotos citadas no banco não existem no disco")
+
+@grupo.command('import')
+@click.argument('origem')
+@click.option('--substituir', is_flag=True, help='Apaga os dados existentes antes de importar.')
+def comando_importar(origem, substituir):
+    """Importa um arquivo gerado pelo export."""
+    inicio = time.perf_counter()
+    resumo = importar(origem, substituir)
+    print(f"✅ {sum(resumo['tabelas'].values())} registros e {resumo['fotos']} fotos novas importados "
+          f"({time.perf_counter() - inicio:.1f} s)")
+    if resumo['fotos']:
+        print("🖼️  Miniaturas das fotos: python uploads.py")
+
+def init_app(app):
+    app.cli.add_command(grupo)
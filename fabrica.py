@@ -0,0 +1,148 @@
+# fabrica.py
+# Configuração do app e contexto leve para scripts.
+#
+# Importar o app não faz trabalho nenhum além de montar o objeto: nada de
+# scheduler e nenhuma conexão com o banco. Quem liga as tarefas de fundo
+# é app.start_background(app), chamado pelo gunicorn em cada worker
+# (gunicorn.conf.py) ou pelo `python app.py`.
+#
+# Scripts de manutenção (migrar, recriar o banco, criar usuário...) só
+# precisam da configuração e do banco: contexto_cli() monta um app sem
+# rotas, sem hooks e sem os módulos pesados (numpy, Pillow, APScheduler).
+#
+#   from fabrica import contexto_cli
+#   with contexto_cli() as app:
+#       ...
+#
+# Para conferir o custo de importar o app (python -X importtime; também nos testes):
+#   python fabrica.py
+
+import os
+from contextlib import contextmanager
+from flask import Flask
+from database import db
+import armazenamento
+import geometria
+
+# Pasta do projeto: o app completo e o de scripts usam a mesma instance/ (banco e carimbos)
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+# Limite para importar o app (milissegundos, importação acumulada): `python fabrica.py` e tests/test_fabrica.py
+ORCAMENTO_IMPORTACAO_MS = 1500
+
+def configurar(app):
+    """Toda a configuração que vem do ambiente (a mesma para o app e para os scripts)"""
+    # SQLite com WAL por padrão; DATABASE_URL troca para Postgres (armazenamento.py)
+    app.config['SQLALCHEMY_DATABASE_URI'] = armazenamento.url_do_banco()
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = armazenamento.opcoes_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = os.environ.get('DUAL_YOU_SECRET_KEY', 'sua-chave-secreta-aqui')
+    # Vários usuários com login (DUAL_YOU_MULTIUSUARIO=1); desligado tudo é do usuário padrão
+    app.config['MULTIUSUARIO'] = os.environ.get('DUAL_YOU_MULTIUSUARIO') == '1'
+    # Caminho absoluto: quem grava (upload) e quem varre (faxineiro) veem a mesma pasta, qualquer que seja o cwd
+    app.config['UPLOAD_FOLDER'] = os.path.join(app.static_folder, 'uploads')
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+    app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    # Carimbo que muda sempre que o Alter Ego muda (compartilhado entre workers)
+    app.config['ALTER_VERSAO_PATH'] = os.path.join(app.instance_path, 'alter_versao')
+    # SSE segura um worker por conexão: só liga com workers assíncronos (gevent/threads)
+    app.config['ALTER_STREAM'] = os.environ.get('DUAL_YOU_ALTER_STREAM') == '1'
+    app.config['ALTER_STREAM_DURACAO'] = 55  # segundos até o navegador reconectar
+    # Carimbo que muda sempre que as histórias do banco são recarregadas
+    app.config['HISTORIAS_VERSAO_PATH'] = os.path.join(app.instance_path, 'historias_versao')
+    # Carimbo que muda sempre que o planejamento (tarefas fixas/extras) muda
+    app.config['PLANO_VERSAO_PATH'] = os.path.join(app.instance_path, 'plano_versao')
+    # Carimbo que muda sempre que uma configuração (tabela Config) é gravada
+    app.config['CONFIG_VERSAO_PATH'] = os.path.join(app.instance_path, 'config_versao')
+    # Tick do Alter Ego: só o worker líder executa (DUAL_YOU_AGENDADOR=0 desliga neste processo)
+    app.config['AGENDADOR_ATIVO'] = os.environ.get('DUAL_YOU_AGENDADOR', '1') != '0'
+    app.config['AGENDADOR_LOCK_PATH'] = os.path.join(app.instance_path, 'agendador.lock')
+    # Cômodos da casa (em pixels da imagem de fundo), usados pelo servidor e pelo navegador
+    app.config['CASA_GEOMETRIA_PATH'] = os.environ.get('DUAL_YOU_CASA', geometria.CASA_PADRAO)
+    # Consultas SQL por requisição (Server-Timing e /debug/queries); ligado sempre em app.testing
+    app.config['PERFILADOR'] = os.environ.get('DUAL_YOU_PERFILADOR') == '1'
+    # /metrics (Prometheus); com a pasta compartilhada soma os números de todos os workers
+    app.config['METRICAS_DIR'] = os.environ.get('DUAL_YOU_METRICAS_DIR')
+    app.config['METRICAS_TOKEN'] = os.environ.get('DUAL_YOU_METRICAS_TOKEN')
+
+def app_base(config=None):
+    """Flask configurado e com o banco ligado (sem rotas): a base do create_app e dos scripts
+
+    config: valores que substituem os do ambiente (ex.: SQLALCHEMY_DATABASE_URI de teste).
+    """
+    app = Flask('app', root_path=RAIZ)
+    configurar(app)
+    if config:
+        app.config.update(config)
+        if 'SQLALCHEMY_DATABASE_URI' in config and 'SQLALCHEMY_ENGINE_OPTIONS' not in config:
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = armazenamento.opcoes_engine(config['SQLALCHEMY_DATABASE_URI'])
+    db.init_app(app)
+    armazenamento.init_app(app, db)
+    return app
+
+@contextmanager
+def contexto_cli(config=None):
+    """App leve com o contexto já aberto, para scripts de manutenção"""
+    app = app_base(config)
+    with app.app_context():
+        yield app
+
+def medir_importacao():
+    """Importa o app num processo limpo com -X importtime: (ms acumulados do `app`,
+    [(ms, módulo)] importados direto por ele, threads vivas, conexões abertas no pool)"""
+    import sys
+    import subprocess
+
+    # Depois do import: quantas threads existem e quantas conexões o pool já abriu
+    codigo = ("import threading, app\n"
+              "from database import db\n"
+              "with app.app.app_context():\n"
+              "    pool = db.engine.pool\n"
+              "    conexoes = pool.checkedin() + pool.checkedout() if hasattr(pool, 'checkedin') else 0\n"
+              "print(len(threading.enumerate()), conexoes)\n")
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo],
+                               capture_output=True, text=True, cwd=RAIZ)
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr)
+
+    # Linhas do importtime: "import time: <próprio us> | <acumulado us> | <recuo><módulo>",
+    # com os módulos importados por um módulo listados antes dele, um nível mais recuados
+    modulos, total = [], 0
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self' in linha:
+            continue
+        _, acumulado, nome = linha.split('|')
+        nivel = (len(nome) - len(nome.lstrip()) - 1) // 2
+        if nivel == 1:
+            modulos.append((int(acumulado) / 1000, nome.strip()))
+        elif nivel == 0 and nome.strip() == 'app':
+            total = int(acumulado) / 1000
+            break
+        elif nivel == 0:
+            modulos = []
+    threads, conexoes = map(int, resultado.stdout.split())
+    return total, modulos, threads, conexoes
+
+if __name__ == '__main__':
+    import sys
+
+    try:
+        total, modulos, threads, conexoes = medir_importacao()
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+    print("📦 O que o app importa (acumulado, ms):")
+    for ms, nome in sorted(modulos, reverse=True)[:10]:
+        print(f"   {ms:8.1f}  {nome}")
+    falhas = []
+    if threads > 1:
+        falhas.append(f"{threads - 1} thread(s) iniciada(s) no import")
+    if conexoes:
+        falhas.append(f"{conexoes} conexão(ões) com o banco abertas no import")
+    if total > ORCAMENTO_IMPORTACAO_MS:
+        falhas.append(f"import levou {total:.0f} ms (orçamento: {ORCAMENTO_IMPORTACAO_MS} ms)")
+    for falha in falhas:
+        print(f"❌ {falha}")
+    if not falhas:
+        print(f"✅ app importado em {total:.0f} ms, sem threads nem conexões")
+    sys.exit(1 if falhas else 0)
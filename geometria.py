@@ -0,0 +1,71 @@
+# geometria.py
+# Geometria dos cômodos da casa do Alter Ego.
+#
+# Os retângulos de cada cômodo (em pixels da imagem da casa) ficam em
+# dados/casa.json, lidos uma vez por processo. O servidor converte as
+# coordenadas relativas (% do cômodo) em pixels com uma consulta a uma
+# tabela pronta, e o navegador recebe o mesmo arquivo em /api/casa para
+# posicionar o personagem sem depender do tamanho da imagem.
+# Outra casa (outra imagem): DUAL_YOU_CASA=/caminho/casa.json
+
+import os
+import json
+import hashlib
+import numpy as np
+from flask import current_app
+
+CASA_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados', 'casa.json')
+
+class Geometria:
+    """Tabela de cômodos: origem e tamanho de cada um, em pixels da imagem"""
+
+    def __init__(self, dados):
+        self.largura = dados['largura']
+        self.altura = dados['altura']
+        self.ambientes = tuple(dados['ambientes'])
+        self.padrao = dados.get('padrao', self.ambientes[0])
+        self.indices = {nome: i for i, nome in enumerate(self.ambientes)}
+
+        # (x_min, y_min, largura, altura) por cômodo: conversão de um só Alter Ego
+        self._caixas = {}
+        for nome, caixa in dados['ambientes'].items():
+            self._caixas[nome] = (caixa['x_min'], caixa['y_min'],
+                                  caixa['x_max'] - caixa['x_min'], caixa['y_max'] - caixa['y_min'])
+        # A mesma tabela em arrays, indexada por self.indices: conversão em lote
+        caixas = np.array([self._caixas[nome] for nome in self.ambientes], dtype=float)
+        self._origem = caixas[:, :2]
+        self._tamanho = caixas[:, 2:]
+
+        # O que o navegador recebe em /api/casa
+        self.manifesto = dados
+        self.etag = hashlib.sha256(
+            json.dumps(dados, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def absolutas(self, ambiente, x_relativo, y_relativo):
+        """(x, y) em pixels da imagem para uma posição relativa (0-100) no cômodo"""
+        x_min, y_min, largura, altura = self._caixas.get(ambiente) or self._caixas[self.padrao]
+        return int(x_min + largura * x_relativo / 100), int(y_min + altura * y_relativo / 100)
+
+    def absolutas_em_lote(self, indices, x_relativo, y_relativo):
+        """Mesma conversão para muitos Alter Egos: arrays de índices e % -> array (n, 2) de pixels"""
+        relativas = np.stack([np.asarray(x_relativo), np.asarray(y_relativo)], axis=1)
+        indices = np.asarray(indices)
+        return (self._origem[indices] + self._tamanho[indices] * relativas / 100).astype(int)
+
+    def indices_de(self, nomes):
+        """Nomes de cômodos -> array de índices (cômodo desconhecido vira o padrão)"""
+        padrao = self.indices[self.padrao]
+        return np.array([self.indices.get(nome, padrao) for nome in nomes])
+
+# Uma Geometria por arquivo de casa, carregada na primeira vez que é usada
+_geometrias = {}
+
+def carregar(caminho=CASA_PADRAO):
+    if caminho not in _geometrias:
+        with open(caminho, encoding='utf-8') as arquivo:
+            _geometrias[caminho] = Geometria(json.load(arquivo))
+    return _geometrias[caminho]
+
+def obter():
+    """Geometria da casa configurada no app (CASA_GEOMETRIA_PATH)"""
+    return carregar(current_app.config.get('CASA_GEOMETRIA_PATH', CASA_PADRAO))
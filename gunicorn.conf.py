@@ -0,0 +1,10 @@
+# gunicorn.conf.py
+# Lido automaticamente pelo gunicorn (gunicorn app:app, na pasta do projeto).
+#
+# Importar o app não liga nada: cada worker liga as tarefas de fundo depois
+# de nascer. Com --preload o app é importado no master, mas as threads do
+# scheduler só podem existir depois do fork, por isso é aqui e não no import.
+
+def post_worker_init(worker):
+    from app import start_background
+    start_background(worker.wsgi)
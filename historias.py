@@ -0,0 +1,371 @@
+# historias.py
+# Motor de histórias do Alter Ego.
+#
+# As histórias são lidas UMA vez da tabela Historia e viram um grafo em
+# memória: capítulos em ordem, partes indexadas e o ponteiro para o próximo
+# nó já calculado. Avançar na história vira uma consulta num dicionário.
+# O grafo é reconstruído quando o carimbo de histórias muda (invalidar_grafo).
+
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import namedtuple
+from datetime import datetime, date
+from flask import current_app
+from database import db
+from sqlalchemy import select, insert, update, func
+from models import TarefaDia, Historia, Config, USUARIO_PADRAO
+import carimbos
+
+# Pacote de histórias padrão (fonte única do texto das histórias)
+PACOTE_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados', 'historias.json')
+
+# Ordem em que os capítulos são contados
+ORDEM_CAPITULOS = ['inicio', 'lavanderia', 'cozinha', 'banheiro', 'sala',
+                   'quarto1', 'quarto2', 'garagem', 'varanda', 'moto',
+                   'reflexao', 'motivacional', 'noite', 'manha', 'final']
+
+# proximo: (capitulo, indice) do nó seguinte, ou None no fim da história
+# modelo: a frase já quebrada em pedaços fixos e placeholders (ModeloFrase)
+No = namedtuple('No', 'id capitulo indice parte frase modelo tarefa_necessaria emocao proximo')
+
+class ModeloFrase:
+    """Frase com {tarefa}/{contador} pré-processada: renderizar é só juntar pedaços"""
+    PLACEHOLDER = re.compile(r'(\{tarefa\}|\{contador\})')
+
+    def __init__(self, texto):
+        self.texto = texto
+        self.pedacos = tuple(p for p in self.PLACEHOLDER.split(texto) if p)
+        self.usa_tarefa = '{tarefa}' in self.pedacos
+        self.usa_contador = '{contador}' in self.pedacos
+
+    def renderizar(self, tarefa=None, contador=None):
+        valores = {'{tarefa}': tarefa, '{contador}': contador}
+        return ''.join(
+            valores[p] if p in valores and valores[p] is not None else p
+            for p in self.pedacos
+        )
+
+class Baralho:
+    """Sorteio sem repetição: embaralha, tira uma por vez e só repete depois de usar todas"""
+
+    def __init__(self, itens):
+        self._itens = list(itens)
+        self._monte = []
+        self._ultimo = None
+        self._trava = threading.Lock()
+
+    def tirar(self):
+        if not self._itens:
+            return None
+        with self._trava:
+            if not self._monte:
+                self._monte = self._itens[:]
+                random.shuffle(self._monte)
+                # Não repete a última carta logo na virada do baralho
+                if len(self._monte) > 1 and self._monte[-1] is self._ultimo:
+                    self._monte[0], self._monte[-1] = self._monte[-1], self._monte[0]
+            self._ultimo = self._monte.pop()
+            return self._ultimo
+
+class GrafoHistorias:
+    """Histórias indexadas por (capítulo, índice da parte dentro do capítulo)"""
+
+    def __init__(self, historias):
+        por_capitulo = {}
+        for historia in historias:
+            por_capitulo.setdefault(historia.capitulo, []).append(historia)
+
+        # Capítulos fora da ordem conhecida vão para o fim, em ordem alfabética
+        extras = sorted(c for c in por_capitulo if c not in ORDEM_CAPITULOS)
+        self.capitulos = [c for c in ORDEM_CAPITULOS if c in por_capitulo] + extras
+
+        # Lista plana na ordem de narração; o próximo de cada nó é o seguinte da lista
+        sequencia = []
+        for capitulo in self.capitulos:
+            partes = sorted(por_capitulo[capitulo], key=lambda h: (h.parte or 0, h.id))
+            for indice, historia in enumerate(partes):
+                sequencia.append((capitulo, indice, historia))
+
+        self._nos = {}
+        self._primeiro = {}
+        self._por_capitulo = {}
+        for posicao, (capitulo, indice, historia) in enumerate(sequencia):
+            seguinte = sequencia[posicao + 1] if posicao + 1 < len(sequencia) else None
+            no = No(
+                id=historia.id,
+                capitulo=capitulo,
+                indice=indice,
+                parte=historia.parte,
+                frase=historia.frase,
+                modelo=ModeloFrase(historia.frase),
+                tarefa_necessaria=historia.tarefa_necessaria,
+                emocao=historia.emocao,
+                proximo=(seguinte[0], seguinte[1]) if seguinte else None
+            )
+            self._nos[(capitulo, indice)] = no
+            self._primeiro.setdefault(capitulo, no)
+            self._por_capitulo.setdefault(capitulo, []).append(no)
+        self._baralhos = {}
+        self._trava = threading.Lock()
+
+    def no(self, capitulo, indice):
+        """Nó na posição (capítulo, índice) ou None"""
+        return self._nos.get((capitulo, indice))
+
+    def no_atual(self, capitulo, indice):
+        """Nó onde o cursor está; se o capítulo já acabou, o primeiro do capítulo seguinte"""
+        no = self._nos.get((capitulo, indice))
+        if no is not None or capitulo not in self._primeiro:
+            return no
+        # Cursor além do fim do capítulo (progresso antigo): segue para o próximo capítulo
+        posicao = self.capitulos.index(capitulo)
+        if posicao + 1 < len(self.capitulos):
+            return self._primeiro[self.capitulos[posicao + 1]]
+        return None
+
+    def baralho(self, capitulo):
+        """Baralho (sorteio sem repetição) com os nós de um capítulo"""
+        baralho = self._baralhos.get(capitulo)
+        if baralho is None:
+            with self._trava:
+                baralho = self._baralhos.setdefault(
+                    capitulo, Baralho(self._por_capitulo.get(capitulo, [])))
+        return baralho
+
+# ========== CACHE DO GRAFO ==========
+
+_grafo = {'versao': None, 'grafo': None}
+
+def obter_grafo():
+    """Grafo das histórias (consulta o banco só quando o carimbo de histórias mudou)"""
+    versao = carimbos.ler(current_app.config['HISTORIAS_VERSAO_PATH'])
+    if _grafo['versao'] != versao or _grafo['grafo'] is None:
+        # Linhas, não objetos do ORM: com 100 mil histórias monta em ~2/3 do tempo
+        _grafo['grafo'] = GrafoHistorias(db.session.execute(select(
+            Historia.id, Historia.capitulo, Historia.parte, Historia.frase,
+            Historia.tarefa_necessaria, Historia.emocao
+        )).all())
+        _grafo['versao'] = versao
+    return _grafo['grafo']
+
+def invalidar_grafo():
+    """Chamar sempre que as histórias do banco forem (re)carregadas"""
+    carimbos.marcar(current_app.config['HISTORIAS_VERSAO_PATH'])
+
+# ========== PACOTE DE HISTÓRIAS ==========
+# O pacote é um JSON versionado. Carregar compara o hash do arquivo com o do
+# último carregamento (guardado em Config) e, se mudou, faz o diff contra o
+# banco com UMA consulta e grava tudo em lote numa única transação.
+
+def ler_pacote(caminho=PACOTE_PADRAO):
+    """Retorna (hash, versão, lista de histórias) do arquivo do pacote"""
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    pacote = json.loads(conteudo)
+    historias = [
+        {
+            'capitulo': capitulo['capitulo'],
+            'parte': historia['parte'],
+            'frase': historia['frase'],
+            'tarefa_necessaria': historia.get('tarefa'),
+            'emocao': historia.get('emocao', 'normal'),
+        }
+        for capitulo in pacote['capitulos']
+        for historia in capitulo['historias']
+    ]
+    return hashlib.sha256(conteudo).hexdigest(), pacote.get('versao', 1), historias
+
+def carregar_pacote(caminho=PACOTE_PADRAO, forcar=False):
+    """Carrega o pacote no banco (idempotente). Retorna quantas histórias foram gravadas"""
+    inicio = time.perf_counter()
+    hash_pacote, versao, historias = ler_pacote(caminho)
+
+    registro = Config.query.filter_by(chave='pacote_historias').first()
+    if registro and registro.valor == hash_pacote and not forcar:
+        print(f"📚 Pacote de histórias v{versao} já carregado (nada a fazer)")
+        return 0
+
+    existentes = {
+        (capitulo, parte): (historia_id, frase, tarefa, emocao)
+        for historia_id, capitulo, parte, frase, tarefa, emocao in db.session.execute(select(
+            Historia.id, Historia.capitulo, Historia.parte,
+            Historia.frase, Historia.tarefa_necessaria, Historia.emocao
+        ))
+    }
+
+    novas, alteradas = [], []
+    for historia in historias:
+        atual = existentes.get((historia['capitulo'], historia['parte']))
+        if atual is None:
+            novas.append(historia)
+        elif atual[1:] != (historia['frase'], historia['tarefa_necessaria'], historia['emocao']):
+            alteradas.append({'id': atual[0], **historia})
+
+    if novas:
+        db.session.execute(insert(Historia), novas)
+    if alteradas:
+        db.session.execute(update(Historia), alteradas)
+    if registro:
+        registro.valor = hash_pacote
+    else:
+        db.session.add(Config(chave='pacote_historias', valor=hash_pacote))
+    db.session.commit()
+
+    if novas or alteradas:
+        invalidar_grafo()
+    duracao = (time.perf_counter() - inicio) * 1000
+    print(f"✅ Pacote de histórias v{versao}: {len(historias)} no arquivo, "
+          f"{len(novas)} novas, {len(alteradas)} atualizadas ({duracao:.0f} ms)")
+    return len(novas) + len(alteradas)
+
+# ========== FRASES ==========
+
+def _tarefa_pendente(usuario_id):
+    return TarefaDia.query.filter_by(usuario_id=usuario_id, data=date.today(), concluida=False).first()
+
+def _contador(usuario_id):
+    return TarefaDia.query.filter_by(usuario_id=usuario_id, data=date.today(), concluida=True).count()
+
+def renderizar(no, usuario_id, tarefa_pendente=None, contador=None):
+    """Preenche {contador} e {tarefa} do nó (só consulta o banco se a frase usar)"""
+    modelo = no.modelo
+    tarefa = None
+    if modelo.usa_contador:
+        contador = str(_contador(usuario_id) if contador is None else contador)
+    if modelo.usa_tarefa:
+        tarefa_pendente = tarefa_pendente or _tarefa_pendente(usuario_id)
+        if tarefa_pendente:
+            tarefa = f'"{tarefa_pendente.tarefa.descricao}"'
+    return modelo.renderizar(tarefa=tarefa, contador=contador)
+
+def get_frase_motivacional(usuario_id=USUARIO_PADRAO):
+    """Retorna uma frase motivacional aleatória (sem repetir até usar todas)"""
+    return frases_motivacionais([usuario_id])[usuario_id]
+
+def frases_motivacionais(usuario_ids):
+    """Uma frase motivacional para cada usuário, buscando tarefas e contadores do lote de uma vez.
+
+    Usado pelo tick do Alter Ego: no máximo duas consultas por lote, não por usuário.
+    """
+    baralho = obter_grafo().baralho('motivacional')
+    nos = {usuario_id: baralho.tirar() for usuario_id in usuario_ids}
+
+    hoje = date.today()
+    com_tarefa = [u for u, no in nos.items() if no is not None and no.modelo.usa_tarefa]
+    com_contador = [u for u, no in nos.items() if no is not None and no.modelo.usa_contador]
+    pendentes, contadores = {}, {}
+    if com_tarefa:
+        # A primeira pendente de cada usuário (menor id), como em _tarefa_pendente
+        for tarefa_dia in TarefaDia.query.options(db.joinedload(TarefaDia.tarefa)).filter(
+                TarefaDia.usuario_id.in_(com_tarefa), TarefaDia.data == hoje,
+                TarefaDia.concluida == False).order_by(TarefaDia.id.desc()):
+            pendentes[tarefa_dia.usuario_id] = tarefa_dia
+    if com_contador:
+        contadores = dict(db.session.execute(
+            select(TarefaDia.usuario_id, func.count()).where(
+                TarefaDia.usuario_id.in_(com_contador), TarefaDia.data == hoje,
+                TarefaDia.concluida == True
+            ).group_by(TarefaDia.usuario_id)).all())
+
+    frases = {}
+    for usuario_id, no in nos.items():
+        if no is None:
+            frases[usuario_id] = "Você consegue! Vamos nessa!"
+        elif no.modelo.usa_tarefa and usuario_id not in pendentes:
+            frases[usuario_id] = "Parabéns! Você completou todas as tarefas! Merece descanso."
+        else:
+            frases[usuario_id] = renderizar(no, usuario_id, pendentes.get(usuario_id),
+                                            contadores.get(usuario_id, 0))
+    return frases
+
+# ========== PROGRESSO DO ALTER EGO ==========
+# O progresso é um cursor (historia_atual, parte_atual) mais um bitset com os
+# IDs das histórias já contadas: leitura O(1) e tamanho limitado pelo maior ID.
+
+def marcar_vista(vistas, historia_id):
+    """Liga o bit do ID no bitset (bytes) e devolve o bitset novo"""
+    byte, bit = divmod(historia_id, 8)
+    bits = bytearray(vistas or b'')
+    if len(bits) <= byte:
+        bits.extend(b'\x00' * (byte + 1 - len(bits)))
+    bits[byte] |= 1 << bit
+    return bytes(bits)
+
+def foi_vista(vistas, historia_id):
+    byte, bit = divmod(historia_id, 8)
+    return bool(vistas) and byte < len(vistas) and bool(vistas[byte] & (1 << bit))
+
+def total_vistas(vistas):
+    return sum(bin(b).count('1') for b in vistas or b'')
+
+def no_atual(alter):
+    """Parte da história que o Alter Ego vai contar agora (None se acabou)"""
+    if alter.historia_atual == 'completa':
+        return None
+    return obter_grafo().no_atual(alter.historia_atual, alter.parte_atual or 0)
+
+def avancar(alter, no):
+    """Marca o nó como contado e move o cursor para o nó seguinte"""
+    alter.historias_vistas = marcar_vista(alter.historias_vistas, no.id)
+    if no.proximo is None:
+        alter.historia_atual = 'completa'
+        alter.parte_atual = 0
+    else:
+        alter.historia_atual, alter.parte_atual = no.proximo
+
+def reiniciar(alter):
+    """Volta a história para o começo"""
+    alter.historia_atual = 'inicio'
+    alter.parte_atual = 0
+    alter.historias_vistas = None
+    alter.tarefa_desbloqueio = 0
+
+def proxima_fala(alter):
+    """Conta a próxima parte da história (clique no personagem)"""
+    no = no_atual(alter)
+    if no is None:
+        # Se não tem história nova, fala algo motivacional
+        return {'frase': get_frase_motivacional(alter.usuario_id), 'precisa_tarefa': False, 'emocao': 'motivador'}
+
+    if no.tarefa_necessaria == 'tarefa':
+        # A história só continua depois de uma tarefa pendente
+        tarefa_pendente = _tarefa_pendente(alter.usuario_id)
+        if not tarefa_pendente:
+            return {'frase': get_frase_motivacional(alter.usuario_id), 'precisa_tarefa': False, 'emocao': 'motivador'}
+        alter.tarefa_desbloqueio = tarefa_pendente.id
+        db.session.commit()
+        return {'frase': renderizar(no, alter.usuario_id, tarefa_pendente), 'precisa_tarefa': True, 'emocao': no.emocao}
+
+    avancar(alter, no)
+    db.session.commit()
+    return {'frase': renderizar(no, alter.usuario_id), 'precisa_tarefa': False, 'emocao': no.emocao}
+
+def desbloquear(alter, tarefa_dia_id):
+    """Tarefa concluída: se era a que destravava a história, passa do bloqueio e conta a parte seguinte.
+
+    Retorna a frase contada (ou None se a tarefa não destravava nada).
+    """
+    if not alter or not alter.tarefa_desbloqueio or alter.tarefa_desbloqueio != tarefa_dia_id:
+        return None
+
+    alter.tarefa_desbloqueio = 0
+    no = no_atual(alter)
+    if no is not None and no.tarefa_necessaria == 'tarefa':
+        avancar(alter, no)
+        no = no_atual(alter)
+
+    frase = None
+    if no is not None and not no.tarefa_necessaria:
+        avancar(alter, no)
+        frase = renderizar(no, alter.usuario_id)
+        # Salva a frase para mostrar
+        alter.ultima_frase = frase
+        alter.ultima_interacao = datetime.utcnow()
+
+    db.session.commit()
+    return frase
@@ -0,0 +1,244 @@
+# metricas.py
+# Métricas do processo no formato de texto do Prometheus, em /metrics.
+#
+# O que é medido:
+#   - requisições: contagem por rota/método/status e histograma de latência por rota
+#   - agendador: duração de cada tick, ticks e erros por tarefa (agendador.tick_do_lider)
+#   - banco: conexões do pool (tamanho, em uso, livres, overflow) de cada processo
+#   - uploads: fotos recebidas (novas ou repetidas) e bytes recebidos
+#
+# Com vários workers cada processo só conhece os próprios números. Com
+# DUAL_YOU_METRICAS_DIR apontando para uma pasta compartilhada, cada processo
+# (workers e o `python -m agendador`) grava ali um retrato dos seus números a
+# cada INTERVALO_GRAVACAO segundos, e /metrics soma os retratos de todos.
+# Contadores de processos que já morreram continuam somando (não voltam para
+# trás); os medidores do pool só aparecem para processos vivos.
+# A pasta deve ser esvaziada ao implantar, antes de subir o gunicorn.
+#
+# DUAL_YOU_METRICAS_TOKEN: se definido, /metrics exige "Authorization: Bearer <token>".
+#
+# Para ver o que está na pasta compartilhada sem subir o app:
+#   python metricas.py
+
+import os
+import json
+import time
+import glob
+import atexit
+import threading
+from collections import defaultdict
+from flask import g, request, Response, abort
+
+BALDES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BALDES_TICK = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 15, 60, 300)
+INTERVALO_GRAVACAO = 5  # segundos entre retratos gravados na pasta compartilhada
+
+# nome -> (tipo, ajuda, baldes dos histogramas)
+METRICAS = {
+    'dual_you_http_requests_total': ('counter', 'Requisições atendidas', None),
+    'dual_you_http_request_duration_seconds': ('histogram', 'Latência das requisições por rota', BALDES_LATENCIA),
+    'dual_you_agendador_ticks_total': ('counter', 'Ticks executados pelo agendador', None),
+    'dual_you_agendador_erros_total': ('counter', 'Ticks do agendador que terminaram em erro', None),
+    'dual_you_agendador_tick_duration_seconds': ('histogram', 'Duração dos ticks do agendador', BALDES_TICK),
+    'dual_you_uploads_total': ('counter', 'Fotos recebidas (nova ou repetida)', None),
+    'dual_you_upload_bytes_total': ('counter', 'Bytes de fotos recebidos', None),
+    'dual_you_db_pool_conexoes': ('gauge', 'Conexões do pool do banco por estado', None),
+}
+
+_trava = threading.Lock()
+_trava_gravacao = threading.Lock()  # duas threads não trocam o mesmo temporário ao mesmo tempo
+_contadores = defaultdict(float)  # (nome, rótulos) -> valor
+_histogramas = {}                 # (nome, rótulos) -> [contagem por balde..., +Inf], soma
+_inicio = time.time()
+_pool = None
+_pasta = None
+_ultima_gravacao = 0.0
+
+def _rotulos(rotulos):
+    return tuple(sorted((chave, str(valor)) for chave, valor in rotulos.items()))
+
+# ========== REGISTRO ==========
+
+def contar(nome, valor=1, **rotulos):
+    with _trava:
+        _contadores[(nome, _rotulos(rotulos))] += valor
+
+def observar(nome, valor, **rotulos):
+    """Soma uma observação ao histograma (cada balde conta só o seu intervalo; a exposição acumula)"""
+    baldes = METRICAS[nome][2]
+    indice = next((i for i, limite in enumerate(baldes) if valor <= limite), len(baldes))
+    with _trava:
+        contagens, soma = _histogramas.get((nome, _rotulos(rotulos))) or ([0] * (len(baldes) + 1), 0.0)
+        contagens[indice] += 1
+        _histogramas[(nome, _rotulos(rotulos))] = (contagens, soma + valor)
+
+def registrar_tick(tarefa, segundos, erro=False):
+    """Chamado pelo agendador depois de cada execução de uma tarefa"""
+    contar('dual_you_agendador_ticks_total', tarefa=tarefa)
+    if erro:
+        contar('dual_you_agendador_erros_total', tarefa=tarefa)
+    observar('dual_you_agendador_tick_duration_seconds', segundos, tarefa=tarefa)
+    # O processo do agendador não atende requisições: grava o retrato aqui
+    gravar_se_preciso()
+
+def medidores_do_pool():
+    """[(nome, rótulos, valor)] do pool de conexões deste processo"""
+    if _pool is None:
+        return []
+    medidores = []
+    for estado, metodo in (('tamanho', 'size'), ('em_uso', 'checkedout'),
+                           ('livres', 'checkedin'), ('overflow', 'overflow')):
+        # Pools sem esses números (SQLite em memória) simplesmente não aparecem
+        if hasattr(_pool, metodo):
+            medidores.append(('dual_you_db_pool_conexoes', _rotulos({'estado': estado}), getattr(_pool, metodo)()))
+    return medidores
+
+# ========== RETRATOS (VÁRIOS PROCESSOS) ==========
+
+def retrato():
+    """Números deste processo, serializáveis em JSON"""
+    with _trava:
+        contadores = [[nome, rotulos, valor] for (nome, rotulos), valor in _contadores.items()]
+        histogramas = [[nome, rotulos, list(contagens), soma]
+                       for (nome, rotulos), (contagens, soma) in _histogramas.items()]
+    return {'pid': os.getpid(), 'contadores': contadores, 'histogramas': histogramas,
+            'medidores': [list(medidor) for medidor in medidores_do_pool()]}
+
+def _arquivo_do_processo():
+    # pid + início: um worker novo que reaproveite o pid não apaga os números do antigo
+    return os.path.join(_pasta, f"{os.getpid()}-{int(_inicio)}.json")
+
+def gravar():
+    """Grava o retrato deste processo na pasta compartilhada (troca atômica)"""
+    global _ultima_gravacao
+    if not _pasta:
+        return
+    with _trava_gravacao:
+        _ultima_gravacao = time.monotonic()
+        destino = _arquivo_do_processo()
+        temporario = f"{destino}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(retrato(), arquivo)
+        os.replace(temporario, destino)
+
+def gravar_se_preciso():
+    if _pasta and time.monotonic() - _ultima_gravacao >= INTERVALO_GRAVACAO:
+        gravar()
+
+def _vivo(pid):
+    if os.name == 'nt':  # no Windows os.kill encerraria o processo: considera vivo
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # existe, mas é de outro usuário
+        return True
+    return True
+
+def retratos_da_pasta(pasta):
+    retratos = []
+    for caminho in glob.glob(os.path.join(pasta, '*.json')):
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                retratos.append(json.load(arquivo))
+        except (OSError, ValueError):
+            continue  # apagado ou sendo trocado agora: entra no próximo scrape
+    return retratos
+
+# ========== EXPOSIÇÃO ==========
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _formatar_rotulos(rotulos, extra=()):
+    pares = [(chave, valor) for chave, valor in rotulos] + list(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in pares) + '}'
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) and not valor.is_integer() else str(int(valor))
+
+def exposicao(retratos):
+    """Texto no formato do Prometheus com a soma dos retratos"""
+    contadores = defaultdict(float)
+    histogramas = {}
+    medidores = {}
+    for dados in retratos:
+        for nome, rotulos, valor in dados['contadores']:
+            contadores[(nome, tuple(map(tuple, rotulos)))] += valor
+        for nome, rotulos, contagens, soma in dados['histogramas']:
+            chave = (nome, tuple(map(tuple, rotulos)))
+            somadas, soma_total = histogramas.get(chave) or ([0] * len(contagens), 0.0)
+            histogramas[chave] = ([a + b for a, b in zip(somadas, contagens)], soma_total + soma)
+        if dados['pid'] == os.getpid() or _vivo(dados['pid']):
+            for nome, rotulos, valor in dados['medidores']:
+                medidores[(nome, tuple(map(tuple, rotulos)) + (('pid', str(dados['pid'])),))] = valor
+
+    linhas = []
+    for nome, (tipo, ajuda, baldes) in METRICAS.items():
+        linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+        if tipo == 'histogram':
+            for (metrica, rotulos), (contagens, soma) in sorted(histogramas.items()):
+                if metrica != nome:
+                    continue
+                acumulado = 0
+                for limite, contagem in zip(list(baldes) + ['+Inf'], contagens):
+                    acumulado += contagem
+                    linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, [('le', limite)])} {acumulado}")
+                linhas.append(f"{nome}_sum{_formatar_rotulos(rotulos)} {_numero(soma)}")
+                linhas.append(f"{nome}_count{_formatar_rotulos(rotulos)} {acumulado}")
+        else:
+            valores = contadores if tipo == 'counter' else medidores
+            for (metrica, rotulos), valor in sorted(valores.items()):
+                if metrica == nome:
+                    linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {_numero(valor)}")
+    return '\n'.join(linhas) + '\n'
+
+def init_app(app, db):
+    """Mede as requisições e registra /metrics (chamar depois de db.init_app)"""
+    global _pool, _pasta
+    with app.app_context():
+        _pool = db.engine.pool
+    _pasta = app.config.get('METRICAS_DIR')
+    if _pasta:
+        os.makedirs(_pasta, exist_ok=True)
+        atexit.register(gravar)
+
+    @app.before_request
+    def iniciar_cronometro():
+        g.metricas_inicio = time.perf_counter()
+
+    @app.after_request
+    def medir_requisicao(resposta):
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is None:
+            return resposta
+        # Rota inexistente vira um rótulo só (o caminho deixaria a cardinalidade sem limite)
+        rota = request.endpoint or 'sem_rota'
+        contar('dual_you_http_requests_total', rota=rota, metodo=request.method, status=resposta.status_code)
+        observar('dual_you_http_request_duration_seconds', time.perf_counter() - inicio, rota=rota)
+        gravar_se_preciso()
+        return resposta
+
+    @app.route('/metrics')
+    def metricas():
+        token = app.config.get('METRICAS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(401)
+        if _pasta:
+            gravar()  # o deste processo sai atualizado; os outros têm até INTERVALO_GRAVACAO segundos
+            retratos = retratos_da_pasta(_pasta)
+        else:
+            retratos = [retrato()]
+        return Response(exposicao(retratos), mimetype='text/plain; version=0.0.4')
+
+if __name__ == '__main__':
+    import sys
+    pasta = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('DUAL_YOU_METRICAS_DIR')
+    if not pasta:
+        sys.exit("Uso: python metricas.py <pasta> (ou DUAL_YOU_METRICAS_DIR)")
+    retratos = retratos_da_pasta(pasta)
+    print(exposicao(retratos), end='')
+    print(f"# 📈 {len(retratos)} processo(s) em {pasta}", file=sys.stderr)
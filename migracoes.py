@@ -0,0 +1,210 @@
+# migracoes.py
+# Migrações versionadas e NÃO destrutivas do banco de dados.
+# Atualiza um dual_you.db existente sem perder diário, gratidão nem histórias.
+# Comando: python migracoes.py
+
+from sqlalchemy import text, inspect, bindparam
+from database import db
+
+# ========== MIGRAÇÕES ==========
+# Cada migração recebe uma conexão já dentro de transação.
+# Bancos criados do zero com db.create_all() já nascem na última versão.
+
+def _m001_indices(conexao):
+    """Índices compostos de TarefaDia e Historia"""
+    # Antes do índice único: remove ocorrências duplicadas do mesmo dia,
+    # mantendo a concluída (ou a mais antiga)
+    conexao.execute(text("""
+        DELETE FROM tarefa_dia WHERE EXISTS (
+            SELECT 1 FROM tarefa_dia outra
+            WHERE outra.data = tarefa_dia.data
+              AND outra.tarefa_id = tarefa_dia.tarefa_id
+              AND (CASE WHEN outra.concluida THEN 1 ELSE 0 END > CASE WHEN tarefa_dia.concluida THEN 1 ELSE 0 END
+                   OR (CASE WHEN outra.concluida THEN 1 ELSE 0 END = CASE WHEN tarefa_dia.concluida THEN 1 ELSE 0 END
+                       AND outra.id < tarefa_dia.id))
+        )
+    """))
+    conexao.execute(text("""
+        DELETE FROM historia WHERE EXISTS (
+            SELECT 1 FROM historia outra
+            WHERE outra.capitulo = historia.capitulo
+              AND outra.parte = historia.parte
+              AND outra.id < historia.id
+        )
+    """))
+    conexao.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_tarefa_dia_data_tarefa ON tarefa_dia (data, tarefa_id)"))
+    conexao.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_tarefa_dia_data_concluida ON tarefa_dia (data, concluida)"))
+    conexao.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_historia_capitulo_parte ON historia (capitulo, parte)"))
+
+def _adicionar_coluna(conexao, tabela, nome, tipo, padrao=None):
+    """ALTER TABLE ... ADD COLUMN se a coluna ainda não existir"""
+    colunas = {c['name'] for c in inspect(conexao).get_columns(tabela)}
+    if nome in colunas:
+        return False
+    ddl = f"ALTER TABLE {tabela} ADD COLUMN {nome} {tipo.compile(dialect=conexao.dialect)}"
+    if padrao is not None:
+        ddl += f" DEFAULT {padrao}"
+    conexao.execute(text(ddl))
+    return True
+
+def _m002_cursor_historias(conexao):
+    """historias_contadas (CSV) vira cursor parte_atual + bitset historias_vistas"""
+    from historias import marcar_vista
+
+    _adicionar_coluna(conexao, 'alter_ego', 'parte_atual', db.Integer(), padrao=0)
+    _adicionar_coluna(conexao, 'alter_ego', 'historias_vistas', db.LargeBinary())
+
+    colunas = {c['name'] for c in inspect(conexao).get_columns('alter_ego')}
+    if 'historias_contadas' not in colunas:
+        return
+
+    ids_das_partes = text(
+        "SELECT id FROM historia WHERE capitulo = :capitulo AND parte IN :partes"
+    ).bindparams(bindparam('partes', expanding=True))
+
+    alter_egos = conexao.execute(text(
+        "SELECT id, historia_atual, historias_contadas FROM alter_ego"
+    )).fetchall()
+    for alter_id, capitulo, contadas in alter_egos:
+        partes = [int(p) for p in (contadas or '').split(',') if p.strip().isdigit()]
+        vistas = None
+        if partes:
+            for (historia_id,) in conexao.execute(ids_das_partes, {'capitulo': capitulo, 'partes': partes}):
+                vistas = marcar_vista(vistas, historia_id)
+        # O CSV deixa de ser usado: zera para não ocupar espaço
+        conexao.execute(text(
+            "UPDATE alter_ego SET parte_atual = :parte, historias_vistas = :vistas, "
+            "historias_contadas = NULL WHERE id = :id"
+        ), {'parte': len(partes), 'vistas': vistas, 'id': alter_id})
+
+def _m003_indices_paginacao(conexao):
+    """Índices (data, id) para a paginação do diário e dos momentos"""
+    conexao.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_conquista_data_id ON conquista (data, id)"))
+    conexao.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_momento_gratidao_data_id ON momento_gratidao (data, id)"))
+    conexao.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_momento_gratidao_tipo_data_id ON momento_gratidao (tipo, data, id)"))
+
+# Tabelas que ganharam dono em _m004_usuarios
+TABELAS_DO_USUARIO = ('tarefa', 'tarefa_dia', 'conquista', 'momento_gratidao', 'alter_ego')
+
+def _criar_usuario_padrao(conexao):
+    """Usuário 1, dono dos dados de quando o app tinha um usuário só"""
+    from models import USUARIO_PADRAO
+    conexao.execute(text(
+        "INSERT INTO usuario (id, nome, criado_em) "
+        "SELECT :id, 'eu', CURRENT_TIMESTAMP WHERE NOT EXISTS (SELECT 1 FROM usuario WHERE id = :id)"
+    ), {'id': USUARIO_PADRAO})
+
+def _m004_usuarios(conexao):
+    """Dono (usuario_id) em todos os dados; o que já existe vai para o usuário padrão"""
+    from models import USUARIO_PADRAO
+    # A tabela usuario já foi criada pelo create_all de migrar()
+    _criar_usuario_padrao(conexao)
+    for tabela in TABELAS_DO_USUARIO:
+        _adicionar_coluna(conexao, tabela, 'usuario_id', db.Integer(), padrao=USUARIO_PADRAO)
+        conexao.execute(text(f"UPDATE {tabela} SET usuario_id = :id WHERE usuario_id IS NULL"),
+                        {'id': USUARIO_PADRAO})
+
+    # Antes só existia um Alter Ego de verdade (o primeiro): apaga sobras antes do índice único
+    conexao.execute(text("DELETE FROM alter_ego WHERE id > (SELECT MIN(id) FROM alter_ego)"))
+
+    # Índices por usuário substituem os globais
+    for indice in ('ix_tarefa_dia_data_concluida', 'ix_conquista_data_id',
+                   'ix_momento_gratidao_data_id', 'ix_momento_gratidao_tipo_data_id'):
+        conexao.execute(text(f"DROP INDEX IF EXISTS {indice}"))
+    conexao.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_tarefa_usuario_dia ON tarefa (usuario_id, dia_semana)"))
+    conexao.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_tarefa_dia_usuario_data_concluida ON tarefa_dia (usuario_id, data, concluida)"))
+    conexao.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_conquista_usuario_data_id ON conquista (usuario_id, data, id)"))
+    conexao.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_momento_gratidao_usuario_data_id ON momento_gratidao (usuario_id, data, id)"))
+    conexao.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_momento_gratidao_usuario_tipo_data_id "
+        "ON momento_gratidao (usuario_id, tipo, data, id)"))
+    conexao.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_alter_ego_usuario ON alter_ego (usuario_id)"))
+
+def _m005_indices_fotos(conexao):
+    """Índices em foto: as fotos iguais são um arquivo só, apagado quando ninguém mais usa"""
+    conexao.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_conquista_foto ON conquista (foto)"))
+    conexao.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_momento_gratidao_foto ON momento_gratidao (foto)"))
+
+def _m006_estatisticas(conexao):
+    """Resumo diário (EstatisticaDia) preenchido a partir de TarefaDia"""
+    import estatisticas
+    from models import EstatisticaDia
+    EstatisticaDia.__table__.create(conexao, checkfirst=True)
+    estatisticas.reconstruir(conexao)
+
+MIGRACOES = [
+    (1, 'Índices compostos de TarefaDia e Historia', _m001_indices),
+    (2, 'Cursor de progresso das histórias do Alter Ego', _m002_cursor_historias),
+    (3, 'Índices de paginação do diário e dos momentos', _m003_indices_paginacao),
+    (4, 'Usuários: dono em todos os dados e índices por usuário', _m004_usuarios),
+    (5, 'Índices das fotos (arquivos compartilhados por conteúdo)', _m005_indices_fotos),
+    (6, 'Resumo diário das tarefas e pontos', _m006_estatisticas),
+]
+
+VERSAO_MAIS_RECENTE = MIGRACOES[-1][0]
+
+# ========== EXECUTOR ==========
+
+def _garantir_tabela_versao(conexao):
+    conexao.execute(text("CREATE TABLE IF NOT EXISTS versao_esquema (versao INTEGER NOT NULL)"))
+
+def versao_atual(conexao):
+    """Última migração aplicada (0 se nenhuma)"""
+    _garantir_tabela_versao(conexao)
+    return conexao.execute(text("SELECT COALESCE(MAX(versao), 0) FROM versao_esquema")).scalar()
+
+def _registrar_versao(conexao, versao):
+    _garantir_tabela_versao(conexao)
+    conexao.execute(text("DELETE FROM versao_esquema"))
+    conexao.execute(text("INSERT INTO versao_esquema (versao) VALUES (:versao)"), {'versao': versao})
+
+def migrar():
+    """Cria as tabelas que faltam e aplica as migrações pendentes (precisa de app_context)"""
+    import models  # registra as tabelas para o create_all (scripts não importam o app)
+
+    engine = db.engine
+    banco_novo = not inspect(engine).has_table('tarefa')
+    db.create_all()
+
+    with engine.begin() as conexao:
+        if banco_novo:
+            # create_all já criou tudo no formato mais recente
+            _criar_usuario_padrao(conexao)
+            _registrar_versao(conexao, VERSAO_MAIS_RECENTE)
+            return VERSAO_MAIS_RECENTE
+        atual = versao_atual(conexao)
+
+    for versao, descricao, funcao in MIGRACOES:
+        if versao <= atual:
+            continue
+        # Uma transação por migração: se falhar, o banco fica na versão anterior
+        with engine.begin() as conexao:
+            funcao(conexao)
+            _registrar_versao(conexao, versao)
+        print(f"✅ Migração {versao} aplicada: {descricao}")
+        atual = versao
+    return atual
+
+if __name__ == '__main__':
+    from fabrica import contexto_cli
+    from historias import carregar_pacote
+
+    with contexto_cli():
+        versao = migrar()
+        # Uma vez por implantação (render.yaml roda este script antes do gunicorn):
+        # os workers só leem o grafo do banco, sob demanda, e nunca o pacote
+        carregar_pacote()
+    print(f"🗄️  Banco na versão {versao}")
@@ -1,8 +1,31 @@
 from database import db
 from datetime import datetime
+from werkzeug.security import generate_password_hash, check_password_hash
+import geometria
+
+# Dono dos dados quando o app roda com um único usuário (MULTIUSUARIO desligado)
+USUARIO_PADRAO = 1
+
+class Usuario(db.Model):
+    """Pessoa que usa o app: todas as tarefas, diários e o Alter Ego pertencem a um usuário"""
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(80), unique=True, nullable=False)
+    senha_hash = db.Column(db.String(255), nullable=True)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def definir_senha(self, senha):
+        self.senha_hash = generate_password_hash(senha)
+    
+    def confere_senha(self, senha):
+        return bool(self.senha_hash) and check_password_hash(self.senha_hash, senha)
 
 class Tarefa(db.Model):
+    __table_args__ = (
+        db.Index('ix_tarefa_usuario_dia', 'usuario_id', 'dia_semana'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False, default=USUARIO_PADRAO)
     descricao = db.Column(db.String(200), nullable=False)
     dia_semana = db.Column(db.String(20), nullable=False)
     concluida_robo = db.Column(db.Boolean, default=False)
@@ -14,15 +37,44 @@ class Tarefa(db.Model):
     conquistas = db.relationship('Conquista', backref='tarefa_ref', lazy=True, foreign_keys='Conquista.tarefa_id')
 
 class TarefaDia(db.Model):
+    # Uma ocorrência por tarefa por dia (permite materializar o dia sem duplicar)
+    # Índices criados em bancos antigos por migracoes.py
+    __table_args__ = (
+        db.Index('uq_tarefa_dia_data_tarefa', 'data', 'tarefa_id', unique=True),
+        db.Index('ix_tarefa_dia_usuario_data_concluida', 'usuario_id', 'data', 'concluida'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False, default=USUARIO_PADRAO)
     data = db.Column(db.Date, nullable=False)
     tarefa_id = db.Column(db.Integer, db.ForeignKey('tarefa.id'), nullable=False)
     concluida = db.Column(db.Boolean, default=False)
     concluida_em = db.Column(db.DateTime, nullable=True)
     tarefa = db.relationship('Tarefa', backref='ocorrencias_ref', foreign_keys=[tarefa_id])
 
+class EstatisticaDia(db.Model):
+    """Resumo das tarefas de um usuário num dia (mantido por estatisticas.py)"""
+    __table_args__ = (
+        db.Index('uq_estatistica_dia_usuario_data', 'usuario_id', 'data', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False, default=USUARIO_PADRAO)
+    data = db.Column(db.Date, nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    concluidas = db.Column(db.Integer, nullable=False, default=0)
+    pontos = db.Column(db.Integer, nullable=False, default=0)
+
 class Conquista(db.Model):
+    # Paginação por cursor (data, id) do diário de cada usuário (paginacao.py)
+    # e contagem de referências das fotos compartilhadas (uploads.fotos_em_uso)
+    __table_args__ = (
+        db.Index('ix_conquista_usuario_data_id', 'usuario_id', 'data', 'id'),
+        db.Index('ix_conquista_foto', 'foto'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False, default=USUARIO_PADRAO)
     data = db.Column(db.Date, nullable=False, default=datetime.utcnow)
     tarefa_id = db.Column(db.Integer, db.ForeignKey('tarefa.id'), nullable=False)
     descricao = db.Column(db.String(300))
@@ -32,7 +84,16 @@ class Conquista(db.Model):
     tarefa = db.relationship('Tarefa', backref='conquistas_ref', foreign_keys=[tarefa_id])
 
 class MomentoGratidao(db.Model):
+    # Paginação por cursor (data, id) da gratidão e dos importantes de cada usuário (paginacao.py)
+    # e contagem de referências das fotos compartilhadas (uploads.fotos_em_uso)
+    __table_args__ = (
+        db.Index('ix_momento_gratidao_usuario_data_id', 'usuario_id', 'data', 'id'),
+        db.Index('ix_momento_gratidao_usuario_tipo_data_id', 'usuario_id', 'tipo', 'data', 'id'),
+        db.Index('ix_momento_gratidao_foto', 'foto'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False, default=USUARIO_PADRAO)
     data = db.Column(db.Date, nullable=False, default=datetime.utcnow)
     titulo = db.Column(db.String(200), nullable=False)
     descricao = db.Column(db.Text)
@@ -46,7 +107,13 @@ class Config(db.Model):
     valor = db.Column(db.String(200))
 
 class AlterEgo(db.Model):
+    # Um Alter Ego por usuário
+    __table_args__ = (
+        db.Index('uq_alter_ego_usuario', 'usuario_id', unique=True),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False, default=USUARIO_PADRAO)
     nome = db.Column(db.String(50), default='Alter Ego')
     nivel = db.Column(db.Integer, default=1)
     ambiente = db.Column(db.String(50), default='sala')
@@ -62,31 +129,22 @@ class AlterEgo(db.Model):
     estado = db.Column(db.String(50), default='acordado')
     
     # NOVO: Sistema de histórias
+    # Cursor do progresso: (capítulo atual, índice da parte dentro do capítulo)
     historia_atual = db.Column(db.String(50), default='inicio')
+    parte_atual = db.Column(db.Integer, default=0)
     tarefa_desbloqueio = db.Column(db.Integer, default=0)  # ID da tarefa que desbloqueia próxima parte
-    historias_contadas = db.Column(db.Text, default='')  # Lista de histórias já contadas
+    historias_vistas = db.Column(db.LargeBinary, nullable=True)  # Bitset dos IDs de Historia já contados
     
     def get_coordenadas_absolutas(self):
-        ambientes = {
-            'lavanderia': {'x_min': 0, 'x_max': 682, 'y_min': 0, 'y_max': 682},
-            'cozinha': {'x_min': 682, 'x_max': 1364, 'y_min': 0, 'y_max': 682},
-            'banheiro': {'x_min': 1364, 'x_max': 2048, 'y_min': 0, 'y_max': 682},
-            'sala': {'x_min': 0, 'x_max': 682, 'y_min': 682, 'y_max': 1364},
-            'quarto1': {'x_min': 682, 'x_max': 1364, 'y_min': 682, 'y_max': 1364},
-            'quarto2': {'x_min': 1364, 'x_max': 2048, 'y_min': 682, 'y_max': 1364},
-            'garagem': {'x_min': 0, 'x_max': 682, 'y_min': 1364, 'y_max': 2048},
-            'varanda': {'x_min': 682, 'x_max': 1364, 'y_min': 1364, 'y_max': 2048},
-            'area_moto': {'x_min': 1364, 'x_max': 2048, 'y_min': 1364, 'y_max': 2048}
-        }
-        ambiente = ambientes.get(self.ambiente, ambientes['sala'])
-        largura = ambiente['x_max'] - ambiente['x_min']
-        altura = ambiente['y_max'] - ambiente['y_min']
-        x_abs = ambiente['x_min'] + (largura * self.x_relativo / 100)
-        y_abs = ambiente['y_min'] + (altura * self.y_relativo / 100)
-        return int(x_abs), int(y_abs)
+        """Posição em pixels da imagem da casa (tabela de cômodos em geometria.py)"""
+        return geometria.obter().absolutas(self.ambiente, self.x_relativo, self.y_relativo)
 
 class Historia(db.Model):
     """Histórias do Alter Ego"""
+    __table_args__ = (
+        db.Index('uq_historia_capitulo_parte', 'capitulo', 'parte', unique=True),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     capitulo = db.Column(db.String(50), nullable=False)  # inicio, desenvolvimento, climax, etc
     parte = db.Column(db.Integer, default=1)
@@ -97,44 +155,9 @@ class Historia(db.Model):
     
     @classmethod
     def carregar_historias_padrao(cls):
-        historias = [
-            # CAPÍTULO 1 - INÍCIO
-            ('inicio', 1, 'Preciso que você termine uma tarefa para eu te contar uma coisa...', None, 'misterioso'),
-            ('inicio', 2, 'Ah, você terminou! Sabe, eu lembro quando comecei minha primeira tarefa também...', None, 'nostalgico'),
-            ('inicio', 3, 'Te conto o resto quando você terminar "{tarefa}"!', None, 'motivador'),
-            
-            # CAPÍTULO 2 - O SEGREDO
-            ('segredo', 1, 'Você notou que eu me mexo pela casa? Tenho meus motivos...', None, 'misterioso'),
-            ('segredo', 2, 'Cada ambiente me lembra uma história. Na cozinha, por exemplo...', None, 'nostalgico'),
-            ('segredo', 3, 'Quer saber o que aconteceu na cozinha? Termina "{tarefa}" que eu conto!', None, 'motivador'),
-            
-            # CAPÍTULO 3 - AVENTURA
-            ('aventura', 1, 'Hoje eu quase saí de casa! Fui até a varanda...', None, 'animado'),
-            ('aventura', 2, 'Lá fora tem um mundo inteiro esperando. Mas primeiro, precisamos terminar nossas tarefas!', None, 'motivador'),
-            ('aventura', 3, 'Quando você terminar "{tarefa}", te conto o que vi da varanda!', None, 'misterioso'),
-            
-            # FRASES MOTIVACIONAIS (quando não tem história nova)
-            ('motivacional', 1, 'Você não está esquecendo de algo? "{tarefa}" ainda te espera...', None, 'lembrete'),
-            ('motivacional', 2, 'Divida suas tarefas em pequenas partes. Um passo de cada vez.', None, 'motivador'),
-            ('motivacional', 3, 'Sabe aquela tarefa "{tarefa}"? Ela vai ser tão boa quando terminar!', None, 'animado'),
-            ('motivacional', 4, 'Estou aqui, vendo você. E acreditando.', None, 'calmo'),
-            ('motivacional', 5, 'Já pensou como vai ser o alívio quando terminar tudo?', None, 'sonhador'),
-            ('motivacional', 6, 'Você consegue. Eu sei que consegue.', None, 'motivador'),
-            ('motivacional', 7, 'Respira fundo. Uma coisa de cada vez.', None, 'calmo'),
-            ('motivacional', 8, 'Cada tarefa concluída é um passo mais perto dos seus sonhos.', None, 'inspirador'),
-        ]
-        
-        for capitulo, parte, frase, tarefa, emocao in historias:
-            existe = cls.query.filter_by(capitulo=capitulo, parte=parte).first()
-            if not existe:
-                db.session.add(cls(
-                    capitulo=capitulo,
-                    parte=parte,
-                    frase=frase,
-                    tarefa_necessaria=tarefa,
-                    emocao=emocao
-                ))
-        db.session.commit()
+        """Carrega o pacote de histórias padrão (dados/historias.json)"""
+        from historias import carregar_pacote
+        return carregar_pacote()
 
 AMBIENTES_INFO = {
     'lavanderia': {'nome': 'Lavanderia', 'icone': '🧺', 'acoes': ['lavando roupa', 'estendendo roupa', 'dobrando roupa']},
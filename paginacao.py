@@ -0,0 +1,55 @@
+# paginacao.py
+# Paginação por cursor (keyset) do diário e dos momentos.
+#
+# Em vez de OFFSET, cada página continua de onde a anterior parou usando a
+# chave (data, id) do último item: o banco desce direto pelo índice
+# (data, id) e o custo de uma página não depende do tamanho do histórico.
+
+from datetime import date
+from sqlalchemy import or_, and_
+
+TAMANHO_PAGINA = 30
+TAMANHO_MAXIMO = 100
+
+def codificar_cursor(item):
+    """Cursor da página seguinte a partir do último item: '2025-01-31.123'"""
+    return f"{item.data.isoformat()}.{item.id}"
+
+def decodificar_cursor(cursor):
+    """'2025-01-31.123' -> (date, id); None se vazio ou inválido (volta ao início)"""
+    if not cursor:
+        return None
+    try:
+        data, id_ = cursor.split('.', 1)
+        return date.fromisoformat(data), int(id_)
+    except ValueError:
+        return None
+
+def tamanho_pedido(valor):
+    """Tamanho de página vindo da query string, limitado a TAMANHO_MAXIMO"""
+    try:
+        return max(1, min(int(valor), TAMANHO_MAXIMO))
+    except (TypeError, ValueError):
+        return TAMANHO_PAGINA
+
+def pagina(consulta, modelo, cursor=None, tamanho=TAMANHO_PAGINA):
+    """Uma página da consulta em ordem (data, id) decrescente.
+
+    Retorna (itens, proximo_cursor); proximo_cursor é None na última página.
+    """
+    posicao = decodificar_cursor(cursor)
+    if posicao:
+        data, id_ = posicao
+        # `data <= :data` é redundante com o OR, mas é o que o SQLite usa como
+        # limite da busca no índice: sem ele a página do fundo percorre todas
+        # as anteriores (benchmarks/paginacao.py)
+        consulta = consulta.filter(modelo.data <= data, or_(
+            modelo.data < data,
+            and_(modelo.data == data, modelo.id < id_)
+        ))
+    # Um item a mais só para saber se existe próxima página
+    itens = consulta.order_by(modelo.data.desc(), modelo.id.desc()).limit(tamanho + 1).all()
+    if len(itens) > tamanho:
+        itens = itens[:tamanho]
+        return itens, codificar_cursor(itens[-1])
+    return itens, None
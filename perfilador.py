@@ -0,0 +1,183 @@
+# perfilador.py
+# Quantas consultas SQL cada requisição faz e quanto tempo passam no banco.
+#
+# Ligado com DUAL_YOU_PERFILADOR=1 (ou app.testing):
+#   - cada resposta ganha o cabeçalho Server-Timing (aparece no DevTools, aba Network/Timing)
+#   - /debug/queries mostra as últimas requisições e o resumo por rota
+#   - a mesma consulta repetida muitas vezes numa requisição (N+1) é avisada no log
+#   - rota que passa do ORCAMENTOS é avisada; em modo estrito (testes) a requisição falha
+#
+# Para conferir todas as páginas contra os orçamentos:
+#   python perfilador.py
+
+import re
+import time
+from collections import deque, defaultdict
+from flask import g, request, jsonify, abort, has_request_context
+from sqlalchemy import event
+
+# Máximo de consultas por endpoint (quem não está aqui só é medido).
+# Valores medidos (tests/test_perfilador.py), no pior caso de cada rota: a página
+# inicial na primeira visita do dia (materializar as tarefas, somar no resumo e
+# criar o Alter Ego), o Alter Ego na primeira consulta (cria e relê o registro) e
+# a história parada numa tarefa na primeira fala do processo (carrega o grafo).
+# As listas são uma consulta só (cursor + joinedload).
+ORCAMENTOS = {
+    'index': 8,
+    'planejamento': 2,
+    'api_planejamento': 2,
+    'diario': 1,
+    'api_diario': 1,
+    'gratidao': 1,
+    'api_gratidao': 1,
+    'importantes': 1,
+    'api_importantes': 1,
+    'pagina_estatisticas': 1,
+    'api_estatisticas': 1,
+    'api_alterego': 4,
+    'api_alterego_historia': 5,
+    'api_casa': 0,
+    'pacote': 0,
+    'service_worker': 0,
+}
+
+LIMITE_REPETICAO = 5   # mesma consulta (só mudam os parâmetros) N vezes = provável N+1
+HISTORICO = 200        # requisições guardadas para /debug/queries
+
+# Controle de transação (savepoints do SQLAlchemy) não é consulta: não conta
+CONTROLE_TRANSACAO = re.compile(r'\s*(SAVEPOINT|RELEASE\b|ROLLBACK TO\b)', re.IGNORECASE)
+
+# Rotas GET que `python perfilador.py` não visita (arquivos, stream longo, logout)
+FORA_DA_CONFERENCIA = {'static', 'debug_queries', 'api_alterego_stream', 'sair'}
+
+class OrcamentoEstourado(AssertionError):
+    """Rota fez mais consultas que o orçamento (só levantada no modo estrito)"""
+
+_ultimas = deque(maxlen=HISTORICO)
+_por_rota = defaultdict(lambda: {'requisicoes': 0, 'consultas': 0, 'maximo': 0, 'ms_banco': 0.0})
+
+def impressao_digital(sql):
+    """Forma normalizada da consulta: sem espaços extras e com IN (?, ?, ...) virando IN (?)"""
+    sql = re.sub(r'\s+', ' ', sql).strip()
+    sql = re.sub(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)', '(?)', sql)
+    sql = re.sub(r'\b\d+\b', 'N', sql)
+    return sql
+
+# ========== EVENTOS DO SQLALCHEMY ==========
+
+def _medindo():
+    # Fora de requisição (scheduler, scripts, threads de fundo) ou desligado: não mede
+    return has_request_context() and 'perfil' in g
+
+def _antes(conexao, cursor, sql, parametros, contexto, executemany):
+    if _medindo():
+        conexao.info.setdefault('perfil_inicio', []).append(time.perf_counter())
+
+def _depois(conexao, cursor, sql, parametros, contexto, executemany):
+    if _medindo() and conexao.info.get('perfil_inicio'):
+        inicio = conexao.info['perfil_inicio'].pop()
+        if CONTROLE_TRANSACAO.match(sql):
+            return
+        g.perfil['consultas'].append((sql, (time.perf_counter() - inicio) * 1000))
+
+# ========== RESUMO DA REQUISIÇÃO ==========
+
+def resumo(perfil):
+    """{'consultas', 'ms_banco', 'repetidas': [(vezes, sql)]} de uma requisição"""
+    contagem = defaultdict(int)
+    for sql, _ in perfil['consultas']:
+        contagem[impressao_digital(sql)] += 1
+    repetidas = sorted(((vezes, sql) for sql, vezes in contagem.items() if vezes >= LIMITE_REPETICAO),
+                       reverse=True)
+    return {
+        'consultas': len(perfil['consultas']),
+        'ms_banco': round(sum(ms for _, ms in perfil['consultas']), 2),
+        'repetidas': repetidas,
+    }
+
+def relatorio():
+    """Conteúdo de /debug/queries"""
+    rotas = {rota: dict(dados, media=round(dados['consultas'] / dados['requisicoes'], 1),
+                        orcamento=ORCAMENTOS.get(rota))
+             for rota, dados in _por_rota.items()}
+    return {'rotas': rotas, 'ultimas': list(reversed(_ultimas))}
+
+def ligado(app):
+    return app.config.get('PERFILADOR') or app.testing
+
+def init_app(app, db):
+    """Instala o perfilador (chamar depois de db.init_app)
+
+    Só mede quando ligado(app): DUAL_YOU_PERFILADOR=1 ou app.testing, que pode
+    ser ligado depois do import (testes). Desligado, custa uma checagem por consulta.
+    """
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _antes)
+        event.listen(db.engine, 'after_cursor_execute', _depois)
+
+    @app.before_request
+    def iniciar_perfil():
+        if ligado(app):
+            g.perfil = {'consultas': [], 'inicio': time.perf_counter()}
+
+    @app.after_request
+    def fechar_perfil(resposta):
+        perfil = g.pop('perfil', None)
+        if perfil is None or request.endpoint == 'debug_queries':
+            return resposta
+        dados = resumo(perfil)
+        ms_total = (time.perf_counter() - perfil['inicio']) * 1000
+        resposta.headers.add('Server-Timing', f'db;dur={dados["ms_banco"]};desc="{dados["consultas"]} consultas"')
+        resposta.headers.add('Server-Timing', f'app;dur={ms_total:.2f}')
+
+        rota = request.endpoint or request.path
+        _ultimas.append(dict(dados, rota=rota, metodo=request.method, caminho=request.full_path.rstrip('?'),
+                             status=resposta.status_code, ms_total=round(ms_total, 2)))
+        acumulado = _por_rota[rota]
+        acumulado['requisicoes'] += 1
+        acumulado['consultas'] += dados['consultas']
+        acumulado['maximo'] = max(acumulado['maximo'], dados['consultas'])
+        acumulado['ms_banco'] = round(acumulado['ms_banco'] + dados['ms_banco'], 2)
+
+        for vezes, sql in dados['repetidas']:
+            print(f"⚠️  N+1? {rota}: {vezes}x {sql[:120]}")
+        orcamento = ORCAMENTOS.get(rota)
+        if orcamento is not None and dados['consultas'] > orcamento:
+            mensagem = f"{rota} fez {dados['consultas']} consultas (orçamento: {orcamento})"
+            if app.config.get('PERFILADOR_ESTRITO', app.testing):
+                raise OrcamentoEstourado(mensagem)
+            print(f"⚠️  {mensagem}")
+        return resposta
+
+    @app.route('/debug/queries')
+    def debug_queries():
+        if not ligado(app):
+            abort(404)
+        return jsonify(relatorio())
+
+if __name__ == '__main__':
+    import os
+    import sys
+    os.environ['DUAL_YOU_PERFILADOR'] = '1'
+    from app import app
+    import migracoes
+    # O app registrou o módulo importado (não este __main__): o relatório é o dele
+    from perfilador import relatorio, FORA_DA_CONFERENCIA
+
+    with app.app_context():
+        migracoes.migrar()
+
+    cliente = app.test_client()
+    estourou = False
+    for regra in sorted(app.url_map.iter_rules(), key=lambda regra: regra.rule):
+        if 'GET' not in regra.methods or regra.arguments or regra.endpoint in FORA_DA_CONFERENCIA:
+            continue
+        cliente.get(regra.rule)
+    for rota, dados in sorted(relatorio()['rotas'].items()):
+        orcamento = dados['orcamento']
+        passou_do_limite = orcamento is not None and dados['maximo'] > orcamento
+        estourou |= passou_do_limite
+        marca = '❌' if passou_do_limite else '✅'
+        print(f"{marca} {rota:<22} {dados['maximo']:>3} consultas (orçamento: "
+              f"{'-' if orcamento is None else orcamento}), {dados['ms_banco']:.1f} ms no banco")
+    sys.exit(1 if estourou else 0)
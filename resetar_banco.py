@@ -1,17 +1,19 @@
 # resetar_banco.py
-from app import app, db
-from models import FraseMotivacional
+from fabrica import contexto_cli
+from database import db
+import migracoes
+from historias import carregar_pacote
 
 print("🔄 Recriando banco de dados...")
 
-with app.app_context():
+with contexto_cli():
     # Apaga tudo e recria
     db.drop_all()
-    db.create_all()
+    migracoes.migrar()
     print("✅ Tabelas recriadas!")
     
-    # Carrega as frases
-    FraseMotivacional.carregar_frases_padrao()
+    # Carrega as histórias (inclui as frases motivacionais)
+    carregar_pacote()
     print("✅ Frases carregadas!")
     
-print("🎉 Banco de dados pronto!")
\ No newline at end of file
+print("🎉 Banco de dados pronto!")
@@ -0,0 +1,102 @@
+# simulacao.py
+# Movimento dos Alter Egos de todos os usuários num passo vetorizado.
+#
+# Em cada tick as posições de todos os Alter Egos vão para arrays NumPy
+# (uma consulta), mudança de ambiente, passinhos e limites são calculados de
+# uma vez para todos e o resultado volta ao banco num único UPDATE em lote
+# (executemany). Com um gerador com semente o passo é determinístico.
+
+from datetime import datetime
+import numpy as np
+from sqlalchemy import select, update, bindparam
+from database import db
+from models import AlterEgo, AMBIENTES_INFO
+import historias
+
+AMBIENTES = tuple(AMBIENTES_INFO)
+_INDICE_AMBIENTE = {nome: i for i, nome in enumerate(AMBIENTES)}
+
+CHANCE_TROCAR_AMBIENTE = 0.2   # 20% de chance de mudar de ambiente
+CHANCE_FALAR = 0.15            # 15% de chance de falar algo motivacional
+PASSO_MAXIMO = 3               # pequenos movimentos: -3..3 (% do cômodo)
+LIMITES = (20, 80)             # não encosta nas paredes
+FAIXA_NOVO_AMBIENTE = (30, 70) # onde aparece ao entrar num cômodo
+
+# Usuários por consulta ao renderizar as frases de quem fala
+LOTE_FRASES = 500
+
+_gerador = np.random.default_rng()
+
+def gerador(semente=None):
+    """Gerador de números aleatórios (com semente: sempre o mesmo movimento)"""
+    return np.random.default_rng(semente)
+
+def passo(ambientes, x, y, rng):
+    """Um tick para todos os Alter Egos.
+
+    ambientes são índices em AMBIENTES; x e y em % do cômodo.
+    Retorna (ambientes, x, y, falam) novos, todos arrays do mesmo tamanho.
+    """
+    n = len(x)
+    troca = rng.random(n) < CHANCE_TROCAR_AMBIENTE
+    novo_ambiente = rng.integers(0, len(AMBIENTES), n)
+    novo_x = rng.integers(FAIXA_NOVO_AMBIENTE[0], FAIXA_NOVO_AMBIENTE[1] + 1, n)
+    novo_y = rng.integers(FAIXA_NOVO_AMBIENTE[0], FAIXA_NOVO_AMBIENTE[1] + 1, n)
+    x_movido = np.clip(x + rng.integers(-PASSO_MAXIMO, PASSO_MAXIMO + 1, n), *LIMITES)
+    y_movido = np.clip(y + rng.integers(-PASSO_MAXIMO, PASSO_MAXIMO + 1, n), *LIMITES)
+    falam = rng.random(n) < CHANCE_FALAR
+    return (np.where(troca, novo_ambiente, ambientes),
+            np.where(troca, novo_x, x_movido),
+            np.where(troca, novo_y, y_movido),
+            falam)
+
+def carregar_posicoes():
+    """(ids, usuario_ids, ambientes, x, y) de todos os Alter Egos numa consulta"""
+    linhas = db.session.execute(select(
+        AlterEgo.id, AlterEgo.usuario_id, AlterEgo.ambiente, AlterEgo.x_relativo, AlterEgo.y_relativo
+    )).all()
+    if not linhas:
+        return None
+    ids, usuarios, ambientes, x, y = zip(*linhas)
+    sala = _INDICE_AMBIENTE['sala']
+    return (np.array(ids), np.array(usuarios),
+            np.array([_INDICE_AMBIENTE.get(a, sala) for a in ambientes]),
+            np.array([50 if v is None else v for v in x]),
+            np.array([50 if v is None else v for v in y]))
+
+def _frases(usuario_ids):
+    frases = {}
+    for inicio in range(0, len(usuario_ids), LOTE_FRASES):
+        frases.update(historias.frases_motivacionais(usuario_ids[inicio:inicio + LOTE_FRASES]))
+    return frases
+
+def executar_tick(rng=None):
+    """Move todos os Alter Egos e grava. Retorna quantos foram atualizados"""
+    posicoes = carregar_posicoes()
+    if posicoes is None:
+        return 0
+    ids, usuarios, ambientes, x, y = posicoes
+    ambientes, x, y, falam = passo(ambientes, x, y, rng or _gerador)
+
+    agora = datetime.utcnow()
+    tabela = AlterEgo.__table__
+    nomes = [AMBIENTES[i] for i in ambientes.tolist()]
+    db.session.execute(
+        update(tabela).where(tabela.c.id == bindparam('b_id')).values(
+            ambiente=bindparam('b_ambiente'), x_relativo=bindparam('b_x'),
+            y_relativo=bindparam('b_y'), ultima_acao=agora),
+        [{'b_id': i, 'b_ambiente': a, 'b_x': px, 'b_y': py}
+         for i, a, px, py in zip(ids.tolist(), nomes, x.tolist(), y.tolist())]
+    )
+
+    # Quem fala neste tick ganha frase nova (consultas em lotes de usuários)
+    if falam.any():
+        frases = _frases(usuarios[falam].tolist())
+        db.session.execute(
+            update(tabela).where(tabela.c.id == bindparam('b_id')).values(
+                ultima_frase=bindparam('b_frase'), ultima_interacao=agora),
+            [{'b_id': i, 'b_frase': frases[u]}
+             for i, u in zip(ids[falam].tolist(), usuarios[falam].tolist())]
+        )
+    db.session.commit()
+    return len(ids)
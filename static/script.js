@@ -125,170 +125,231 @@ function posicionarBalao(bolha, personagemX, personagemY, container) {
     return { x: bolhaX, y: bolhaY };
 }
 
-function atualizarSerumaninho() {
-    fetch('/api/alterego')
+let estadoAlter = null;
+let etagAlter = null;
+// Cômodos da casa em pixels da imagem (/api/casa): o servidor manda só % do cômodo
+let geometriaCasa = null;
+
+function carregarGeometriaCasa(container) {
+    return fetch(container.dataset.geometria)
         .then(response => response.json())
+        .then(geometria => { geometriaCasa = geometria; })
+        .catch(error => console.error('Erro ao carregar a geometria da casa:', error));
+}
+
+// Posição do personagem em pixels da imagem (cômodo + % dentro dele)
+function posicaoNaImagem(data) {
+    if (!geometriaCasa) return null;
+    const comodo = geometriaCasa.ambientes[data.ambiente] || geometriaCasa.ambientes[geometriaCasa.padrao];
+    return {
+        x: comodo.x_min + (comodo.x_max - comodo.x_min) * data.x_relativo / 100,
+        y: comodo.y_min + (comodo.y_max - comodo.y_min) * data.y_relativo / 100
+    };
+}
+
+// Busca o estado com requisição condicional: se nada mudou o servidor
+// responde 304 sem corpo e sem ir ao banco
+function atualizarSerumaninho() {
+    const headers = etagAlter ? { 'If-None-Match': etagAlter } : {};
+    fetch('/api/alterego?coordenadas=relativas', { headers: headers, cache: 'no-store' })
+        .then(response => {
+            if (response.status === 304) return null;
+            etagAlter = response.headers.get('ETag');
+            return response.json();
+        })
         .then(data => {
-            const personagem = document.getElementById('alter-personagem');
-            const container = document.getElementById('casa-container');
-            
-            if (!personagem || !container) return;
-            
-            // ===== 1. POSICIONAMENTO PERFEITO =====
-            const containerImg = container.querySelector('img');
-            if (!containerImg) return;
-            
-            const containerWidth = containerImg.offsetWidth;
-            const containerHeight = containerImg.offsetHeight;
-            
-            // Escala exata (imagem 2048x2048)
-            const escalaX = containerWidth / 2048;
-            const escalaY = containerHeight / 2048;
-            
-            // Coordenadas absolutas com limites de segurança
-            let x = Math.max(20, Math.min(containerWidth - 20, data.x_absoluto * escalaX));
-            let y = Math.max(20, Math.min(containerHeight - 20, data.y_absoluto * escalaY));
-            
-            // Suaviza movimento (evita teleportes bruscos)
-            if (ultimaPosicao.x && Math.abs(x - ultimaPosicao.x) > 50) {
-                x = ultimaPosicao.x + (x - ultimaPosicao.x) * 0.3;
-            }
-            if (ultimaPosicao.y && Math.abs(y - ultimaPosicao.y) > 50) {
-                y = ultimaPosicao.y + (y - ultimaPosicao.y) * 0.3;
-            }
-            
-            personagem.style.left = x + 'px';
-            personagem.style.top = y + 'px';
-            
-            ultimaPosicao = { x, y };
-            
-            // ===== 2. APLICAR HUMOR (COR E ANIMAÇÃO) =====
-            personagem.className = '';
-            personagem.classList.add(`humor-${data.humor}`);
-            
-            // ===== 3. ATUALIZAR STATUS =====
-            const alterPontos = document.getElementById('alter-pontos');
-            if (alterPontos) alterPontos.innerText = data.pontos + ' pts';
-            
-            // Barra de energia
-            const energiaBar = document.getElementById('alter-energia-bar');
-            if (energiaBar) {
-                energiaBar.style.width = data.energia + '%';
-                if (data.energia < 30) energiaBar.style.background = '#f44336';
-                else if (data.energia < 60) energiaBar.style.background = '#ff9800';
-                else energiaBar.style.background = '#4CAF50';
-            }
-            
-            // Textos de status
-            const ambienteEl = document.getElementById('alter-ambiente');
-            const acaoEl = document.getElementById('alter-acao');
-            const humorEl = document.getElementById('alter-humor');
-            const humorEmoji = document.getElementById('alter-humor-emoji');
-            const tarefasEl = document.getElementById('alter-tarefas');
-            
-            if (ambienteEl) ambienteEl.innerText = data.ambiente_nome;
-            if (acaoEl) acaoEl.innerText = data.acao;
-            if (humorEl) humorEl.innerText = data.humor;
-            if (humorEmoji) humorEmoji.innerText = data.humor_emoji;
-            if (tarefasEl) tarefasEl.innerText = `${data.tarefas_concluidas}/${data.tarefas_pendentes}`;
+            if (!data) return;
+            estadoAlter = data;
+            aplicarEstadoAlter(estadoAlter);
+        })
+        .catch(error => console.error('Erro ao atualizar Serumaninho:', error));
+}
+
+// Recebe por Server-Sent Events apenas os campos que mudaram
+function conectarStreamAlter() {
+    const fonte = new EventSource('/api/alterego/stream?coordenadas=relativas');
+    fonte.onmessage = function(evento) {
+        estadoAlter = Object.assign(estadoAlter || {}, JSON.parse(evento.data));
+        aplicarEstadoAlter(estadoAlter);
+    };
+    fonte.onerror = function() {
+        // Se o navegador desistir de reconectar, volta para o polling condicional
+        if (fonte.readyState === EventSource.CLOSED) {
+            iniciarPollingAlter();
+        }
+    };
+}
+
+function iniciarPollingAlter() {
+    // Primeira atualização após 500ms
+    setTimeout(atualizarSerumaninho, 500);
+    
+    // Atualiza a cada 3 segundos
+    setInterval(atualizarSerumaninho, 3000);
+}
+
+function aplicarEstadoAlter(data) {
+    const personagem = document.getElementById('alter-personagem');
+    const container = document.getElementById('casa-container');
+    
+    if (!personagem || !container) return;
+    
+    // ===== 1. POSICIONAMENTO PERFEITO =====
+    const containerImg = container.querySelector('img');
+    if (!containerImg) return;
+    
+    const containerWidth = containerImg.offsetWidth;
+    const containerHeight = containerImg.offsetHeight;
+    
+    const posicao = posicaoNaImagem(data);
+    if (!posicao) return;
+    
+    // Escala da imagem da casa para o tamanho na tela
+    const escalaX = containerWidth / geometriaCasa.largura;
+    const escalaY = containerHeight / geometriaCasa.altura;
+    
+    // Coordenadas com limites de segurança
+    let x = Math.max(20, Math.min(containerWidth - 20, posicao.x * escalaX));
+    let y = Math.max(20, Math.min(containerHeight - 20, posicao.y * escalaY));
+    
+    // Suaviza movimento (evita teleportes bruscos)
+    if (ultimaPosicao.x && Math.abs(x - ultimaPosicao.x) > 50) {
+        x = ultimaPosicao.x + (x - ultimaPosicao.x) * 0.3;
+    }
+    if (ultimaPosicao.y && Math.abs(y - ultimaPosicao.y) > 50) {
+        y = ultimaPosicao.y + (y - ultimaPosicao.y) * 0.3;
+    }
+    
+    personagem.style.left = x + 'px';
+    personagem.style.top = y + 'px';
+    
+    ultimaPosicao = { x, y };
+    
+    // ===== 2. APLICAR HUMOR (COR E ANIMAÇÃO) =====
+    personagem.className = '';
+    personagem.classList.add(`humor-${data.humor}`);
+    
+    // ===== 3. ATUALIZAR STATUS =====
+    const alterPontos = document.getElementById('alter-pontos');
+    if (alterPontos) alterPontos.innerText = data.pontos + ' pts';
+    
+    // Barra de energia
+    const energiaBar = document.getElementById('alter-energia-bar');
+    if (energiaBar) {
+        energiaBar.style.width = data.energia + '%';
+        if (data.energia < 30) energiaBar.style.background = '#f44336';
+        else if (data.energia < 60) energiaBar.style.background = '#ff9800';
+        else energiaBar.style.background = '#4CAF50';
+    }
+    
+    // Textos de status
+    const ambienteEl = document.getElementById('alter-ambiente');
+    const acaoEl = document.getElementById('alter-acao');
+    const humorEl = document.getElementById('alter-humor');
+    const humorEmoji = document.getElementById('alter-humor-emoji');
+    const tarefasEl = document.getElementById('alter-tarefas');
+    
+    if (ambienteEl) ambienteEl.innerText = data.ambiente_nome;
+    if (acaoEl) acaoEl.innerText = data.acao;
+    if (humorEl) humorEl.innerText = data.humor;
+    if (humorEmoji) humorEmoji.innerText = data.humor_emoji;
+    if (tarefasEl) tarefasEl.innerText = `${data.tarefas_concluidas}/${data.tarefas_pendentes}`;
+    
+    // ===== 4. CONTROLAR INDICADOR DE HISTÓRIA =====
+    const indicador = document.getElementById('historia-indicador');
+    if (indicador) {
+        if (data.tem_frase_nova) {
+            indicador.style.display = 'flex';
+        } else {
+            indicador.style.display = 'none';
+        }
+    }
+    
+    // ===== 5. MOSTRAR NOVA FRASE (COM BALÃO INTELIGENTE) =====
+    if (data.ultima_frase && data.ultima_frase !== ultimaFrase && data.tem_frase_nova) {
+        ultimaFrase = data.ultima_frase;
+        
+        const bolha = document.getElementById('alter-bolha');
+        const msg = document.getElementById('alter-mensagem');
+        const continuacao = document.getElementById('historia-continuacao');
+        const ultimaFraseContainer = document.getElementById('ultima-frase');
+        
+        if (bolha && msg) {
+            msg.innerText = data.ultima_frase;
             
-            // ===== 4. CONTROLAR INDICADOR DE HISTÓRIA =====
-            const indicador = document.getElementById('historia-indicador');
-            if (indicador) {
-                if (data.tem_frase_nova) {
-                    indicador.style.display = 'flex';
-                } else {
-                    indicador.style.display = 'none';
-                }
-            }
+            // Esconde continuacao (só aparece quando precisa de tarefa)
+            if (continuacao) continuacao.style.display = 'none';
             
-            // ===== 5. MOSTRAR NOVA FRASE (COM BALÃO INTELIGENTE) =====
-            if (data.ultima_frase && data.ultima_frase !== ultimaFrase && data.tem_frase_nova) {
-                ultimaFrase = data.ultima_frase;
-                
+            // POSICIONAMENTO INTELIGENTE
+            const posicao = posicionarBalao(bolha, x, y, container);
+            bolha.style.left = posicao.x + 'px';
+            bolha.style.top = posicao.y + 'px';
+            bolha.style.display = 'block';
+        }
+        
+        if (ultimaFraseContainer) {
+            ultimaFraseContainer.innerText = data.ultima_frase;
+        }
+        
+        // Remove balão após 8 segundos
+        if (fraseTimeout) clearTimeout(fraseTimeout);
+        fraseTimeout = setTimeout(() => {
+            const bolha = document.getElementById('alter-bolha');
+            if (bolha) bolha.style.display = 'none';
+        }, 8000);
+    }
+    
+    // ===== 6. INTERAÇÃO AO CLICAR NO PERSONAGEM =====
+    personagem.onclick = function() {
+        fetch('/api/alterego/historia')
+            .then(response => response.json())
+            .then(historiaData => {
                 const bolha = document.getElementById('alter-bolha');
                 const msg = document.getElementById('alter-mensagem');
                 const continuacao = document.getElementById('historia-continuacao');
-                const ultimaFraseContainer = document.getElementById('ultima-frase');
                 
                 if (bolha && msg) {
-                    msg.innerText = data.ultima_frase;
+                    msg.innerText = historiaData.frase;
                     
-                    // Esconde continuacao (só aparece quando precisa de tarefa)
-                    if (continuacao) continuacao.style.display = 'none';
+                    // Mostra continuacao se precisar de tarefa
+                    if (continuacao) {
+                        continuacao.style.display = historiaData.precisa_tarefa ? 'block' : 'none';
+                    }
                     
-                    // POSICIONAMENTO INTELIGENTE
+                    // POSICIONAMENTO INTELIGENTE PARA CLIQUE
                     const posicao = posicionarBalao(bolha, x, y, container);
                     bolha.style.left = posicao.x + 'px';
                     bolha.style.top = posicao.y + 'px';
                     bolha.style.display = 'block';
+                    
+                    // Remove balão após 10 segundos
+                    setTimeout(() => {
+                        bolha.style.display = 'none';
+                    }, 10000);
                 }
                 
+                // Atualiza última frase
+                const ultimaFraseContainer = document.getElementById('ultima-frase');
                 if (ultimaFraseContainer) {
-                    ultimaFraseContainer.innerText = data.ultima_frase;
+                    ultimaFraseContainer.innerText = historiaData.frase;
                 }
-                
-                // Remove balão após 8 segundos
-                if (fraseTimeout) clearTimeout(fraseTimeout);
-                fraseTimeout = setTimeout(() => {
-                    const bolha = document.getElementById('alter-bolha');
-                    if (bolha) bolha.style.display = 'none';
-                }, 8000);
-            }
-            
-            // ===== 6. INTERAÇÃO AO CLICAR NO PERSONAGEM =====
-            personagem.onclick = function() {
-                fetch('/api/alterego/historia')
-                    .then(response => response.json())
-                    .then(historiaData => {
-                        const bolha = document.getElementById('alter-bolha');
-                        const msg = document.getElementById('alter-mensagem');
-                        const continuacao = document.getElementById('historia-continuacao');
-                        
-                        if (bolha && msg) {
-                            msg.innerText = historiaData.frase;
-                            
-                            // Mostra continuacao se precisar de tarefa
-                            if (continuacao) {
-                                continuacao.style.display = historiaData.precisa_tarefa ? 'block' : 'none';
-                            }
-                            
-                            // POSICIONAMENTO INTELIGENTE PARA CLIQUE
-                            const posicao = posicionarBalao(bolha, x, y, container);
-                            bolha.style.left = posicao.x + 'px';
-                            bolha.style.top = posicao.y + 'px';
-                            bolha.style.display = 'block';
-                            
-                            // Remove balão após 10 segundos
-                            setTimeout(() => {
-                                bolha.style.display = 'none';
-                            }, 10000);
-                        }
-                        
-                        // Atualiza última frase
-                        const ultimaFraseContainer = document.getElementById('ultima-frase');
-                        if (ultimaFraseContainer) {
-                            ultimaFraseContainer.innerText = historiaData.frase;
-                        }
-                    })
-                    .catch(error => {
-                        console.error('Erro ao buscar história:', error);
-                        const bolha = document.getElementById('alter-bolha');
-                        const msg = document.getElementById('alter-mensagem');
-                        if (bolha && msg) {
-                            msg.innerText = 'Oops... Tente novamente!';
-                            const posicao = posicionarBalao(bolha, x, y, container);
-                            bolha.style.left = posicao.x + 'px';
-                            bolha.style.top = posicao.y + 'px';
-                            bolha.style.display = 'block';
-                            setTimeout(() => {
-                                bolha.style.display = 'none';
-                            }, 3000);
-                        }
-                    });
-            };
-        })
-        .catch(error => console.error('Erro ao atualizar Serumaninho:', error));
+            })
+            .catch(error => {
+                console.error('Erro ao buscar história:', error);
+                const bolha = document.getElementById('alter-bolha');
+                const msg = document.getElementById('alter-mensagem');
+                if (bolha && msg) {
+                    msg.innerText = 'Oops... Tente novamente!';
+                    const posicao = posicionarBalao(bolha, x, y, container);
+                    bolha.style.left = posicao.x + 'px';
+                    bolha.style.top = posicao.y + 'px';
+                    bolha.style.display = 'block';
+                    setTimeout(() => {
+                        bolha.style.display = 'none';
+                    }, 3000);
+                }
+            });
+    };
 }
 
 // ========================================
@@ -297,7 +358,7 @@ function atualizarSerumaninho() {
 
 if ('serviceWorker' in navigator) {
     window.addEventListener('load', function() {
-        navigator.serviceWorker.register('/static/sw.js').then(function(registration) {
+        navigator.serviceWorker.register('/sw.js').then(function(registration) {
             console.log('ServiceWorker registrado com sucesso: ', registration.scope);
         }, function(err) {
             console.log('Falha no registro do ServiceWorker: ', err);
@@ -440,18 +501,22 @@ document.head.appendChild(style);
 // ========================================
 
 // Inicia a atualização quando a página carrega
-if (document.getElementById('casa-container')) {
-    // Primeira atualização após 500ms
-    setTimeout(atualizarSerumaninho, 500);
-    
-    // Atualiza a cada 3 segundos
-    setInterval(atualizarSerumaninho, 3000);
+const casaContainer = document.getElementById('casa-container');
+if (casaContainer) {
+    // A geometria vem primeiro (fica no cache do navegador); depois o estado
+    carregarGeometriaCasa(casaContainer).then(() => {
+        if (casaContainer.dataset.stream === '1' && window.EventSource) {
+            conectarStreamAlter();
+        } else {
+            iniciarPollingAlter();
+        }
+    });
 }
 
-// Atualiza posição ao redimensionar a janela
+// Reposiciona ao redimensionar a janela (sem buscar de novo no servidor)
 window.addEventListener('resize', function() {
-    if (document.getElementById('casa-container')) {
-        atualizarSerumaninho();
+    if (document.getElementById('casa-container') && estadoAlter) {
+        aplicarEstadoAlter(estadoAlter);
     }
 });
 
@@ -525,4 +590,48 @@ window.addEventListener('online', () => {
     `;
     document.body.appendChild(onlineMsg);
     setTimeout(() => onlineMsg.remove(), 3000);
-});
\ No newline at end of file
+});
+
+// ========================================
+// ROLAGEM INFINITA (DIÁRIO E MOMENTOS)
+// ========================================
+
+function iniciarRolagemInfinita() {
+    const sentinela = document.querySelector('.carregar-mais');
+    if (!sentinela || !('IntersectionObserver' in window)) return;
+
+    const lista = document.getElementById(sentinela.dataset.lista);
+    let carregando = false;
+
+    const observador = new IntersectionObserver(async (entradas) => {
+        if (!entradas.some(e => e.isIntersecting) || carregando) return;
+        const url = sentinela.dataset.proxima;
+        if (!url) return;
+
+        carregando = true;
+        try {
+            const resposta = await fetch(url, { cache: 'no-store' });
+            if (!resposta.ok) return;
+            const pagina = await resposta.json();
+            lista.insertAdjacentHTML('beforeend', pagina.html);
+
+            if (pagina.proxima) {
+                sentinela.dataset.proxima = pagina.proxima;
+                // Reobserva: se a sentinela continuar visível, carrega mais uma
+                observador.unobserve(sentinela);
+                observador.observe(sentinela);
+            } else {
+                observador.disconnect();
+                sentinela.remove();
+            }
+        } catch (e) {
+            console.log('Erro ao carregar mais:', e);
+        } finally {
+            carregando = false;
+        }
+    }, { rootMargin: '400px 0px' });
+
+    observador.observe(sentinela);
+}
+
+document.addEventListener('DOMContentLoaded', iniciarRolagemInfinita);
@@ -1,92 +0,0 @@
-// Nome do cache - atualize quando fizer mudanças
-const CACHE_NAME = 'dual-you-cache-v1';
-
-// Arquivos para cache inicial
-const urlsToCache = [
-  '/',
-  '/static/style.css',
-  '/static/script.js',
-  '/static/manifest.json',
-  '/static/icons/icon-72x72.png',
-  '/static/icons/icon-96x96.png',
-  '/static/icons/icon-128x128.png',
-  '/static/icons/icon-144x144.png',
-  '/static/icons/icon-152x152.png',
-  '/static/icons/icon-192x192.png',
-  '/static/icons/icon-384x384.png',
-  '/static/icons/icon-512x512.png',
-  '/background.jpg',
-  '/alter.png'
-];
-
-// Instalação - cache dos arquivos iniciais
-self.addEventListener('install', event => {
-  console.log('Service Worker: instalando...');
-  event.waitUntil(
-    caches.open(CACHE_NAME)
-      .then(cache => {
-        console.log('Cache aberto');
-        return cache.addAll(urlsToCache);
-      })
-      .then(() => self.skipWaiting())
-  );
-});
-
-// Ativação - limpa caches antigos
-self.addEventListener('activate', event => {
-  console.log('Service Worker: ativando...');
-  event.waitUntil(
-    caches.keys().then(cacheNames => {
-      return Promise.all(
-        cacheNames.map(cacheName => {
-          if (cacheName !== CACHE_NAME) {
-            console.log('Removendo cache antigo:', cacheName);
-            return caches.delete(cacheName);
-          }
-        })
-      );
-    }).then(() => self.clients.claim())
-  );
-});
-
-// Intercepta requisições - estratégia "stale-while-revalidate"
-self.addEventListener('fetch', event => {
-  // Ignora requisições de API
-  if (event.request.url.includes('/api/')) {
-    return;
-  }
-  
-  event.respondWith(
-    caches.match(event.request)
-      .then(response => {
-        if (response) {
-          // Busca atualização em segundo plano
-          fetch(event.request).then(networkResponse => {
-            if (networkResponse.status === 200) {
-              caches.open(CACHE_NAME).then(cache => {
-                cache.put(event.request, networkResponse);
-              });
-            }
-          }).catch(() => {});
-          return response;
-        }
-        
-        // Não está no cache, busca da rede
-        return fetch(event.request).then(networkResponse => {
-          // Cache da nova resposta (apenas se for bem-sucedida)
-          if (networkResponse.status === 200) {
-            const responseClone = networkResponse.clone();
-            caches.open(CACHE_NAME).then(cache => {
-              cache.put(event.request, responseClone);
-            });
-          }
-          return networkResponse;
-        }).catch(() => {
-          // Offline fallback
-          if (event.request.mode === 'navigate') {
-            return caches.match('/');
-          }
-        });
-      })
-  );
-});
\ No newline at end of file
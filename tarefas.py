@@ -0,0 +1,86 @@
+# tarefas.py
+# Serviços das tarefas do dia
+
+from datetime import timedelta
+from sqlalchemy import select, insert, exists, or_, literal, func, case
+from sqlalchemy.exc import IntegrityError
+from database import db
+from models import Tarefa, TarefaDia
+import estatisticas
+
+# Na ordem de date.weekday() (segunda = 0)
+DIAS_SEMANA = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo']
+
+# Dia materializado neste processo e, por usuário, a versão do planejamento usada
+# (zera na virada do dia, então só guarda quem usou o app hoje)
+_materializado = {'dia': None, 'usuarios': {}}
+
+def materializar_dia(usuario_id, hoje, dia_pt, versao_plano):
+    """Cria as TarefaDia do usuário que faltam para hoje (fixas do dia + extras) com um único INSERT ... SELECT.
+
+    Roda uma vez por dia por usuário em cada processo; só roda de novo se o
+    planejamento mudar (versao_plano). Retorna quantas ocorrências foram criadas.
+    """
+    if _materializado['dia'] != hoje:
+        _materializado['dia'] = hoje
+        _materializado['usuarios'] = {}
+    if _materializado['usuarios'].get(usuario_id) == versao_plano:
+        return 0
+
+    ja_existe = exists().where(TarefaDia.data == hoje, TarefaDia.tarefa_id == Tarefa.id)
+    faltando = select(
+        Tarefa.usuario_id, literal(hoje, db.Date), Tarefa.id, literal(False, db.Boolean)
+    ).where(
+        Tarefa.usuario_id == usuario_id,
+        or_(Tarefa.dia_semana == dia_pt, Tarefa.extra == True),
+        ~ja_existe
+    )
+    try:
+        resultado = db.session.execute(
+            insert(TarefaDia).from_select(['usuario_id', 'data', 'tarefa_id', 'concluida'], faltando)
+        )
+        criadas = resultado.rowcount or 0
+        estatisticas.somar(usuario_id, hoje, total=criadas)
+        db.session.commit()
+    except IntegrityError:
+        # Outro worker materializou o mesmo dia ao mesmo tempo (uq_tarefa_dia_data_tarefa)
+        db.session.rollback()
+        criadas = 0
+
+    _materializado['usuarios'][usuario_id] = versao_plano
+    return criadas
+
+def tarefas_do_dia(usuario_id, hoje):
+    """Ocorrências de hoje do usuário com a Tarefa já carregada (não concluídas primeiro)"""
+    return TarefaDia.query.options(
+        db.joinedload(TarefaDia.tarefa)
+    ).filter_by(usuario_id=usuario_id, data=hoje).order_by(TarefaDia.concluida, TarefaDia.id).all()
+
+def plano_semanal(usuario_id, hoje):
+    """Planejamento da semana de hoje em duas consultas: as tarefas e as estatísticas por dia.
+
+    Retorna {'segunda': date, 'dias': {dia: [Tarefa]}, 'extras': [Tarefa],
+    'estatisticas': {dia: {'data': date, 'total': int, 'concluidas': int}}}.
+    """
+    dias = {dia: [] for dia in DIAS_SEMANA}
+    extras = []
+    for tarefa in Tarefa.query.filter_by(usuario_id=usuario_id).order_by(Tarefa.id):
+        if tarefa.extra:
+            extras.append(tarefa)
+        elif tarefa.dia_semana in dias:
+            dias[tarefa.dia_semana].append(tarefa)
+
+    # Ocorrências da semana agrupadas por data (índice usuario_id, data, concluida)
+    segunda = hoje - timedelta(days=hoje.weekday())
+    por_dia = {dia: {'data': segunda + timedelta(days=i), 'total': 0, 'concluidas': 0}
+               for i, dia in enumerate(DIAS_SEMANA)}
+    por_data = db.session.execute(
+        select(TarefaDia.data, func.count(), func.sum(case((TarefaDia.concluida == True, 1), else_=0)))
+        .where(TarefaDia.usuario_id == usuario_id,
+               TarefaDia.data.between(segunda, segunda + timedelta(days=6)))
+        .group_by(TarefaDia.data)
+    )
+    for data, total, concluidas in por_data:
+        por_dia[DIAS_SEMANA[data.weekday()]].update(total=total, concluidas=concluidas or 0)
+
+    return {'segunda': segunda, 'dias': dias, 'extras': extras, 'estatisticas': por_dia}
@@ -0,0 +1,57 @@
+// Gerado pelo servidor em /sw.js (ativos.py): o nome do cache e a lista
+// mudam sozinhos quando algum arquivo muda (as URLs têm o hash do conteúdo)
+const CACHE_NAME = 'dual-you-{{ versao }}';
+
+// Arquivos para cache inicial
+const urlsToCache = {{ precache|tojson }};
+
+// Instalação - cache dos arquivos iniciais
+self.addEventListener('install', event => {
+  console.log('Service Worker: instalando...');
+  event.waitUntil(
+    caches.open(CACHE_NAME)
+      .then(cache => {
+        console.log('Cache aberto');
+        return cache.addAll(urlsToCache);
+      })
+      .then(() => self.skipWaiting())
+  );
+});
+
+// Ativação - limpa caches antigos
+self.addEventListener('activate', event => {
+  console.log('Service Worker: ativando...');
+  event.waitUntil(
+    caches.keys().then(cacheNames => {
+      return Promise.all(
+        cacheNames.map(cacheName => {
+          if (cacheName !== CACHE_NAME) {
+            console.log('Removendo cache antigo:', cacheName);
+            return caches.delete(cacheName);
+          }
+        })
+      );
+    }).then(() => self.clients.claim())
+  );
+});
+
+// Intercepta só os arquivos com hash do conteúdo (?v=): nunca mudam, então
+// vêm do cache sem revalidar. Páginas, API e fotos vão direto para a rede:
+// o HTML é de cada usuário e muda a cada POST, não pode sair de um cache
+// compartilhado pelo navegador.
+self.addEventListener('fetch', event => {
+  const url = new URL(event.request.url);
+  if (event.request.method !== 'GET' || url.origin !== self.location.origin || !url.searchParams.has('v')) {
+    return;
+  }
+  
+  event.respondWith(
+    caches.match(event.request).then(response => response || fetch(event.request).then(networkResponse => {
+      if (networkResponse.status === 200) {
+        const responseClone = networkResponse.clone();
+        caches.open(CACHE_NAME).then(cache => cache.put(event.request, responseClone));
+      }
+      return networkResponse;
+    }))
+  );
+});
@@ -0,0 +1,74 @@
+# tests/conftest.py
+# App de teste: banco SQLite e carimbos numa pasta temporária por teste.
+#
+# Rodar na pasta do projeto:  python -m pytest -q
+
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from database import db
+import carimbos
+import migracoes
+
+CARIMBOS = ('ALTER_VERSAO_PATH', 'HISTORIAS_VERSAO_PATH', 'PLANO_VERSAO_PATH', 'CONFIG_VERSAO_PATH')
+
+def config_de_teste(pasta):
+    """Configuração que isola o teste: banco, carimbos, lock do agendador e uploads em `pasta`"""
+    os.makedirs(pasta, exist_ok=True)
+    config = {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(pasta, 'dual_you.db')}",
+        'AGENDADOR_LOCK_PATH': os.path.join(pasta, 'agendador.lock'),
+        'UPLOAD_FOLDER': os.path.join(pasta, 'static', 'uploads'),
+        'METRICAS_DIR': None,
+    }
+    config.update({chave: os.path.join(pasta, chave.lower()) for chave in CARIMBOS})
+    return config
+
+def preparar_banco(app):
+    """Migra o banco novo e carimba tudo: os caches em memória dos módulos
+    (grafo das histórias, configurações, estado do Alter Ego, dia materializado)
+    não reaproveitam nada de outro teste"""
+    with app.app_context():
+        migracoes.migrar()
+    for chave in CARIMBOS:
+        carimbos.marcar(app.config[chave])
+
+@contextmanager
+def app_de_teste(pasta):
+    """App completo sobre um banco novo em `pasta`, com o contexto aberto"""
+    from app import create_app
+    aplicacao = create_app(config_de_teste(str(pasta)))
+    preparar_banco(aplicacao)
+    with aplicacao.app_context():
+        yield aplicacao
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def app(tmp_path):
+    with app_de_teste(tmp_path) as aplicacao:
+        yield aplicacao
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+@pytest.fixture
+def pasta_static(app, tmp_path):
+    """static/ do teste: fotos enviadas, restauradas e apagadas não tocam no projeto"""
+    app.static_folder = str(tmp_path / 'static')
+    return tmp_path / 'static'
+
+@pytest.fixture
+def historias(app):
+    """Pacote de histórias (dados/historias.json) carregado no banco de teste"""
+    import historias as motor
+    motor.carregar_pacote()
+    return motor
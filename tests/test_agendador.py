@@ -0,0 +1,80 @@
+# Eleição de líder do agendador: com vários workers, um tick por intervalo
+
+import os
+import multiprocessing
+
+import pytest
+from flask import Flask
+
+import agendador
+from agendador import Lider, tick_do_lider
+
+pytestmark = pytest.mark.skipif(agendador.fcntl is None, reason="sem flock: processo único, sem eleição")
+
+WORKERS = 4
+INTERVALOS = 5
+
+def worker(lock, registro, barreira):
+    """Um worker do gunicorn: agenda o tick e dispara a cada intervalo, junto com os outros"""
+    def anotar():
+        with open(registro, 'a') as f:
+            f.write(f"{os.getpid()}\n")
+    tick = tick_do_lider(Lider(lock), anotar, Flask(__name__))
+    for _ in range(INTERVALOS):
+        barreira.wait()  # todos os workers chegam no mesmo intervalo
+        tick()
+        barreira.wait()
+
+def test_um_tick_por_intervalo_com_varios_workers(tmp_path):
+    lock, registro = str(tmp_path / 'agendador.lock'), str(tmp_path / 'ticks')
+    contexto = multiprocessing.get_context('fork')
+    barreira = contexto.Barrier(WORKERS)
+    processos = [contexto.Process(target=worker, args=(lock, registro, barreira)) for _ in range(WORKERS)]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(30)
+        assert processo.exitcode == 0
+
+    with open(registro) as f:
+        ticks = f.read().split()
+    assert len(ticks) == INTERVALOS
+    assert len(set(ticks)) == 1  # sempre o mesmo líder
+
+def test_outro_worker_assume_quando_o_lider_morre(tmp_path):
+    lock = str(tmp_path / 'agendador.lock')
+    contexto = multiprocessing.get_context('fork')
+    eleito, morrer = contexto.Event(), contexto.Event()
+
+    def lider():
+        eleicao = Lider(lock)  # guardado: o lock vive enquanto o arquivo estiver aberto
+        assert eleicao.sou_lider()
+        eleito.set()
+        morrer.wait(30)
+
+    processo = contexto.Process(target=lider)
+    processo.start()
+    assert eleito.wait(30)
+    reserva = Lider(lock)
+    assert not reserva.sou_lider()
+
+    morrer.set()
+    processo.join(30)
+    assert reserva.sou_lider()
+    with open(lock) as f:
+        assert f.read() == str(os.getpid())
+
+def test_tick_fora_do_lider_nao_executa(tmp_path):
+    lock = str(tmp_path / 'agendador.lock')
+    executados = []
+
+    def tarefa():
+        executados.append(1)
+
+    app = Flask(__name__)
+    primeiro = tick_do_lider(Lider(lock), tarefa, app)
+    segundo = tick_do_lider(Lider(lock), tarefa, app)  # outro arquivo aberto: o flock não é compartilhado
+    primeiro()
+    segundo()
+    primeiro()
+    assert len(executados) == 2
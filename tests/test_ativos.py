@@ -0,0 +1,112 @@
+# Service worker gerado (/sw.js), cache dos arquivos com hash e os pacotes de CSS/JS
+
+import json
+
+import pytest
+
+import ativos
+
+def test_precache_so_tem_urls_com_hash(app):
+    with app.test_request_context('/'):
+        precache = ativos.lista_precache()
+    assert precache
+    assert '/' not in precache
+    assert all('v=' in url for url in precache)
+
+def test_service_worker_nao_intercepta_paginas(cliente):
+    resposta = cliente.get('/sw.js')
+    assert resposta.status_code == 200
+    codigo = resposta.get_data(as_text=True)
+    lista = json.loads(codigo.split('const urlsToCache = ', 1)[1].split(';\n', 1)[0])
+    assert '/' not in lista
+    # Um único respondWith, atrás do filtro de ?v=
+    assert codigo.count('respondWith') == 1
+    assert "!url.searchParams.has('v')" in codigo
+    assert 'stale-while-revalidate' not in codigo
+
+def test_ativo_com_hash_tem_cache_longo(cliente):
+    with cliente.application.test_request_context('/'):
+        url = ativos.url_ativo('style.css')
+    resposta = cliente.get(url)
+    assert resposta.status_code == 200
+    assert 'immutable' in resposta.headers['Cache-Control']
+
+# ========== PACOTES ==========
+
+@pytest.fixture
+def static_proprio(app, tmp_path):
+    """static/ com um CSS e um JS só do teste (editar não mexe no projeto)"""
+    pasta = tmp_path / 'static'
+    pasta.mkdir(exist_ok=True)
+    (pasta / 'style.css').write_text('body {\n  color: red;\n}\n')
+    (pasta / 'script.js').write_text('let a = 1\n')
+    app.static_folder = str(pasta)
+    ativos._pacotes.clear()
+    return pasta
+
+def versao_do_pacote(app, nome='app.css'):
+    with app.test_request_context('/'):
+        return ativos.versao_ativo(nome)
+
+def test_pacote_com_hash_atual_e_imutavel(app, cliente, static_proprio):
+    versao = versao_do_pacote(app)
+    com_hash = cliente.get(f'/pacotes/app.css?v={versao}')
+    assert com_hash.status_code == 200
+    assert com_hash.headers['Cache-Control'] == f'public, max-age={ativos.UM_ANO}, immutable'
+    assert com_hash.get_data() == b'body{color:red}'
+    assert cliente.get('/pacotes/app.css').headers['Cache-Control'] == 'no-cache'
+
+def test_editar_o_fonte_muda_o_hash(app, cliente, static_proprio):
+    antiga = versao_do_pacote(app)
+    (static_proprio / 'style.css').write_text('body {\n  color: blue;\n}\n')
+    nova = versao_do_pacote(app)
+    assert nova != antiga
+    assert cliente.get(f'/pacotes/app.css?v={antiga}').headers['Cache-Control'] == 'no-cache'
+    assert cliente.get(f'/pacotes/app.css?v={nova}').get_data() == b'body{color:blue}'
+
+def test_pacote_comprimido_revalida_com_304(app, cliente, static_proprio):
+    (static_proprio / 'style.css').write_text('.caixa { margin: 0 auto; }\n' * 100)
+    resposta = cliente.get('/pacotes/app.css', headers={'Accept-Encoding': 'gzip'})
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resposta.headers['Vary']
+    etag = resposta.headers['ETag']
+    assert etag == f'"{versao_do_pacote(app)}-gzip"'
+    assert cliente.get('/pacotes/app.css', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 304
+
+def test_pacote_desconhecido(cliente):
+    assert cliente.get('/pacotes/outro.js').status_code == 404
+
+# ========== MINIFICADORES ==========
+
+JS = '''// cabeçalho
+function desenhar(alvo) {
+    const estilo = `
+        .alter {
+            left: 10px;
+        }
+    `
+    // comentário solto
+    alvo.style.cssText = estilo  // comentário no fim da linha fica
+}
+'''
+
+def test_minificar_js_tira_indentacao_e_comentarios_de_linha():
+    assert ativos.minificar_js(JS) == (
+        'function desenhar(alvo) {\n'
+        'const estilo = `\n'
+        '.alter {\n'
+        'left: 10px;\n'
+        '}\n'
+        '`\n'
+        'alvo.style.cssText = estilo  // comentário no fim da linha fica\n'
+        '}')
+
+def test_template_string_de_varias_linhas_perde_a_indentacao():
+    # A limitação documentada em minificar_js: o conteúdo da string muda
+    minificado = ativos.minificar_js(JS)
+    assert '        .alter {' in JS and '        .alter {' not in minificado
+    assert '\n.alter {\n' in minificado
+
+def test_minificar_css():
+    css = '/* tema */\n.a > .b ,\n.c {\n  color: red ;\n  margin: 0  auto;\n}\n'
+    assert ativos.minificar_css(css) == '.a>.b,.c{color:red;margin:0 auto}'
@@ -0,0 +1,58 @@
+# Compressão das respostas: codificação pelo Accept-Encoding, limite de tamanho, Vary e ETag/304
+
+import gzip
+
+import pytest
+from flask import request
+
+import compressao
+
+@pytest.fixture
+def texto(app):
+    """/teste/<n>: n bytes de text/plain com ETag forte (rota só deste app de teste)"""
+    @app.route('/teste/<int:tamanho>')
+    def teste(tamanho):
+        resposta = app.response_class('a' * tamanho, mimetype='text/plain')
+        resposta.set_etag('abc')
+        return resposta.make_conditional(request)
+    return app.test_client()
+
+def test_brotli_antes_de_gzip(texto):
+    if not compressao.brotli:
+        pytest.skip('brotli não instalado')
+    resposta = texto.get('/teste/2000', headers={'Accept-Encoding': 'gzip, br'})
+    assert resposta.headers['Content-Encoding'] == 'br'
+    assert compressao.brotli.decompress(resposta.get_data()) == b'a' * 2000
+
+def test_gzip_quando_e_o_que_o_navegador_aceita(texto):
+    resposta = texto.get('/teste/2000', headers={'Accept-Encoding': 'gzip'})
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(resposta.get_data()) == b'a' * 2000
+    assert resposta.headers['ETag'] == '"abc-gzip"'
+
+def test_sem_accept_encoding_vai_como_esta(texto):
+    resposta = texto.get('/teste/2000')
+    assert 'Content-Encoding' not in resposta.headers
+    assert resposta.get_data() == b'a' * 2000
+    assert resposta.headers['ETag'] == '"abc"'
+    assert 'Accept-Encoding' in resposta.headers['Vary']
+
+def test_abaixo_do_limite_nao_comprime(texto):
+    pequena = texto.get(f'/teste/{compressao.TAMANHO_MINIMO - 1}', headers={'Accept-Encoding': 'gzip'})
+    no_limite = texto.get(f'/teste/{compressao.TAMANHO_MINIMO}', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in pequena.headers and 'Vary' not in pequena.headers
+    assert no_limite.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in no_limite.headers['Vary']
+
+def test_etag_da_variante_comprimida_volta_como_304(texto):
+    etag = texto.get('/teste/2000', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    resposta = texto.get('/teste/2000', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert resposta.status_code == 304
+
+def test_api_comprimida_volta_como_304(cliente):
+    primeira = cliente.get('/api/planejamento', headers={'Accept-Encoding': 'gzip'})
+    assert primeira.headers['Content-Encoding'] == 'gzip'
+    assert primeira.headers['ETag'].endswith('-gzip"')
+    segunda = cliente.get('/api/planejamento', headers={'Accept-Encoding': 'gzip',
+                                                         'If-None-Match': primeira.headers['ETag']})
+    assert segunda.status_code == 304
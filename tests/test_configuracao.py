@@ -0,0 +1,69 @@
+# Cache das configurações: uma consulta, leitura velha limitada e invalidação entre workers
+
+import pytest
+from sqlalchemy import event, text
+
+import carimbos
+import configuracao
+from database import db
+
+@pytest.fixture
+def consultas(app):
+    """Lista que recebe cada SQL executado durante o teste"""
+    executadas = []
+    anotar = lambda conexao, cursor, sql, *_: executadas.append(sql)
+    event.listen(db.engine, 'before_cursor_execute', anotar)
+    configuracao._cache['valores'] = None
+    yield executadas
+    event.remove(db.engine, 'before_cursor_execute', anotar)
+
+def gravar_direto(chave, valor):
+    """Como outro worker (ou um script) grava: por fora deste processo"""
+    with db.engine.begin() as conexao:
+        conexao.execute(text("DELETE FROM config WHERE chave = :chave"), {'chave': chave})
+        conexao.execute(text("INSERT INTO config (chave, valor) VALUES (:chave, :valor)"),
+                        {'chave': chave, 'valor': valor})
+
+def test_padrao_e_tipo(consultas):
+    assert configuracao.obter('tarefas_por_dia') == 7
+    configuracao.definir('tarefas_por_dia', '9')
+    assert configuracao.obter('tarefas_por_dia') == 9
+    with pytest.raises(ValueError):
+        configuracao.definir('tarefas_por_dia', 'muitas')
+
+def test_uma_consulta_para_varias_leituras(consultas):
+    for _ in range(100):
+        configuracao.obter('tarefas_por_dia')
+        configuracao.valor_bruto('qualquer')
+    assert len([sql for sql in consultas if 'FROM config' in sql]) == 1
+
+def test_leitura_velha_dura_no_maximo_verificar_carimbo(app, consultas, monkeypatch):
+    relogio = [1000.0]
+    monkeypatch.setattr(configuracao.time, 'monotonic', lambda: relogio[0])
+    assert configuracao.obter('tarefas_por_dia') == 7
+
+    # Outro worker: grava e marca o carimbo
+    gravar_direto('tarefas_por_dia', '3')
+    carimbos.marcar(app.config['CONFIG_VERSAO_PATH'])
+    relogio[0] += configuracao.VERIFICAR_CARIMBO / 2
+    assert configuracao.obter('tarefas_por_dia') == 7  # ainda dentro da janela
+    relogio[0] += configuracao.VERIFICAR_CARIMBO
+    assert configuracao.obter('tarefas_por_dia') == 3
+
+def test_mudanca_sem_carimbo_aparece_depois_do_ttl(consultas, monkeypatch):
+    relogio = [1000.0]
+    monkeypatch.setattr(configuracao.time, 'monotonic', lambda: relogio[0])
+    assert configuracao.obter('tarefas_por_dia') == 7
+
+    gravar_direto('tarefas_por_dia', '4')
+    relogio[0] += configuracao.TTL - 1
+    assert configuracao.obter('tarefas_por_dia') == 7  # o carimbo não mudou
+    relogio[0] += 2
+    assert configuracao.obter('tarefas_por_dia') == 4
+
+def test_definir_vale_na_hora_neste_processo_e_marca_o_carimbo(app, consultas):
+    antes = carimbos.ler(app.config['CONFIG_VERSAO_PATH'])
+    configuracao.obter('tarefas_por_dia')
+    configuracao.definir('tarefas_por_dia', 5)
+    assert configuracao.obter('tarefas_por_dia') == 5
+    assert carimbos.ler(app.config['CONFIG_VERSAO_PATH']) != antes
@@ -0,0 +1,137 @@
+# Resumo diário (EstatisticaDia): mantido junto com TarefaDia, igual ao recalculado, e as sequências
+
+import multiprocessing
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select, event
+
+import estatisticas
+from database import db
+from models import Tarefa, TarefaDia, EstatisticaDia, USUARIO_PADRAO
+
+HOJE = date(2025, 1, 6)
+
+@pytest.fixture
+def tarefas(app):
+    """Uma ocorrência por tarefa e dia: 4 tarefas dão até 4 ocorrências no mesmo dia"""
+    tarefas = [Tarefa(descricao=f'tarefa {i}', dia_semana='Segunda-feira') for i in range(4)]
+    db.session.add_all(tarefas)
+    db.session.commit()
+    return tarefas
+
+def ocorrencias(tarefas, data, quantas, concluidas=0):
+    db.session.add_all([TarefaDia(data=data, tarefa_id=tarefa.id, concluida=i < concluidas)
+                        for i, tarefa in enumerate(tarefas[:quantas])])
+    db.session.flush()
+
+def resumo():
+    """{data: (total, concluidas, pontos)} do que está gravado"""
+    return {linha.data: (linha.total, linha.concluidas, linha.pontos)
+            for linha in db.session.execute(select(EstatisticaDia).where(EstatisticaDia.usuario_id == USUARIO_PADRAO)).scalars()}
+
+def serie(*concluidas):
+    return [{'data': HOJE, 'total': 1, 'concluidas': c, 'pontos': 0} for c in concluidas]
+
+# ========== ATUALIZAÇÃO ==========
+
+def test_primeira_soma_do_dia_conta_o_que_ja_existe(tarefas):
+    ocorrencias(tarefas, HOJE, 3, concluidas=1)
+    estatisticas.somar(USUARIO_PADRAO, HOJE, total=3)
+    assert resumo() == {HOJE: (3, 1, estatisticas.PONTOS_POR_TAREFA)}
+    # Dali em diante é só somar
+    estatisticas.somar(USUARIO_PADRAO, HOJE, concluidas=1)
+    estatisticas.somar(USUARIO_PADRAO, HOJE)
+    assert resumo() == {HOJE: (3, 2, 2 * estatisticas.PONTOS_POR_TAREFA)}
+
+def test_recalcular_dias_depois_de_apagar(tarefas):
+    ocorrencias(tarefas, HOJE, 3, concluidas=2)
+    ocorrencias(tarefas, HOJE + timedelta(days=1), 1)
+    estatisticas.reconstruir()
+    TarefaDia.query.filter(TarefaDia.tarefa_id.in_([tarefas[0].id, tarefas[2].id])).delete()
+    estatisticas.recalcular_dias(USUARIO_PADRAO, [HOJE, HOJE + timedelta(days=1), HOJE])
+    assert resumo() == {HOJE: (1, 1, estatisticas.PONTOS_POR_TAREFA)}
+
+def test_incremental_bate_com_o_reconstruido(tarefas):
+    for dia in range(10):
+        data = HOJE + timedelta(days=dia)
+        ocorrencias(tarefas, data, dia % 4 + 1)
+        estatisticas.somar(USUARIO_PADRAO, data, total=dia % 4 + 1)
+        for ocorrencia in TarefaDia.query.filter_by(data=data).limit(dia % 3).all():
+            ocorrencia.concluida = True
+            estatisticas.somar(USUARIO_PADRAO, data, concluidas=1)
+    incremental = resumo()
+    assert estatisticas.reconstruir() == 10
+    assert resumo() == incremental
+
+def somar_no_filho(barreira, ocorrencia_id):
+    db.session.remove()
+    db.engine.dispose(close=False)  # conexões do pai não atravessam o fork
+    barreira.wait()
+    ocorrencia = db.session.get(TarefaDia, ocorrencia_id)
+    ocorrencia.concluida = True
+    estatisticas.somar(USUARIO_PADRAO, HOJE, concluidas=1)
+    db.session.commit()
+    db.session.remove()
+
+def test_workers_concluindo_no_mesmo_dia_novo(tarefas):
+    ocorrencias(tarefas, HOJE, 4)
+    ids = [ocorrencia.id for ocorrencia in TarefaDia.query]
+    db.session.commit()
+    db.session.remove()
+    contexto = multiprocessing.get_context('fork')
+    barreira = contexto.Barrier(len(ids))
+    processos = [contexto.Process(target=somar_no_filho, args=(barreira, i)) for i in ids]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(30)
+        assert processo.exitcode == 0
+    assert resumo() == {HOJE: (4, 4, 4 * estatisticas.PONTOS_POR_TAREFA)}
+
+# ========== SEQUÊNCIAS ==========
+
+@pytest.mark.parametrize('concluidas, esperado', [
+    ((1, 1, 0, 1, 1, 1), (3, 3)),
+    ((1, 1, 1, 1, 0, 1, 1), (2, 4)),
+    ((1, 1, 1, 0), (3, 3)),       # hoje ainda sem conclusão: vale a que terminou ontem
+    ((1, 1, 0, 0), (0, 2)),
+    ((0,), (0, 0)),
+    ((1,), (1, 1)),
+    ((), (0, 0)),
+])
+def test_sequencias(concluidas, esperado):
+    assert estatisticas.sequencias(serie(*concluidas)) == esperado
+
+# ========== PAINEL ==========
+
+def test_painel_de_um_ano_numa_consulta(tarefas):
+    for dia in range(0, 400, 2):
+        data = HOJE - timedelta(days=dia)
+        ocorrencias(tarefas, data, 2, concluidas=1)
+    ocorrencias(tarefas, HOJE - timedelta(days=1), 1, concluidas=1)
+    estatisticas.reconstruir()
+    db.session.commit()
+
+    executadas = []
+    anotar = lambda conexao, cursor, sql, *_: executadas.append(sql)
+    event.listen(db.engine, 'before_cursor_execute', anotar)
+    try:
+        painel = estatisticas.painel(USUARIO_PADRAO, HOJE)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', anotar)
+
+    assert len(executadas) == 1
+    assert len(painel['serie']) == estatisticas.DIAS_PAINEL
+    assert painel['serie'][-1]['data'] == HOJE
+    assert painel['serie'][-2] == {'data': HOJE - timedelta(days=1), 'total': 1, 'concluidas': 1,
+                                   'pontos': estatisticas.PONTOS_POR_TAREFA}
+    assert painel['dias_ativos'] == 183 + 1
+    assert painel['total'] == 2 * 183 + 1 and painel['concluidas'] == 183 + 1
+    assert painel['taxa'] == round(100 * 184 / 367)
+    assert (painel['sequencia_atual'], painel['maior_sequencia']) == (3, 3)  # hoje, ontem e anteontem
+
+def test_api_limita_os_dias(cliente):
+    assert len(cliente.get('/api/estatisticas?dias=7').get_json()['serie']) == 7
+    assert len(cliente.get('/api/estatisticas?dias=0').get_json()['serie']) == 1
+    assert len(cliente.get('/api/estatisticas?dias=100000').get_json()['serie']) == estatisticas.DIAS_MAXIMO
@@ -0,0 +1,132 @@
+# flask dual-you export/import: os dados de um usuário nunca caem em outro
+
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from conftest import app_de_teste
+from database import db
+from exportacao import exportar, importar, ErroImportacao
+from models import Usuario, Tarefa, TarefaDia, Conquista, MomentoGratidao, AlterEgo
+
+def criar_usuario(nome, tarefas=2, usuario_id=None):
+    """Usuário com tarefas, uma ocorrência concluída de cada, uma conquista,
+    um momento e o Alter Ego parado na ocorrência da última tarefa"""
+    usuario = Usuario(id=usuario_id, nome=nome)
+    db.session.add(usuario)
+    db.session.flush()
+    criadas = [Tarefa(usuario_id=usuario.id, descricao=f'{nome}{i}', dia_semana='Segunda-feira')
+               for i in range(tarefas)]
+    db.session.add_all(criadas)
+    db.session.flush()
+    ocorrencias = [TarefaDia(usuario_id=usuario.id, data=date(2025, 1, 6), tarefa_id=tarefa.id, concluida=True)
+                   for tarefa in criadas]
+    db.session.add_all(ocorrencias)
+    db.session.flush()
+    db.session.add(Conquista(usuario_id=usuario.id, tarefa_id=criadas[0].id, descricao=f'conquista de {nome}'))
+    db.session.add(MomentoGratidao(usuario_id=usuario.id, titulo=f'momento de {nome}'))
+    db.session.add(AlterEgo(usuario_id=usuario.id, tarefa_desbloqueio=ocorrencias[-1].id))
+    db.session.commit()
+    return usuario.id
+
+def retrato(nome):
+    """Tudo do usuário, sem IDs (comparável entre bancos), com as referências resolvidas"""
+    usuario_id = db.session.execute(select(Usuario.id).where(Usuario.nome == nome)).scalar()
+    tarefas = {t.id: t.descricao for t in Tarefa.query.filter_by(usuario_id=usuario_id)}
+    ocorrencias = {o.id: tarefas[o.tarefa_id] for o in TarefaDia.query.filter_by(usuario_id=usuario_id)}
+    alter = AlterEgo.query.filter_by(usuario_id=usuario_id).one()
+    return {
+        'tarefas': sorted(tarefas.values()),
+        'ocorrencias': sorted(ocorrencias.values()),
+        'conquistas': [(c.descricao, tarefas[c.tarefa_id])
+                       for c in Conquista.query.filter_by(usuario_id=usuario_id)],
+        'momentos': [m.titulo for m in MomentoGratidao.query.filter_by(usuario_id=usuario_id)],
+        'desbloqueio': ocorrencias[alter.tarefa_desbloqueio],
+    }
+
+@pytest.fixture
+def arquivo_da_bia(app, tmp_path):
+    """Exportação só da bia (usuário 3) e o retrato dela na origem"""
+    criar_usuario('ana', usuario_id=2)
+    bia = criar_usuario('bia', tarefas=3, usuario_id=3)
+    destino = str(tmp_path / 'bia.tar.gz')
+    exportar(destino, bia)
+    return destino, retrato('bia')
+
+def test_banco_vazio_mantem_os_ids(arquivo_da_bia, tmp_path):
+    arquivo, esperado = arquivo_da_bia
+    with app_de_teste(tmp_path / 'destino'):
+        resumo = importar(arquivo)
+        assert resumo['tabelas']['tarefa_dia'] == 3
+        assert db.session.get(Usuario, 3).nome == 'bia'
+        assert retrato('bia') == esperado
+
+def test_usuario_com_o_mesmo_id_nao_recebe_os_dados(arquivo_da_bia, tmp_path):
+    """O caso da revisão: o usuário 3 do destino é o davi, com tarefas nos mesmos IDs"""
+    arquivo, esperado = arquivo_da_bia
+    with app_de_teste(tmp_path / 'destino'):
+        criar_usuario('davi', tarefas=4, usuario_id=3)
+        do_davi = retrato('davi')
+
+        importar(arquivo, substituir=True)
+
+        assert db.session.get(Usuario, 3).nome == 'davi'
+        assert retrato('davi') == do_davi
+        assert retrato('bia') == esperado
+        bia = db.session.execute(select(Usuario.id).where(Usuario.nome == 'bia')).scalar()
+        assert bia != 3
+
+def test_mesmo_nome_sem_substituir_recusa_sem_gravar_nada(arquivo_da_bia, tmp_path):
+    arquivo, _ = arquivo_da_bia
+    with app_de_teste(tmp_path / 'destino'):
+        criar_usuario('davi', usuario_id=3)
+        criar_usuario('bia', usuario_id=4)
+        antes = {modelo: db.session.query(modelo).count()
+                 for modelo in (Usuario, Tarefa, TarefaDia, Conquista, MomentoGratidao, AlterEgo)}
+
+        with pytest.raises(ErroImportacao, match='--substituir'):
+            importar(arquivo)
+
+        db.session.expire_all()
+        assert {modelo: db.session.query(modelo).count() for modelo in antes} == antes
+
+def test_mesmo_nome_com_substituir_troca_so_os_dados_dele(arquivo_da_bia, tmp_path):
+    arquivo, esperado = arquivo_da_bia
+    with app_de_teste(tmp_path / 'destino'):
+        criar_usuario('davi', usuario_id=3)
+        do_davi = retrato('davi')
+        criar_usuario('bia', tarefas=1, usuario_id=4)
+
+        importar(arquivo, substituir=True)
+
+        assert retrato('bia') == esperado
+        assert retrato('davi') == do_davi
+        assert db.session.execute(select(Usuario.id).where(Usuario.nome == 'bia')).scalar() == 4
+
+def test_restaurar_o_banco_inteiro_no_mesmo_banco(app, tmp_path):
+    criar_usuario('ana', usuario_id=2)
+    criar_usuario('bia', usuario_id=3)
+    antes = {nome: retrato(nome) for nome in ('ana', 'bia')}
+    ids = sorted(db.session.scalars(select(TarefaDia.id)))
+    arquivo = str(tmp_path / 'tudo.tar')
+    exportar(arquivo)
+
+    importar(arquivo, substituir=True)
+
+    assert {nome: retrato(nome) for nome in ('ana', 'bia')} == antes
+    assert sorted(db.session.scalars(select(TarefaDia.id))) == ids
+
+def test_fotos_vao_e_voltam(app, pasta_static, tmp_path):
+    usuario_id = criar_usuario('bia', usuario_id=3)
+    (pasta_static / 'uploads').mkdir(parents=True, exist_ok=True)
+    (pasta_static / 'uploads' / 'abc.jpg').write_bytes(b'foto')
+    Conquista.query.filter_by(usuario_id=usuario_id).update({'foto': 'uploads/abc.jpg'})
+    db.session.commit()
+    arquivo = str(tmp_path / 'bia.tar.gz')
+    assert exportar(arquivo, usuario_id)['fotos'] == 1
+
+    with app_de_teste(tmp_path / 'destino') as destino:
+        destino.static_folder = str(tmp_path / 'destino' / 'static')
+        assert importar(arquivo)['fotos'] == 1
+        assert (tmp_path / 'destino' / 'static' / 'uploads' / 'abc.jpg').read_bytes() == b'foto'
@@ -0,0 +1,23 @@
+# Importar o app é barato: sem scheduler, sem banco, dentro do orçamento (python -X importtime)
+
+import pytest
+
+import fabrica
+
+@pytest.fixture(scope='module')
+def importacao():
+    return fabrica.medir_importacao()
+
+def test_importar_o_app_nao_inicia_threads(importacao):
+    _, _, threads, _ = importacao
+    assert threads == 1  # só a principal: o agendador é do start_background
+
+def test_importar_o_app_nao_abre_conexoes(importacao):
+    _, _, _, conexoes = importacao
+    assert conexoes == 0
+
+def test_importar_o_app_cabe_no_orcamento(importacao):
+    total, modulos, _, _ = importacao
+    assert modulos, 'saída do -X importtime sem os módulos do app'
+    assert 0 < total <= fabrica.ORCAMENTO_IMPORTACAO_MS, \
+        f"import levou {total:.0f} ms; os mais caros: {sorted(modulos, reverse=True)[:5]}"
@@ -0,0 +1,73 @@
+# Geometria dos cômodos: conversão % -> pixels (um e em lote) e /api/casa com ETag/304
+
+import numpy as np
+import pytest
+
+import geometria
+from models import AlterEgo
+
+# A tabela que ficava dentro de AlterEgo.get_coordenadas_absolutas antes de dados/casa.json
+AMBIENTES_ANTIGOS = {
+    'lavanderia': {'x_min': 0, 'x_max': 682, 'y_min': 0, 'y_max': 682},
+    'cozinha': {'x_min': 682, 'x_max': 1364, 'y_min': 0, 'y_max': 682},
+    'banheiro': {'x_min': 1364, 'x_max': 2048, 'y_min': 0, 'y_max': 682},
+    'sala': {'x_min': 0, 'x_max': 682, 'y_min': 682, 'y_max': 1364},
+    'quarto1': {'x_min': 682, 'x_max': 1364, 'y_min': 682, 'y_max': 1364},
+    'quarto2': {'x_min': 1364, 'x_max': 2048, 'y_min': 682, 'y_max': 1364},
+    'garagem': {'x_min': 0, 'x_max': 682, 'y_min': 1364, 'y_max': 2048},
+    'varanda': {'x_min': 682, 'x_max': 1364, 'y_min': 1364, 'y_max': 2048},
+    'area_moto': {'x_min': 1364, 'x_max': 2048, 'y_min': 1364, 'y_max': 2048}
+}
+RELATIVAS = [(0, 0), (50, 50), (100, 100), (33, 67), (12.5, 99.9)]
+
+def absolutas_antigas(ambiente, x_relativo, y_relativo):
+    ambiente = AMBIENTES_ANTIGOS.get(ambiente, AMBIENTES_ANTIGOS['sala'])
+    largura = ambiente['x_max'] - ambiente['x_min']
+    altura = ambiente['y_max'] - ambiente['y_min']
+    x_abs = ambiente['x_min'] + (largura * x_relativo / 100)
+    y_abs = ambiente['y_min'] + (altura * y_relativo / 100)
+    return int(x_abs), int(y_abs)
+
+@pytest.fixture
+def casa():
+    return geometria.carregar()
+
+def test_nove_comodos_como_a_tabela_antiga(casa):
+    assert set(casa.ambientes) == set(AMBIENTES_ANTIGOS)
+    for ambiente in AMBIENTES_ANTIGOS:
+        for x, y in RELATIVAS:
+            assert casa.absolutas(ambiente, x, y) == absolutas_antigas(ambiente, x, y), (ambiente, x, y)
+
+def test_comodo_desconhecido_vira_a_sala(casa):
+    assert casa.padrao == 'sala'
+    assert casa.absolutas('porao', 50, 50) == absolutas_antigas('porao', 50, 50) == casa.absolutas('sala', 50, 50)
+    assert list(casa.indices_de(['porao', 'cozinha'])) == [casa.indices['sala'], casa.indices['cozinha']]
+
+def test_em_lote_igual_a_um_por_um(casa):
+    rng = np.random.default_rng(7)
+    nomes = list(AMBIENTES_ANTIGOS) * 20 + ['porao', None]
+    x = rng.uniform(0, 100, len(nomes))
+    y = rng.uniform(0, 100, len(nomes))
+    lote = casa.absolutas_em_lote(casa.indices_de(nomes), x, y)
+    assert lote.shape == (len(nomes), 2)
+    assert [tuple(par) for par in lote.tolist()] == [casa.absolutas(n, a, b) for n, a, b in zip(nomes, x, y)]
+
+def test_alter_ego_usa_a_geometria(app):
+    alter = AlterEgo(ambiente='quarto2', x_relativo=25, y_relativo=75)
+    assert alter.get_coordenadas_absolutas() == absolutas_antigas('quarto2', 25, 75)
+
+# ========== /api/casa ==========
+
+def test_api_casa_manda_o_manifesto_com_etag(cliente, casa):
+    resposta = cliente.get('/api/casa')
+    assert resposta.status_code == 200
+    assert resposta.get_json() == casa.manifesto
+    assert resposta.headers['ETag'] == f'"{casa.etag}"'
+    assert 'max-age' in resposta.headers['Cache-Control']
+
+def test_api_casa_304_com_if_none_match(cliente, casa):
+    resposta = cliente.get('/api/casa', headers={'If-None-Match': f'"{casa.etag}"'})
+    assert resposta.status_code == 304
+    assert resposta.get_data() == b''
+    assert resposta.headers['ETag'] == f'"{casa.etag}"'
+    assert cliente.get('/api/casa', headers={'If-None-Match': '"outra"'}).status_code == 200
@@ -0,0 +1,173 @@
+# Histórias do Alter Ego: grafo, portão de tarefa, progresso em bitset e o baralho de frases
+
+import threading
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from database import db
+from models import AlterEgo, Tarefa, TarefaDia, Historia
+import historias as historias_modulo
+from historias import Baralho, marcar_vista, foi_vista, total_vistas
+
+@pytest.fixture
+def alter(historias):
+    alter = AlterEgo(usuario_id=1, historia_atual='inicio', parte_atual=0)
+    db.session.add(alter)
+    db.session.commit()
+    return alter
+
+def portao(historias):
+    """Primeiro nó que espera uma tarefa"""
+    grafo = historias.obter_grafo()
+    for capitulo in grafo.capitulos:
+        for no in grafo._por_capitulo[capitulo]:
+            if no.tarefa_necessaria == 'tarefa':
+                return no
+    pytest.skip('pacote de histórias sem portão de tarefa')
+
+def tarefa_pendente_hoje():
+    tarefa = Tarefa(descricao='Lavar louça', dia_semana='Segunda-feira')
+    db.session.add(tarefa)
+    db.session.flush()
+    ocorrencia = TarefaDia(data=date.today(), tarefa_id=tarefa.id)
+    db.session.add(ocorrencia)
+    db.session.commit()
+    return ocorrencia
+
+# ========== BARALHO ==========
+
+def test_baralho_nao_repete_antes_de_usar_todas():
+    baralho = Baralho(range(10))
+    for _ in range(20):
+        assert sorted(baralho.tirar() for _ in range(10)) == list(range(10))
+
+def test_baralho_nao_repete_na_virada():
+    itens = [object() for _ in range(3)]
+    baralho = Baralho(itens)
+    anterior = None
+    for _ in range(300):
+        carta = baralho.tirar()
+        assert carta is not anterior
+        anterior = carta
+
+def test_baralho_vazio_e_unitario():
+    assert Baralho([]).tirar() is None
+    unico = Baralho(['só'])
+    assert [unico.tirar() for _ in range(3)] == ['só'] * 3
+
+def test_baralho_entre_threads_distribui_por_igual():
+    baralho = Baralho(range(50))
+    tiradas = []
+
+    def tirar():
+        tiradas.extend(baralho.tirar() for _ in range(500))
+
+    threads = [threading.Thread(target=tirar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert set(Counter(tiradas).values()) == {80}  # 4.000 tiradas = 80 voltas completas
+
+# ========== GRAFO E PROGRESSO ==========
+
+def test_grafo_segue_a_ordem_dos_capitulos(historias):
+    grafo = historias.obter_grafo()
+    assert grafo.capitulos[0] == 'inicio'
+    total = Historia.query.count()
+    visitados, posicao = [], ('inicio', 0)
+    while posicao is not None:
+        no = grafo.no(*posicao)
+        visitados.append(no.id)
+        posicao = no.proximo
+    assert len(visitados) == len(set(visitados)) == total
+
+def test_cursor_alem_do_capitulo_vai_para_o_seguinte(historias):
+    grafo = historias.obter_grafo()
+    assert grafo.no_atual('inicio', 999) is grafo.no(grafo.capitulos[1], 0)
+    assert grafo.no_atual(grafo.capitulos[-1], 999) is None
+
+def test_grafo_so_recarrega_com_carimbo_novo(historias):
+    grafo = historias.obter_grafo()
+    assert historias.obter_grafo() is grafo
+    historias.invalidar_grafo()
+    assert historias.obter_grafo() is not grafo
+
+def test_bitset():
+    vistas = None
+    for historia_id in (0, 7, 8, 150):
+        vistas = marcar_vista(vistas, historia_id)
+    assert [foi_vista(vistas, i) for i in (0, 1, 7, 8, 150, 151, 10_000)] == [True, False, True, True, True, False, False]
+    assert total_vistas(vistas) == 4
+    assert len(vistas) == 150 // 8 + 1
+
+def test_fala_avanca_o_cursor_e_marca_vista(historias, alter):
+    primeiro = historias.obter_grafo().no('inicio', 0)
+    resposta = historias.proxima_fala(alter)
+    assert resposta['frase'] == primeiro.frase
+    assert (alter.historia_atual, alter.parte_atual) == primeiro.proximo
+    assert foi_vista(alter.historias_vistas, primeiro.id)
+
+def test_portao_sem_tarefa_pendente_nao_avanca(historias, alter):
+    no = portao(historias)
+    alter.historia_atual, alter.parte_atual = no.capitulo, no.indice
+    resposta = historias.proxima_fala(alter)
+    assert resposta['precisa_tarefa'] is False
+    assert (alter.historia_atual, alter.parte_atual) == (no.capitulo, no.indice)
+    assert not alter.tarefa_desbloqueio
+
+def test_portao_espera_a_tarefa_e_concluir_destrava(historias, alter):
+    no = portao(historias)
+    alter.historia_atual, alter.parte_atual = no.capitulo, no.indice
+    ocorrencia = tarefa_pendente_hoje()
+
+    resposta = historias.proxima_fala(alter)
+    assert resposta['precisa_tarefa'] is True
+    assert alter.tarefa_desbloqueio == ocorrencia.id
+    # Falar de novo não passa do portão
+    historias.proxima_fala(alter)
+    assert (alter.historia_atual, alter.parte_atual) == (no.capitulo, no.indice)
+
+    assert historias.desbloquear(alter, ocorrencia.id + 1) is None  # outra tarefa não destrava
+    seguinte = historias.obter_grafo().no(*no.proximo)
+    assert not seguinte.tarefa_necessaria  # o pacote padrão conta a parte seguinte na hora
+    assert historias.desbloquear(alter, ocorrencia.id) == historias.renderizar(seguinte, 1)
+    assert foi_vista(alter.historias_vistas, no.id) and foi_vista(alter.historias_vistas, seguinte.id)
+    assert alter.tarefa_desbloqueio == 0
+
+def test_historia_inteira_termina_em_completa(historias, alter):
+    tarefa_pendente_hoje()
+    for _ in range(Historia.query.count() * 3):
+        if alter.historia_atual == 'completa':
+            break
+        historias.proxima_fala(alter)
+        if alter.tarefa_desbloqueio:
+            historias.desbloquear(alter, alter.tarefa_desbloqueio)
+    assert alter.historia_atual == 'completa'
+    assert total_vistas(alter.historias_vistas) == Historia.query.count()
+    assert historias.proxima_fala(alter)['emocao'] == 'motivador'
+
+# ========== PACOTE ==========
+
+def test_carregar_pacote_de_novo_nao_grava(historias):
+    total = Historia.query.count()
+    assert historias.carregar_pacote() == 0
+    assert historias.carregar_pacote(forcar=True) == 0  # mesmo conteúdo: nada novo nem alterado
+    assert Historia.query.count() == total
+
+# ========== FRASES ==========
+
+def test_frases_nao_repetem_e_vem_preenchidas(historias):
+    tarefa_pendente_hoje()
+    motivacionais = Historia.query.filter_by(capitulo='motivacional').count()
+    vistas = [historias.get_frase_motivacional() for _ in range(motivacionais)]
+    assert len(set(vistas)) == motivacionais
+    assert all('{tarefa}' not in frase and '{contador}' not in frase for frase in vistas)
+
+def test_modelo_da_frase():
+    modelo = historias_modulo.ModeloFrase('Termine {tarefa} ({contador} hoje)')
+    assert modelo.usa_tarefa and modelo.usa_contador
+    assert modelo.renderizar(tarefa='"Ler"', contador='2') == 'Termine "Ler" (2 hoje)'
+    assert modelo.renderizar() == 'Termine {tarefa} ({contador} hoje)'
@@ -0,0 +1,127 @@
+# /metrics: histogramas por rota, ticks do agendador, soma dos retratos de vários processos e o token
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from flask import Flask
+
+import metricas
+from agendador import Lider, tick_do_lider
+
+LATENCIA = 'dual_you_http_request_duration_seconds'
+
+@pytest.fixture(autouse=True)
+def zerado(monkeypatch):
+    """Cada teste começa sem números (os registros são do processo, não do app)"""
+    monkeypatch.setattr(metricas, '_contadores', metricas.defaultdict(float))
+    monkeypatch.setattr(metricas, '_histogramas', {})
+
+def series(texto):
+    """{'nome{rótulos}': valor} das linhas de amostra da exposição"""
+    valores = {}
+    for linha in texto.splitlines():
+        if linha and not linha.startswith('#'):
+            chave, valor = linha.rsplit(' ', 1)
+            valores[chave] = float(valor)
+    return valores
+
+def do_processo():
+    return series(metricas.exposicao([metricas.retrato()]))
+
+# ========== HISTOGRAMAS E CONTADORES ==========
+
+def test_baldes_acumulam_na_exposicao():
+    for segundos in (0.003, 0.03, 0.04, 20):
+        metricas.observar(LATENCIA, segundos, rota='x')
+    valores = do_processo()
+    baldes = {limite: valores[f'{LATENCIA}_bucket{{rota="x",le="{limite}"}}']
+              for limite in list(metricas.BALDES_LATENCIA) + ['+Inf']}
+    assert baldes[0.005] == 1 and baldes[0.025] == 1 and baldes[0.05] == 3 and baldes[10] == 3
+    assert baldes['+Inf'] == valores[f'{LATENCIA}_count{{rota="x"}}'] == 4
+    assert valores[f'{LATENCIA}_sum{{rota="x"}}'] == pytest.approx(20.073)
+    assert list(baldes.values()) == sorted(baldes.values())
+
+def test_requisicoes_contam_por_rota(cliente):
+    for _ in range(3):
+        cliente.get('/api/alterego')
+    cliente.get('/nao-existe')
+    valores = series(cliente.get('/metrics').get_data(as_text=True))
+    assert valores['dual_you_http_requests_total{metodo="GET",rota="api_alterego",status="200"}'] == 3
+    assert valores['dual_you_http_requests_total{metodo="GET",rota="sem_rota",status="404"}'] == 1
+    assert valores[f'{LATENCIA}_count{{rota="api_alterego"}}'] == 3
+    assert valores[f'{LATENCIA}_bucket{{rota="api_alterego",le="+Inf"}}'] == 3
+
+def test_metrics_responde_texto_do_prometheus(cliente):
+    resposta = cliente.get('/metrics')
+    assert resposta.status_code == 200
+    assert resposta.mimetype == 'text/plain'
+    assert f'# TYPE {LATENCIA} histogram' in resposta.get_data(as_text=True)
+
+# ========== AGENDADOR ==========
+
+def test_tick_conta_duracao_e_erros(tmp_path):
+    def atualizar():
+        pass
+
+    def quebrar():
+        raise RuntimeError('banco fora do ar')
+
+    lider = Lider(str(tmp_path / 'agendador.lock'))
+    app = Flask(__name__)
+    tick_do_lider(lider, atualizar, app)()
+    tick_do_lider(lider, atualizar, app)()
+    with pytest.raises(RuntimeError):
+        tick_do_lider(lider, quebrar, app)()
+
+    valores = do_processo()
+    assert valores['dual_you_agendador_ticks_total{tarefa="atualizar"}'] == 2
+    assert valores['dual_you_agendador_ticks_total{tarefa="quebrar"}'] == 1
+    assert valores['dual_you_agendador_erros_total{tarefa="quebrar"}'] == 1
+    assert 'dual_you_agendador_erros_total{tarefa="atualizar"}' not in valores
+    assert valores['dual_you_agendador_tick_duration_seconds_count{tarefa="atualizar"}'] == 2
+
+# ========== VÁRIOS PROCESSOS ==========
+
+def pid_morto():
+    processo = subprocess.Popen([sys.executable, '-c', 'pass'])
+    processo.wait()
+    return processo.pid
+
+def retrato_de(pasta, pid, requisicoes, em_uso):
+    dados = {'pid': pid,
+             'contadores': [['dual_you_http_requests_total', [['rota', 'index']], requisicoes]],
+             'histogramas': [[LATENCIA, [['rota', 'index']], [requisicoes] + [0] * len(metricas.BALDES_LATENCIA), 0.5]],
+             'medidores': [['dual_you_db_pool_conexoes', [['estado', 'em_uso']], em_uso]]}
+    with open(os.path.join(pasta, f'{pid}-0.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo)
+
+def test_pasta_compartilhada_soma_os_processos(cliente, tmp_path, monkeypatch):
+    pasta = tmp_path / 'metricas'
+    pasta.mkdir()
+    monkeypatch.setattr(metricas, '_pasta', str(pasta))
+    vivo, morto = os.getppid(), pid_morto()
+    retrato_de(pasta, vivo, 4, 2)
+    retrato_de(pasta, morto, 6, 3)
+
+    valores = series(cliente.get('/metrics').get_data(as_text=True))
+    # Contadores e histogramas somam todos, inclusive o processo que já morreu
+    assert valores['dual_you_http_requests_total{rota="index"}'] == 10
+    assert valores[f'{LATENCIA}_count{{rota="index"}}'] == 10
+    assert valores[f'{LATENCIA}_sum{{rota="index"}}'] == 1.0
+    # Medidores só dos vivos: o outro processo e este (que gravou o próprio retrato no scrape)
+    pool = {chave for chave in valores if chave.startswith('dual_you_db_pool_conexoes{estado="em_uso"')}
+    assert f'dual_you_db_pool_conexoes{{estado="em_uso",pid="{vivo}"}}' in pool
+    assert f'dual_you_db_pool_conexoes{{estado="em_uso",pid="{os.getpid()}"}}' in pool
+    assert not any(f'pid="{morto}"' in chave for chave in pool)
+    assert len(list(pasta.glob('*.json'))) == 3
+
+# ========== TOKEN ==========
+
+def test_token_protege_o_metrics(app, cliente):
+    app.config['METRICAS_TOKEN'] = 'segredo'
+    assert cliente.get('/metrics').status_code == 401
+    assert cliente.get('/metrics', headers={'Authorization': 'Bearer outro'}).status_code == 401
+    assert cliente.get('/metrics', headers={'Authorization': 'Bearer segredo'}).status_code == 200
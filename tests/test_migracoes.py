@@ -0,0 +1,106 @@
+# Migrações: um dual_you.db do tempo de um usuário só chega na última versão sem perder dados
+
+import sqlite3
+
+import pytest
+from sqlalchemy import text, inspect
+
+from conftest import app_de_teste
+from database import db
+import historias
+import migracoes
+from models import USUARIO_PADRAO
+
+# Esquema de antes das migrações (models.py da primeira versão)
+ESQUEMA_ANTIGO = """
+CREATE TABLE tarefa (id INTEGER PRIMARY KEY, descricao VARCHAR(200) NOT NULL, dia_semana VARCHAR(20) NOT NULL,
+    concluida_robo BOOLEAN, concluida_usuario BOOLEAN, extra BOOLEAN, criada_em DATETIME);
+CREATE TABLE tarefa_dia (id INTEGER PRIMARY KEY, data DATE NOT NULL, tarefa_id INTEGER NOT NULL REFERENCES tarefa (id),
+    concluida BOOLEAN, concluida_em DATETIME);
+CREATE TABLE conquista (id INTEGER PRIMARY KEY, data DATE NOT NULL, tarefa_id INTEGER NOT NULL REFERENCES tarefa (id),
+    descricao VARCHAR(300), sentimento VARCHAR(200), foto VARCHAR(500), criada_em DATETIME);
+CREATE TABLE momento_gratidao (id INTEGER PRIMARY KEY, data DATE NOT NULL, titulo VARCHAR(200) NOT NULL,
+    descricao TEXT, foto VARCHAR(500), tipo VARCHAR(50), criada_em DATETIME);
+CREATE TABLE config (id INTEGER PRIMARY KEY, chave VARCHAR(50) UNIQUE, valor VARCHAR(200));
+CREATE TABLE alter_ego (id INTEGER PRIMARY KEY, nome VARCHAR(50), nivel INTEGER, ambiente VARCHAR(50),
+    x_relativo INTEGER, y_relativo INTEGER, tarefas_concluidas INTEGER, pontos_ganhos INTEGER, energia INTEGER,
+    humor VARCHAR(20), ultima_acao DATETIME, ultima_frase VARCHAR(300), ultima_interacao DATETIME,
+    estado VARCHAR(50), historia_atual VARCHAR(50), tarefa_desbloqueio INTEGER, historias_contadas TEXT);
+CREATE TABLE historia (id INTEGER PRIMARY KEY, capitulo VARCHAR(50) NOT NULL, parte INTEGER,
+    frase VARCHAR(500) NOT NULL, proxima_parte INTEGER, tarefa_necessaria VARCHAR(200), emocao VARCHAR(50));
+
+INSERT INTO tarefa (id, descricao, dia_semana, extra) VALUES (1, 'Lavar louça', 'Segunda-feira', 0),
+    (2, 'Ler', 'Segunda-feira', 0);
+-- Ocorrências duplicadas do mesmo dia (antes do índice único): fica a concluída
+INSERT INTO tarefa_dia (id, data, tarefa_id, concluida) VALUES (1, '2025-01-06', 1, 0), (2, '2025-01-06', 1, 1),
+    (3, '2025-01-06', 2, 0), (4, '2025-01-06', 2, 0), (5, '2025-01-07', 1, 1);
+INSERT INTO conquista (id, data, tarefa_id, descricao) VALUES (1, '2025-01-06', 1, 'louça feita');
+INSERT INTO momento_gratidao (id, data, titulo, tipo) VALUES (1, '2025-01-06', 'café', 'gratidao');
+INSERT INTO historia (id, capitulo, parte, frase) VALUES (1, 'inicio', 1, 'um'), (2, 'inicio', 2, 'dois'),
+    (3, 'inicio', 3, 'três'), (4, 'inicio', 1, 'um repetido');
+INSERT INTO alter_ego (id, nome, historia_atual, historias_contadas) VALUES (1, 'Alter Ego', 'inicio', '1,2'),
+    (2, 'Sobra', 'inicio', '');
+"""
+
+@pytest.fixture
+def banco_antigo(tmp_path):
+    """App sobre um dual_you.db antigo, já migrado por app_de_teste"""
+    pasta = tmp_path / 'antigo'
+    pasta.mkdir()
+    conexao = sqlite3.connect(pasta / 'dual_you.db')
+    conexao.executescript(ESQUEMA_ANTIGO)
+    conexao.close()
+    with app_de_teste(pasta) as app:
+        yield app
+
+def consultar(sql, **parametros):
+    return db.session.execute(text(sql), parametros).all()
+
+def indices():
+    """{tabela: {índice: colunas}} do banco atual"""
+    inspetor = inspect(db.engine)
+    return {tabela: {indice['name']: tuple(indice['column_names']) for indice in inspetor.get_indexes(tabela)}
+            for tabela in inspetor.get_table_names()}
+
+def test_chega_na_ultima_versao_sem_perder_dados(banco_antigo):
+    with db.engine.connect() as conexao:
+        assert migracoes.versao_atual(conexao) == migracoes.VERSAO_MAIS_RECENTE
+    assert consultar("SELECT id, concluida FROM tarefa_dia ORDER BY id") == [(2, 1), (3, 0), (5, 1)]
+    assert consultar("SELECT id FROM historia ORDER BY id") == [(1,), (2,), (3,)]
+    for tabela in migracoes.TABELAS_DO_USUARIO:
+        assert consultar(f"SELECT DISTINCT usuario_id FROM {tabela}") == [(USUARIO_PADRAO,)]
+    assert consultar("SELECT id FROM alter_ego") == [(1,)]
+    assert consultar("SELECT descricao FROM conquista") == [('louça feita',)]
+    assert consultar("SELECT data, total, concluidas FROM estatistica_dia ORDER BY data") == [
+        ('2025-01-06', 2, 1), ('2025-01-07', 1, 1)]
+
+def test_csv_das_historias_vira_cursor(banco_antigo):
+    (parte, vistas, contadas), = consultar("SELECT parte_atual, historias_vistas, historias_contadas FROM alter_ego")
+    assert parte == 2
+    assert contadas is None
+    assert [historias.foi_vista(vistas, historia_id) for historia_id in (1, 2, 3)] == [True, True, False]
+
+def test_rodar_de_novo_nao_muda_nada(banco_antigo):
+    antes = consultar("SELECT * FROM tarefa_dia ORDER BY id")
+    assert migracoes.migrar() == migracoes.VERSAO_MAIS_RECENTE
+    assert consultar("SELECT * FROM tarefa_dia ORDER BY id") == antes
+
+def test_indices_iguais_aos_de_um_banco_novo(banco_antigo, tmp_path):
+    migrados = indices()
+    with app_de_teste(tmp_path / 'novo'):
+        novos = indices()
+    for tabela, esperados in novos.items():
+        assert migrados[tabela] == esperados, tabela
+
+@pytest.mark.parametrize('consulta, indice', [
+    ("SELECT * FROM tarefa_dia WHERE usuario_id = 1 AND data = '2025-01-06'", 'ix_tarefa_dia_usuario_data_concluida'),
+    ("SELECT 1 FROM tarefa_dia WHERE data = '2025-01-06' AND tarefa_id = 1", 'uq_tarefa_dia_data_tarefa'),
+    ("SELECT * FROM tarefa WHERE usuario_id = 1 AND dia_semana = 'Segunda-feira'", 'ix_tarefa_usuario_dia'),
+    ("SELECT * FROM historia WHERE capitulo = 'inicio' AND parte = 2", 'uq_historia_capitulo_parte'),
+    ("SELECT * FROM conquista WHERE usuario_id = 1 ORDER BY data DESC, id DESC LIMIT 20",
+     'ix_conquista_usuario_data_id'),
+])
+def test_consultas_quentes_usam_indice(banco_antigo, consulta, indice):
+    plano = ' '.join(linha[-1] for linha in consultar(f"EXPLAIN QUERY PLAN {consulta}"))
+    assert f'INDEX {indice}' in plano
+    assert 'TEMP B-TREE' not in plano  # nem ordenação fora do índice
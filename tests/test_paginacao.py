@@ -0,0 +1,87 @@
+# Paginação por cursor: percorre tudo uma vez, em ordem, com o tamanho pedido
+
+import re
+from datetime import date, timedelta
+from urllib.parse import urlparse, parse_qs
+
+from sqlalchemy import insert
+
+from database import db
+from models import Tarefa, Conquista
+import paginacao
+
+INICIO = date(2025, 1, 1)
+
+def semear_conquistas(quantas, por_dia=3):
+    """`quantas` conquistas, `por_dia` em cada data (empates de data desempatam pelo id)"""
+    tarefa = Tarefa(descricao='feito', dia_semana='Segunda-feira')
+    db.session.add(tarefa)
+    db.session.commit()
+    with db.engine.begin() as conexao:
+        conexao.execute(insert(Conquista.__table__), [
+            {'usuario_id': 1, 'tarefa_id': tarefa.id, 'data': INICIO + timedelta(days=i // por_dia),
+             'descricao': f'c{i}'} for i in range(quantas)])
+
+def esperado():
+    return [c.id for c in Conquista.query.order_by(Conquista.data.desc(), Conquista.id.desc())]
+
+def test_cursor_ida_e_volta():
+    class Item:
+        data, id = date(2025, 1, 31), 123
+    assert paginacao.codificar_cursor(Item) == '2025-01-31.123'
+    assert paginacao.decodificar_cursor('2025-01-31.123') == (date(2025, 1, 31), 123)
+    for invalido in (None, '', 'lixo', '2025-13-01.1', '2025-01-01.x'):
+        assert paginacao.decodificar_cursor(invalido) is None
+
+def test_tamanho_pedido_limitado():
+    assert paginacao.tamanho_pedido(None) == paginacao.TAMANHO_PAGINA
+    assert paginacao.tamanho_pedido('abc') == paginacao.TAMANHO_PAGINA
+    assert paginacao.tamanho_pedido('0') == 1
+    assert paginacao.tamanho_pedido('5000') == paginacao.TAMANHO_MAXIMO
+
+def test_paginas_cobrem_tudo_sem_repetir(app):
+    semear_conquistas(100)
+    vistos, cursor, paginas = [], None, 0
+    while True:
+        itens, cursor = paginacao.pagina(Conquista.query, Conquista, cursor, tamanho=7)
+        assert len(itens) <= 7
+        vistos += [c.id for c in itens]
+        paginas += 1
+        if cursor is None:
+            break
+    assert vistos == esperado()
+    assert paginas == 15  # 14 cheias + 2 itens
+
+def test_ultima_pagina_exata_nao_tem_proxima(app):
+    semear_conquistas(10)
+    itens, cursor = paginacao.pagina(Conquista.query, Conquista, tamanho=10)
+    assert len(itens) == 10 and cursor is None
+
+def test_item_novo_nao_desloca_as_proximas_paginas(app):
+    semear_conquistas(20)
+    primeira, cursor = paginacao.pagina(Conquista.query, Conquista, tamanho=5)
+    # Chega uma conquista nova no topo: com OFFSET a página 2 repetiria um item
+    db.session.add(Conquista(tarefa_id=Tarefa.query.first().id, data=INICIO + timedelta(days=100), descricao='nova'))
+    db.session.commit()
+    segunda, _ = paginacao.pagina(Conquista.query, Conquista, cursor, tamanho=5)
+    assert not {c.id for c in primeira} & {c.id for c in segunda}
+    assert [c.id for c in primeira + segunda] == esperado()[1:11]
+
+def test_api_segue_o_link_e_mantem_o_tamanho(app, cliente):
+    semear_conquistas(25)
+    url, ids, tamanhos = '/api/diario?tamanho=10', [], []
+    while url:
+        dados = cliente.get(url).get_json()
+        da_pagina = [int(i) for i in re.findall(r'/deletar_conquista/(\d+)', dados['html'])]
+        tamanhos.append(len(da_pagina))
+        ids += da_pagina
+        url = dados['proxima']
+        if url:
+            assert parse_qs(urlparse(url).query)['tamanho'] == ['10']
+    assert tamanhos == [10, 10, 5]
+    assert ids == esperado()
+
+def test_pagina_html_e_link_seguinte_mantem_o_tamanho(app, cliente):
+    semear_conquistas(25)
+    html = cliente.get('/diario?tamanho=10').get_data(as_text=True)
+    assert 'tamanho=10' in html
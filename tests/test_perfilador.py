@@ -0,0 +1,112 @@
+# Orçamentos de consultas por rota (perfilador.ORCAMENTOS), no modo estrito:
+# rota que passa do orçamento levanta OrcamentoEstourado e o teste falha.
+
+from datetime import date
+
+import pytest
+
+import perfilador
+import tarefas
+from app import alter_do_usuario
+from database import db
+from models import Tarefa, TarefaDia, Conquista, MomentoGratidao, USUARIO_PADRAO
+
+def consultas(resposta):
+    """Número de consultas do cabeçalho Server-Timing"""
+    for valor in resposta.headers.getlist('Server-Timing'):
+        if valor.startswith('db;'):
+            return int(valor.split('desc="')[1].split()[0])
+    raise AssertionError('resposta sem Server-Timing do banco')
+
+def planejar_hoje(quantas=3):
+    dia = tarefas.DIAS_SEMANA[date.today().weekday()]
+    planejadas = [Tarefa(usuario_id=USUARIO_PADRAO, descricao=f'tarefa {i}', dia_semana=dia)
+                  for i in range(quantas)]
+    db.session.add_all(planejadas)
+    db.session.add(Tarefa(usuario_id=USUARIO_PADRAO, descricao='extra', dia_semana='Extras', extra=True))
+    db.session.commit()
+    return planejadas
+
+def no_portao(historias):
+    """Primeiro nó da história que só continua depois de uma tarefa"""
+    grafo = historias.obter_grafo()
+    for capitulo in grafo.capitulos:
+        indice = 0
+        while grafo.no(capitulo, indice) is not None:
+            no = grafo.no(capitulo, indice)
+            if no.tarefa_necessaria == 'tarefa':
+                return no
+            indice += 1
+    pytest.skip('pacote de histórias sem portão de tarefa')
+
+def test_primeira_visita_do_dia_dentro_do_orcamento(cliente):
+    planejar_hoje()
+    resposta = cliente.get('/')
+    assert resposta.status_code == 200
+    assert consultas(resposta) <= perfilador.ORCAMENTOS['index']
+    # Já materializado: só Alter Ego, tarefas e pontos
+    assert consultas(cliente.get('/')) == 3
+
+def test_savepoints_nao_contam(cliente):
+    planejar_hoje()
+    cliente.get('/')
+    ultima = perfilador.relatorio()['ultimas'][0]
+    assert ultima['rota'] == 'index'
+    # 7 comandos de verdade; o SAVEPOINT/RELEASE do resumo do dia fica de fora
+    assert ultima['consultas'] == 7
+
+def test_historia_no_portao_dentro_do_orcamento(cliente, historias):
+    planejar_hoje()
+    cliente.get('/')
+    no = no_portao(historias)
+    alter = alter_do_usuario(USUARIO_PADRAO)
+    alter.historia_atual, alter.parte_atual = no.capitulo, no.indice
+    db.session.commit()
+    historias.invalidar_grafo()  # a primeira fala do processo também carrega o grafo
+
+    resposta = cliente.get('/api/alterego/historia')
+    assert resposta.status_code == 200
+    assert resposta.get_json()['precisa_tarefa'] is True
+    assert consultas(resposta) <= perfilador.ORCAMENTOS['api_alterego_historia']
+
+@pytest.mark.parametrize('caminho', ['/diario', '/api/diario', '/gratidao', '/api/gratidao',
+                                     '/importantes', '/api/importantes'])
+def test_listas_numa_consulta(cliente, caminho):
+    tarefa = planejar_hoje(1)[0]
+    db.session.add_all([Conquista(usuario_id=USUARIO_PADRAO, tarefa_id=tarefa.id, descricao=f'c{i}')
+                        for i in range(40)])
+    db.session.add_all([MomentoGratidao(usuario_id=USUARIO_PADRAO, titulo=f'm{i}', descricao='d',
+                                        tipo='importante' if i % 2 else 'gratidao')
+                        for i in range(40)])
+    db.session.commit()
+    resposta = cliente.get(caminho)
+    assert resposta.status_code == 200
+    assert consultas(resposta) <= perfilador.ORCAMENTOS[caminho.rsplit('/', 1)[-1]]
+
+def test_todas_as_rotas_get_dentro_do_orcamento(app, cliente, historias):
+    """O mesmo passeio do `python perfilador.py`, com dados de um dia normal"""
+    planejar_hoje()
+    for regra in app.url_map.iter_rules():
+        if 'GET' not in regra.methods or regra.arguments or regra.endpoint in perfilador.FORA_DA_CONFERENCIA:
+            continue
+        if regra.endpoint == 'configuracoes':
+            continue  # templates/configuracoes.html não existe no repositório
+        cliente.get(regra.rule)
+    for rota, dados in perfilador.relatorio()['rotas'].items():
+        if dados['orcamento'] is not None:
+            assert dados['maximo'] <= dados['orcamento'], rota
+
+def test_rota_acima_do_orcamento_falha(cliente, monkeypatch):
+    monkeypatch.setitem(perfilador.ORCAMENTOS, 'api_planejamento', 1)
+    with pytest.raises(perfilador.OrcamentoEstourado, match='api_planejamento fez 2 consultas'):
+        cliente.get('/api/planejamento')
+
+def test_n_mais_1_aparece_nas_repetidas(app):
+    with app.test_request_context('/'):
+        from flask import g
+        g.perfil = {'consultas': [], 'inicio': 0}
+        for tarefa_dia_id in range(perfilador.LIMITE_REPETICAO):
+            db.session.get(TarefaDia, tarefa_dia_id + 1)
+        dados = perfilador.resumo(g.perfil)
+    assert dados['consultas'] == perfilador.LIMITE_REPETICAO
+    assert dados['repetidas'][0][0] == perfilador.LIMITE_REPETICAO
@@ -0,0 +1,72 @@
+# Movimento vetorizado dos Alter Egos: determinístico com semente, dentro dos limites, consultas fixas
+
+import numpy as np
+from sqlalchemy import event, insert, select
+
+from database import db
+from models import Usuario, AlterEgo
+import simulacao
+
+def posicoes_iniciais(n):
+    ambientes = np.arange(n) % len(simulacao.AMBIENTES)
+    return ambientes, np.full(n, 50), np.full(n, 50)
+
+def test_mesma_semente_mesmo_movimento():
+    inicio = posicoes_iniciais(1000)
+    primeiro = simulacao.passo(*inicio, simulacao.gerador(7))
+    segundo = simulacao.passo(*inicio, simulacao.gerador(7))
+    outro = simulacao.passo(*inicio, simulacao.gerador(8))
+    for a, b in zip(primeiro, segundo):
+        assert np.array_equal(a, b)
+    assert not np.array_equal(primeiro[1], outro[1])
+
+def test_passos_ficam_nos_limites():
+    ambientes, x, y = posicoes_iniciais(10_000)
+    rng = simulacao.gerador(1)
+    for _ in range(50):
+        anteriores = ambientes
+        ambientes, x, y, falam = simulacao.passo(ambientes, x, y, rng)
+        assert ambientes.min() >= 0 and ambientes.max() < len(simulacao.AMBIENTES)
+        assert x.min() >= simulacao.LIMITES[0] and x.max() <= simulacao.LIMITES[1]
+        assert y.min() >= simulacao.LIMITES[0] and y.max() <= simulacao.LIMITES[1]
+    # Proporções perto das chances (10.000 avatares no último passo)
+    assert abs((ambientes != anteriores).mean() - simulacao.CHANCE_TROCAR_AMBIENTE * 8 / 9) < 0.03
+    assert abs(falam.mean() - simulacao.CHANCE_FALAR) < 0.03
+
+def semear_avatares(n):
+    with db.engine.begin() as conexao:
+        conexao.execute(insert(Usuario.__table__), [{'id': i, 'nome': f'u{i}'} for i in range(2, n + 1)])
+        conexao.execute(insert(AlterEgo.__table__), [{'usuario_id': i} for i in range(1, n + 1)])
+
+def estado():
+    return db.session.execute(select(
+        AlterEgo.usuario_id, AlterEgo.ambiente, AlterEgo.x_relativo, AlterEgo.y_relativo
+    ).order_by(AlterEgo.usuario_id)).all()
+
+def test_tick_grava_o_mesmo_que_o_passo(app, historias):
+    semear_avatares(300)
+    ids, usuarios, ambientes, x, y = simulacao.carregar_posicoes()
+    esperado_ambientes, esperado_x, esperado_y, _ = simulacao.passo(ambientes, x, y, simulacao.gerador(3))
+
+    assert simulacao.executar_tick(simulacao.gerador(3)) == 300
+    db.session.expire_all()
+    assert estado() == [(u, simulacao.AMBIENTES[a], px, py) for u, a, px, py in
+                        zip(usuarios.tolist(), esperado_ambientes.tolist(), esperado_x.tolist(), esperado_y.tolist())]
+
+def test_consultas_nao_crescem_com_os_avatares(app, historias):
+    def consultas_do_tick(total):
+        db.session.execute(AlterEgo.__table__.delete())
+        db.session.execute(Usuario.__table__.delete().where(Usuario.id != 1))
+        db.session.commit()
+        semear_avatares(total)
+        contadas = []
+        contar = lambda *_: contadas.append(1)
+        event.listen(db.engine, 'before_cursor_execute', contar)
+        try:
+            simulacao.executar_tick(simulacao.gerador(5))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', contar)
+        return len(contadas)
+
+    # executemany conta como uma; as frases vão em lotes de LOTE_FRASES usuários
+    assert consultas_do_tick(1000) <= consultas_do_tick(10) + 2 * (1000 // simulacao.LOTE_FRASES)
@@ -0,0 +1,133 @@
+# Materialização do dia: idempotente, segura com vários workers e barata
+
+import multiprocessing
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select, func, event
+
+import carimbos
+import tarefas
+from database import db
+from models import Tarefa, TarefaDia, EstatisticaDia, USUARIO_PADRAO
+
+HOJE = date(2025, 1, 6)  # segunda-feira
+SEGUNDA = tarefas.DIAS_SEMANA[HOJE.weekday()]
+
+def esquecer_materializado():
+    """Como um processo que acabou de subir: nada materializado em memória"""
+    tarefas._materializado.update(dia=None, usuarios={})
+
+@pytest.fixture
+def planejadas(app):
+    """3 tarefas de segunda, 1 extra e 1 de terça (não entra no dia)"""
+    esquecer_materializado()  # as versões aqui são fixas ('1', '2'), não carimbos novos
+    db.session.add_all([Tarefa(descricao=f'segunda {i}', dia_semana=SEGUNDA) for i in range(3)]
+                       + [Tarefa(descricao='extra', dia_semana='Extras', extra=True),
+                          Tarefa(descricao='terça', dia_semana='Terça-feira')])
+    db.session.commit()
+    return 4
+
+def ocorrencias():
+    return db.session.execute(
+        select(TarefaDia.tarefa_id, func.count()).where(TarefaDia.data == HOJE).group_by(TarefaDia.tarefa_id)
+    ).all()
+
+def total_do_dia():
+    return db.session.execute(
+        select(EstatisticaDia.total).where(EstatisticaDia.usuario_id == USUARIO_PADRAO, EstatisticaDia.data == HOJE)
+    ).scalar()
+
+def test_materializa_fixas_do_dia_e_extras(planejadas):
+    assert tarefas.materializar_dia(USUARIO_PADRAO, HOJE, SEGUNDA, '1') == planejadas
+    assert len(ocorrencias()) == planejadas
+    assert total_do_dia() == planejadas
+
+def test_idempotente_no_processo_e_entre_processos(planejadas):
+    tarefas.materializar_dia(USUARIO_PADRAO, HOJE, SEGUNDA, '1')
+    assert tarefas.materializar_dia(USUARIO_PADRAO, HOJE, SEGUNDA, '1') == 0
+    esquecer_materializado()
+    assert tarefas.materializar_dia(USUARIO_PADRAO, HOJE, SEGUNDA, '1') == 0
+    assert all(quantas == 1 for _, quantas in ocorrencias())
+    assert total_do_dia() == planejadas
+
+def test_planejamento_novo_materializa_so_o_que_falta(planejadas):
+    tarefas.materializar_dia(USUARIO_PADRAO, HOJE, SEGUNDA, '1')
+    db.session.add(Tarefa(descricao='nova', dia_semana=SEGUNDA))
+    db.session.commit()
+    assert tarefas.materializar_dia(USUARIO_PADRAO, HOJE, SEGUNDA, '1') == 0  # mesma versão: não olha o banco
+    assert tarefas.materializar_dia(USUARIO_PADRAO, HOJE, SEGUNDA, '2') == 1
+    assert total_do_dia() == planejadas + 1
+
+def materializar_no_filho(barreira, resultados):
+    db.session.remove()
+    db.engine.dispose(close=False)  # conexões do pai não atravessam o fork
+    esquecer_materializado()
+    barreira.wait()
+    resultados.put(tarefas.materializar_dia(USUARIO_PADRAO, HOJE, SEGUNDA, '1'))
+    db.session.remove()
+
+def test_workers_ao_mesmo_tempo_nao_duplicam(planejadas):
+    db.session.remove()
+    contexto = multiprocessing.get_context('fork')
+    workers = 4
+    barreira, resultados = contexto.Barrier(workers), contexto.Queue()
+    processos = [contexto.Process(target=materializar_no_filho, args=(barreira, resultados))
+                 for _ in range(workers)]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(30)
+        assert processo.exitcode == 0
+
+    assert sum(resultados.get(timeout=5) for _ in processos) == planejadas
+    assert len(ocorrencias()) == planejadas
+    assert all(quantas == 1 for _, quantas in ocorrencias())
+    assert total_do_dia() == planejadas
+
+def test_index_nao_consulta_de_novo_o_que_ja_materializou(app, cliente, planejadas):
+    carimbos.marcar(app.config['PLANO_VERSAO_PATH'])
+    cliente.get('/')
+    antes = db.session.execute(select(func.count()).select_from(TarefaDia)).scalar()
+    cliente.get('/')
+    assert db.session.execute(select(func.count()).select_from(TarefaDia)).scalar() == antes
+    assert tarefas._materializado['usuarios'] == {USUARIO_PADRAO: carimbos.ler(app.config['PLANO_VERSAO_PATH'])}
+
+def consultas_de(funcao):
+    """(resultado, SQL executados) de funcao()"""
+    executadas = []
+    anotar = lambda conexao, cursor, sql, *_: executadas.append(sql)
+    event.listen(db.engine, 'before_cursor_execute', anotar)
+    try:
+        return funcao(), executadas
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', anotar)
+
+def test_plano_semanal_agrupa_tarefas_e_estatisticas(planejadas):
+    tarefas.materializar_dia(USUARIO_PADRAO, HOJE, SEGUNDA, '1')
+    TarefaDia.query.filter_by(data=HOJE).limit(2).all()[0].concluida = True
+    db.session.add(TarefaDia(data=HOJE + timedelta(days=1),
+                             tarefa_id=Tarefa.query.filter_by(dia_semana='Terça-feira').one().id))
+    db.session.commit()
+
+    plano = tarefas.plano_semanal(USUARIO_PADRAO, HOJE + timedelta(days=3))
+    assert plano['segunda'] == HOJE
+    assert [t.descricao for t in plano['dias'][SEGUNDA]] == ['segunda 0', 'segunda 1', 'segunda 2']
+    assert [t.descricao for t in plano['extras']] == ['extra']
+    assert plano['estatisticas'][SEGUNDA] == {'data': HOJE, 'total': 4, 'concluidas': 1}
+    assert plano['estatisticas']['Terça-feira']['total'] == 1
+    assert plano['estatisticas']['Domingo'] == {'data': HOJE + timedelta(days=6), 'total': 0, 'concluidas': 0}
+
+def test_plano_semanal_em_duas_consultas_com_qualquer_volume(planejadas):
+    db.session.add_all([Tarefa(descricao=f'mais {i}', dia_semana=tarefas.DIAS_SEMANA[i % 7]) for i in range(200)])
+    db.session.commit()
+    for dia in range(7):
+        tarefas.materializar_dia(USUARIO_PADRAO, HOJE + timedelta(days=dia), tarefas.DIAS_SEMANA[dia], '1')
+    db.session.expire_all()
+    plano, consultas = consultas_de(lambda: tarefas.plano_semanal(USUARIO_PADRAO, HOJE))
+    # Percorrer as tarefas (como o template faz) não dispara carregamento preguiçoso
+    _, depois = consultas_de(lambda: [t.descricao for dia in plano['dias'].values() for t in dia])
+    assert len(consultas) == 2
+    assert depois == []
+    # 200 novas + 4 fixas (3 de segunda, 1 de terça) + a extra em cada um dos 7 dias
+    assert sum(dia['total'] for dia in plano['estatisticas'].values()) == 211
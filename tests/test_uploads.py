@@ -0,0 +1,166 @@
+# Fotos enviadas: gravadas pelo conteúdo, sem cópia repetida, e apagadas só quando ninguém mais usa
+
+import os
+import time
+import hashlib
+import threading
+from io import BytesIO
+
+import pytest
+from sqlalchemy import event
+
+from database import db
+from models import Tarefa, Conquista
+import uploads
+
+def foto(cor=(200, 80, 40), tamanho=(64, 48)):
+    """PNG de verdade (as miniaturas são geradas no pool)"""
+    Image = pytest.importorskip('PIL.Image')
+    saida = BytesIO()
+    Image.new('RGB', tamanho, cor).save(saida, format='PNG')
+    return saida.getvalue()
+
+@pytest.fixture
+def tarefa_id(app):
+    tarefa = Tarefa(descricao='Lavar louça', dia_semana='Segunda-feira')
+    db.session.add(tarefa)
+    db.session.commit()
+    return tarefa.id
+
+def enviar(cliente, tarefa_id, conteudo, nome='foto.png'):
+    resposta = cliente.post(f'/registrar_conquista/{tarefa_id}', content_type='multipart/form-data',
+                            data={'descricao': 'feito', 'foto': (BytesIO(conteudo), nome)})
+    assert resposta.status_code == 302
+    return Conquista.query.order_by(Conquista.id.desc()).first().foto
+
+def arquivos(pasta_static):
+    pasta = pasta_static / 'uploads'
+    return sorted(entrada.name for entrada in os.scandir(pasta) if entrada.is_file())
+
+def test_foto_guardada_pelo_sha256(cliente, pasta_static, tarefa_id):
+    conteudo = foto()
+    guardada = enviar(cliente, tarefa_id, conteudo)
+    assert guardada == f"uploads/{hashlib.sha256(conteudo).hexdigest()}.png"
+    assert (pasta_static / guardada).read_bytes() == conteudo
+
+def test_mesma_foto_duas_vezes_e_um_arquivo_so(cliente, pasta_static, tarefa_id):
+    primeira = enviar(cliente, tarefa_id, foto(), 'a.png')
+    segunda = enviar(cliente, tarefa_id, foto(), 'b.png')
+    outra = enviar(cliente, tarefa_id, foto(cor=(0, 0, 255)), 'c.png')
+    assert primeira == segunda != outra
+    assert arquivos(pasta_static) == sorted([os.path.basename(primeira), os.path.basename(outra)])
+
+def test_nenhum_temporario_fica_para_tras(cliente, pasta_static, tarefa_id):
+    enviar(cliente, tarefa_id, foto())
+    enviar(cliente, tarefa_id, foto())
+    # Extensão recusada: o temporário do upload também some
+    cliente.post(f'/registrar_conquista/{tarefa_id}', content_type='multipart/form-data',
+                 data={'descricao': 'x', 'foto': (BytesIO(b'MZ'), 'programa.exe')})
+    assert not [nome for nome in arquivos(pasta_static) if nome.startswith(uploads.PREFIXO_TEMPORARIO)]
+
+def test_upload_grande_vai_direto_para_o_disco(app, cliente, pasta_static, tarefa_id):
+    conteudo = os.urandom(5 * 1024 * 1024)
+    guardada = enviar(cliente, tarefa_id, conteudo, 'grande.jpg')
+    assert (pasta_static / guardada).stat().st_size == len(conteudo)
+    assert guardada == f"uploads/{hashlib.sha256(conteudo).hexdigest()}.jpg"
+
+def test_mesma_foto_ao_mesmo_tempo(app, pasta_static, tarefa_id):
+    conteudo = os.urandom(2 * 1024 * 1024)
+    barreira, erros = threading.Barrier(6), []
+
+    def enviar_em_paralelo():
+        try:
+            with app.app_context():
+                cliente = app.test_client()
+                barreira.wait()
+                enviar(cliente, tarefa_id, conteudo, 'mesma.jpg')
+        except Exception as e:  # a thread não propaga: o teste confere depois
+            erros.append(e)
+
+    threads = [threading.Thread(target=enviar_em_paralelo) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not erros
+    nome = f"{hashlib.sha256(conteudo).hexdigest()}.jpg"
+    assert arquivos(pasta_static) == [nome]
+    assert (pasta_static / 'uploads' / nome).read_bytes() == conteudo
+
+# ========== LIMPEZA ==========
+
+def envelhecer(caminho, segundos=uploads.CARENCIA + 1):
+    """Recua a data do arquivo: passou da carência"""
+    antes = time.time() - segundos
+    os.utime(caminho, (antes, antes))
+
+def esperar_faxineiro():
+    uploads._faxineiro.submit(lambda: None).result(timeout=10)
+
+def test_foto_compartilhada_so_some_com_o_ultimo_dono(cliente, pasta_static, tarefa_id):
+    guardada = enviar(cliente, tarefa_id, foto())
+    enviar(cliente, tarefa_id, foto())
+    primeira, segunda = [c.id for c in Conquista.query.order_by(Conquista.id)]
+    envelhecer(pasta_static / guardada)
+
+    cliente.post(f'/deletar_conquista/{primeira}')
+    esperar_faxineiro()
+    assert (pasta_static / guardada).exists()
+
+    cliente.post(f'/deletar_conquista/{segunda}')
+    esperar_faxineiro()
+    assert not (pasta_static / guardada).exists()
+
+def test_foto_reenviada_agora_ha_pouco_nao_e_apagada(cliente, pasta_static, tarefa_id):
+    guardada = enviar(cliente, tarefa_id, foto())
+    cliente.post(f'/deletar_conquista/{Conquista.query.one().id}')
+    esperar_faxineiro()
+    assert (pasta_static / guardada).exists()  # dentro da carência: a varredura decide depois
+
+def test_apagar_todas_e_um_delete_so_e_limpa_os_arquivos(cliente, pasta_static, tarefa_id):
+    guardadas = {enviar(cliente, tarefa_id, foto(cor=(i, 0, 0))) for i in range(5)}
+    for guardada in guardadas:
+        envelhecer(pasta_static / guardada)
+    executadas = []
+    anotar = lambda conexao, cursor, sql, *_: executadas.append(sql)
+    event.listen(db.engine, 'before_cursor_execute', anotar)
+    try:
+        cliente.post('/deletar_todas_conquistas')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', anotar)
+    esperar_faxineiro()
+    assert len([sql for sql in executadas if sql.startswith('DELETE FROM conquista')]) == 1
+    assert Conquista.query.count() == 0
+    assert not any((pasta_static / guardada).exists() for guardada in guardadas)
+
+def test_varredura_reconcilia_a_pasta_com_o_banco(app, cliente, pasta_static, tarefa_id):
+    em_uso = enviar(cliente, tarefa_id, foto())
+    pasta = pasta_static / 'uploads'
+    orfa, recente = pasta / 'orfa.jpg', pasta / 'recente.jpg'
+    orfa.write_bytes(b'sem dono')
+    recente.write_bytes(b'chegando')
+    miniaturas = pasta / uploads.PASTA_MINIATURAS
+    miniaturas.mkdir(exist_ok=True)
+    (miniaturas / 'orfa_320.webp').write_bytes(b'x')
+    (miniaturas / 'sumiu_320.webp').write_bytes(b'x')
+    abandonado = pasta / f'{uploads.PREFIXO_TEMPORARIO}abc'
+    abandonado.write_bytes(b'pela metade')
+    for caminho in (pasta_static / em_uso, orfa):
+        envelhecer(caminho)
+    envelhecer(abandonado, uploads.TEMPORARIO_ABANDONADO + 1)
+
+    apagados = uploads.varrer_orfas()
+
+    assert apagados['fotos'] == 1 and apagados['temporarios'] == 1
+    assert not orfa.exists() and not abandonado.exists()
+    assert (pasta_static / em_uso).exists() and recente.exists()
+    assert not (miniaturas / 'sumiu_320.webp').exists() and not (miniaturas / 'orfa_320.webp').exists()
+
+def test_pasta_de_uploads_nao_depende_do_cwd(tmp_path, monkeypatch):
+    from flask import Flask
+    import fabrica
+    monkeypatch.chdir(tmp_path)
+    app = Flask('app', root_path=fabrica.RAIZ)
+    fabrica.configurar(app)
+    assert app.config['UPLOAD_FOLDER'] == os.path.join(fabrica.RAIZ, 'static', 'uploads')
+    assert app.config['UPLOAD_FOLDER'] == os.path.join(app.static_folder, 'uploads')
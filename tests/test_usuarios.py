@@ -0,0 +1,66 @@
+# Vários usuários na mesma implantação: dados e respostas em cache separados
+
+import pytest
+from sqlalchemy import event
+
+import usuarios
+from database import db
+from models import Tarefa, Usuario
+
+@pytest.fixture
+def contas(app):
+    """ana e bia cadastradas, com MULTIUSUARIO ligado"""
+    app.config['MULTIUSUARIO'] = True
+    ana = usuarios.cadastrar('ana', 'senha-ana')
+    bia = usuarios.cadastrar('bia', 'senha-bia')
+    return ana, bia
+
+def logar(app, nome):
+    cliente = app.test_client()
+    resposta = cliente.post('/entrar', data={'nome': nome, 'senha': f'senha-{nome}'})
+    assert resposta.status_code == 302
+    return cliente
+
+@pytest.mark.parametrize('caminho', ['/api/alterego', '/api/planejamento'])
+def test_etag_de_um_usuario_nao_vale_para_outro(app, contas, caminho):
+    ana, bia = logar(app, 'ana'), logar(app, 'bia')
+    da_ana = ana.get(caminho)
+    assert da_ana.status_code == 200
+    assert da_ana.headers['Cache-Control'] == 'private, no-cache'
+    etag = da_ana.headers['ETag']
+
+    assert ana.get(caminho, headers={'If-None-Match': etag}).status_code == 304
+    da_bia = bia.get(caminho, headers={'If-None-Match': etag})
+    assert da_bia.status_code == 200
+    assert da_bia.headers['ETag'] != etag
+
+def test_cada_usuario_ve_so_o_proprio_planejamento(app, contas):
+    ana_id = contas[0].id
+    db.session.add(Tarefa(usuario_id=ana_id, descricao='só da ana', dia_semana='Segunda-feira'))
+    db.session.commit()
+    ana, bia = logar(app, 'ana'), logar(app, 'bia')
+
+    def descricoes(cliente):
+        dados = cliente.get('/api/planejamento').get_json()
+        return [tarefa['descricao'] for dia in dados['dias'] for tarefa in dia['tarefas']]
+
+    assert descricoes(ana) == ['só da ana']
+    assert descricoes(bia) == []
+
+def test_api_sem_login_responde_401(app, contas):
+    resposta = app.test_client().get('/api/alterego')
+    assert resposta.status_code == 401
+
+def test_cadastro_simultaneo_com_o_mesmo_nome_nao_da_500(app):
+    """Outro worker grava 'ana' entre a consulta e o commit: o unique do banco decide"""
+    app.config['MULTIUSUARIO'] = True
+
+    def outro_worker(sessao, *_):
+        with db.engine.begin() as conexao:
+            conexao.execute(Usuario.__table__.insert(), {'nome': 'ana'})
+
+    event.listen(db.session(), 'before_flush', outro_worker, once=True)
+    resposta = app.test_client().post('/cadastrar', data={'nome': 'ana', 'senha': 'senha-ana'})
+    assert resposta.status_code == 200
+    assert 'Esse nome já está em uso' in resposta.get_data(as_text=True)
+    assert Usuario.query.filter_by(nome='ana').count() == 1
@@ -0,0 +1,309 @@
+# uploads.py
+# Fotos do diário e da gratidão.
+#
+# Recebimento: o corpo do upload é gravado em blocos direto num temporário
+# da pasta de uploads, calculando o SHA-256 enquanto chega (RequisicaoComUpload).
+# A foto fica guardada pelo conteúdo, uploads/<sha256>.<ext>: dois envios no
+# mesmo segundo nunca se sobrescrevem e a mesma foto enviada de novo não
+# ocupa espaço outra vez.
+#
+# As miniaturas (AVIF/WebP em algumas larguras) são geradas num pool de
+# threads, fora da requisição, só quando a foto é nova.
+#
+# Limpeza: apagar conquistas/momentos só coloca as fotos na fila do faxineiro
+# (descartar_fotos), que apaga em segundo plano as que ninguém mais usa.
+# A varredura (varrer_orfas, agendada pelo líder) reconcilia a pasta com o
+# banco: fotos sem dono, miniaturas sem original e temporários abandonados.
+# As páginas usam as miniaturas com srcset + lazy loading e caem para a
+# original enquanto elas não existem (ou se o Pillow não estiver instalado).
+#
+# Para gerar miniaturas das fotos antigas: python uploads.py
+# Para varrer os arquivos órfãos agora:     python uploads.py varrer
+
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+from io import BytesIO
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from flask import Request, current_app, url_for
+from database import db
+import metricas
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # sem Pillow: sem miniaturas, as páginas usam a original
+    Image = None
+
+# Larguras geradas (px): cartões de 150-250px de altura, telas 1x e 2x
+LARGURAS = (320, 640)
+PASTA_MINIATURAS = 'miniaturas'
+QUALIDADE = {'avif': 50, 'webp': 75}
+
+TAMANHO_BLOCO = 1024 * 1024  # bytes copiados por vez quando o upload não veio direto para o disco
+PREFIXO_TEMPORARIO = '.recebendo_'
+
+CARENCIA = 60                  # segundos: foto gravada (ou reaproveitada) há menos tempo não é apagada
+TEMPORARIO_ABANDONADO = 3600   # segundos: temporário de upload mais velho que isso é lixo
+INTERVALO_VARREDURA = 6 * 3600 # segundos entre varreduras de órfãos (agendador)
+LOTE_CONSULTA = 500            # fotos por IN (...) ao conferir quais ainda estão em uso
+
+_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('DUAL_YOU_MINIATURAS_THREADS', 2)),
+                               thread_name_prefix='miniaturas')
+
+# ========== RECEBIMENTO ==========
+
+class ArquivoRecebido:
+    """Temporário na pasta de uploads que calcula o SHA-256 do que é escrito nele"""
+
+    def __init__(self, pasta):
+        descritor, self.caminho = tempfile.mkstemp(prefix=PREFIXO_TEMPORARIO, dir=pasta)
+        self.arquivo = os.fdopen(descritor, 'w+b')
+        self.resumo = hashlib.sha256()
+
+    def write(self, dados):
+        self.resumo.update(dados)
+        return self.arquivo.write(dados)
+
+    def __getattr__(self, nome):
+        # read, seek, tell, flush... vão direto para o arquivo
+        return getattr(self.arquivo, nome)
+
+    def close(self):
+        """Fecha e apaga o temporário se ele não virou uma foto (chamado no fim da requisição)"""
+        self.arquivo.close()
+        try:
+            os.remove(self.caminho)
+        except FileNotFoundError:
+            pass
+
+class RequisicaoComUpload(Request):
+    """Request do Flask que grava os arquivos enviados direto em ArquivoRecebido"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not filename:  # campo de arquivo vazio no formulário
+            return BytesIO()
+        return ArquivoRecebido(current_app.config['UPLOAD_FOLDER'])
+
+def guardar_foto(arquivo, extensao):
+    """Guarda o arquivo enviado pelo conteúdo e devolve 'uploads/<sha256>.<ext>'"""
+    pasta = current_app.config['UPLOAD_FOLDER']
+    recebido = arquivo.stream
+    if not isinstance(recebido, ArquivoRecebido):
+        # Veio de outro lugar (ex.: request sem RequisicaoComUpload): copia em blocos
+        recebido = ArquivoRecebido(pasta)
+        shutil.copyfileobj(arquivo.stream, recebido, TAMANHO_BLOCO)
+    recebido.flush()
+    metricas.contar('dual_you_upload_bytes_total', os.fstat(recebido.fileno()).st_size)
+    nome = f"{recebido.resumo.hexdigest()}.{extensao}"
+    destino = os.path.join(pasta, nome)
+    foto = f"uploads/{nome}"
+    if os.path.exists(destino):
+        metricas.contar('dual_you_uploads_total', resultado='repetida')
+        recebido.close()  # já temos essa foto: o temporário é descartado
+        # Renova a data: o faxineiro não apaga uma foto que acabou de ganhar dono
+        os.utime(destino)
+        return foto
+    recebido.arquivo.close()
+    # Troca atômica: quem chegar junto com a mesma foto grava o mesmo conteúdo
+    os.replace(recebido.caminho, destino)
+    metricas.contar('dual_you_uploads_total', resultado='nova')
+    agendar_miniaturas(foto)
+    return foto
+
+# ========== MINIATURAS ==========
+
+@lru_cache(maxsize=None)
+def formatos_suportados():
+    """Formatos de miniatura que este Pillow sabe gravar (o melhor primeiro)"""
+    if Image is None:
+        return ()
+    return tuple(formato for formato in ('avif', 'webp') if features.check(formato))
+
+def caminho_miniatura(foto, largura, formato):
+    """'uploads/x.jpg' -> 'uploads/miniaturas/x_320.webp' (relativo à pasta static)"""
+    pasta, nome = os.path.split(foto)
+    base = os.path.splitext(nome)[0]
+    return f"{pasta}/{PASTA_MINIATURAS}/{base}_{largura}.{formato}"
+
+def gerar_miniaturas(pasta_static, foto):
+    """Gera as miniaturas de uma foto (roda no pool, fora da requisição)"""
+    original = os.path.join(pasta_static, foto)
+    with Image.open(original) as imagem:
+        imagem = ImageOps.exif_transpose(imagem)
+        if imagem.mode not in ('RGB', 'RGBA'):
+            transparente = imagem.mode in ('LA', 'PA') or 'transparency' in imagem.info
+            imagem = imagem.convert('RGBA' if transparente else 'RGB')
+
+        for largura in LARGURAS:
+            # Não amplia: a menor largura sempre existe, as maiores só se a foto for maior
+            if largura > imagem.width and largura != LARGURAS[0]:
+                continue
+            altura = max(1, round(imagem.height * largura / imagem.width))
+            reduzida = imagem.resize((largura, altura), Image.LANCZOS) if largura < imagem.width else imagem
+            for formato in formatos_suportados():
+                destino = os.path.join(pasta_static, caminho_miniatura(foto, largura, formato))
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                # Grava num temporário e troca: a página nunca vê arquivo pela metade
+                temporario = f"{destino}.tmp"
+                reduzida.save(temporario, format=formato.upper(), quality=QUALIDADE[formato])
+                os.replace(temporario, destino)
+
+def agendar_miniaturas(foto):
+    """Coloca a geração das miniaturas na fila (não bloqueia a requisição)"""
+    if not formatos_suportados():
+        return None
+    pasta_static = current_app.static_folder
+
+    def tarefa():
+        try:
+            gerar_miniaturas(pasta_static, foto)
+        except Exception as e:
+            print(f"Erro ao gerar miniaturas de {foto}: {e}")
+
+    return _executor.submit(tarefa)
+
+def fontes_responsivas(foto):
+    """[(formato, srcset)] das miniaturas que já existem para a foto (usado nos templates)"""
+    fontes = []
+    for formato in formatos_suportados():
+        srcset = []
+        for largura in LARGURAS:
+            miniatura = caminho_miniatura(foto, largura, formato)
+            if os.path.exists(os.path.join(current_app.static_folder, miniatura)):
+                srcset.append(f"{url_for('static', filename=miniatura)} {largura}w")
+        if srcset:
+            fontes.append((formato, ', '.join(srcset)))
+    return fontes
+
+# ========== LIMPEZA ==========
+
+_faxineiro = ThreadPoolExecutor(max_workers=1, thread_name_prefix='faxineiro')
+
+def fotos_em_uso(fotos):
+    """Quais destas fotos alguma conquista ou momento (de qualquer usuário) ainda usa"""
+    from models import Conquista, MomentoGratidao
+    fotos = list(fotos)
+    em_uso = set()
+    for modelo in (Conquista, MomentoGratidao):
+        for inicio in range(0, len(fotos), LOTE_CONSULTA):
+            lote = fotos[inicio:inicio + LOTE_CONSULTA]
+            em_uso.update(db.session.scalars(db.select(modelo.foto).where(modelo.foto.in_(lote)).distinct()))
+    return em_uso
+
+def caminho_original(foto):
+    return os.path.join(current_app.static_folder, foto)
+
+def _apagar_arquivos(foto):
+    """Apaga a foto original e as miniaturas dela"""
+    caminhos = [caminho_original(foto)]
+    for formato in ('avif', 'webp'):
+        for largura in LARGURAS:
+            caminhos.append(os.path.join(current_app.static_folder, caminho_miniatura(foto, largura, formato)))
+    for caminho in caminhos:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+def _recente(caminho, agora):
+    try:
+        return agora - os.stat(caminho).st_mtime < CARENCIA
+    except FileNotFoundError:
+        return False
+
+def remover_fotos(fotos):
+    """Apaga do disco as fotos que ninguém mais usa (roda no faxineiro); devolve quantas"""
+    fotos = {foto for foto in fotos if foto}
+    livres = fotos - fotos_em_uso(fotos) if fotos else set()
+    agora = time.time()
+    removidas = 0
+    for foto in livres:
+        # Reaproveitada por um upload agora há pouco: a varredura decide depois
+        if _recente(caminho_original(foto), agora):
+            continue
+        _apagar_arquivos(foto)
+        removidas += 1
+    return removidas
+
+def descartar_fotos(fotos):
+    """Coloca as fotos na fila do faxineiro (chamar depois do commit que apagou as linhas)"""
+    fotos = {foto for foto in fotos if foto}
+    if not fotos:
+        return None
+    app = current_app._get_current_object()
+
+    def tarefa():
+        with app.app_context():
+            try:
+                remover_fotos(fotos)
+            except Exception as e:
+                print(f"Erro ao apagar fotos: {e}")
+
+    return _faxineiro.submit(tarefa)
+
+def varrer_orfas():
+    """Reconcilia a pasta de uploads com o banco; devolve {'fotos', 'miniaturas', 'temporarios'} apagados"""
+    from models import Conquista, MomentoGratidao
+    em_uso = set()
+    for modelo in (Conquista, MomentoGratidao):
+        em_uso.update(db.session.scalars(db.select(modelo.foto).where(modelo.foto.isnot(None)).distinct()))
+
+    pasta = current_app.config['UPLOAD_FOLDER']
+    agora = time.time()
+    apagados = {'fotos': 0, 'miniaturas': 0, 'temporarios': 0}
+    originais = set()
+    for entrada in os.scandir(pasta):
+        if not entrada.is_file():
+            continue
+        idade = agora - entrada.stat().st_mtime
+        if entrada.name.startswith(PREFIXO_TEMPORARIO):
+            if idade > TEMPORARIO_ABANDONADO:
+                os.remove(entrada.path)
+                apagados['temporarios'] += 1
+            continue
+        if entrada.name.startswith('.'):
+            continue
+        foto = f"uploads/{entrada.name}"
+        if foto in em_uso or idade < CARENCIA:
+            originais.add(os.path.splitext(entrada.name)[0])
+            continue
+        _apagar_arquivos(foto)
+        apagados['fotos'] += 1
+
+    pasta_miniaturas = os.path.join(pasta, PASTA_MINIATURAS)
+    if os.path.isdir(pasta_miniaturas):
+        for entrada in os.scandir(pasta_miniaturas):
+            # x_320.webp -> x
+            if entrada.is_file() and entrada.name.rsplit('_', 1)[0] not in originais:
+                os.remove(entrada.path)
+                apagados['miniaturas'] += 1
+    return apagados
+
+if __name__ == '__main__':
+    # Sem argumentos: gera as miniaturas que faltam; 'varrer': apaga os arquivos órfãos
+    import sys
+    from fabrica import contexto_cli
+
+    if sys.argv[1:] == ['varrer']:
+        with contexto_cli():
+            apagados = varrer_orfas()
+        print(f"🧹 Apagados: {apagados['fotos']} fotos sem dono, {apagados['miniaturas']} miniaturas, "
+              f"{apagados['temporarios']} temporários")
+    elif not formatos_suportados():
+        print("⚠️  Pillow não instalado (ou sem WebP/AVIF): nada a fazer")
+    else:
+        from fabrica import RAIZ
+        pasta_static = os.path.join(RAIZ, 'static')
+        pasta_uploads = os.path.join(pasta_static, 'uploads')
+        fotos = [f"uploads/{nome}" for nome in sorted(os.listdir(pasta_uploads))
+                 if os.path.isfile(os.path.join(pasta_uploads, nome))
+                 and not nome.startswith(PREFIXO_TEMPORARIO)]
+        for foto in fotos:
+            menor = caminho_miniatura(foto, LARGURAS[0], formatos_suportados()[-1])
+            if not os.path.exists(os.path.join(pasta_static, menor)):
+                gerar_miniaturas(pasta_static, foto)
+                print(f"🖼️  {foto}")
+        print(f"✅ Miniaturas prontas para {len(fotos)} fotos")
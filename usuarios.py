@@ -0,0 +1,90 @@
+# usuarios.py
+# Contas de usuário: uma implantação atende várias pessoas.
+#
+# Com MULTIUSUARIO desligado (padrão) tudo pertence ao usuário padrão e não
+# existe login, como sempre foi. Ligado (DUAL_YOU_MULTIUSUARIO=1), cada
+# requisição roda em nome do usuário da sessão e as páginas pedem login.
+#
+# Para dar senha a um usuário (ex.: o usuário padrão "eu", dono dos dados antigos):
+#   python usuarios.py eu minha-senha
+
+from flask import g, session, request, redirect, url_for, jsonify
+from sqlalchemy.exc import IntegrityError
+from database import db
+from models import Usuario, AlterEgo, USUARIO_PADRAO
+
+# Rotas que não precisam de login
+ROTAS_LIVRES = {'entrar', 'cadastrar', 'static', 'background_image', 'alter_image', 'api_casa',
+                'service_worker', 'pacote', 'metricas'}
+
+def usuario_id():
+    """ID do usuário desta requisição"""
+    return g.usuario_id
+
+def init_app(app):
+    """Identifica o usuário de cada requisição (before_request)"""
+    @app.before_request
+    def carregar_usuario():
+        if not app.config['MULTIUSUARIO']:
+            g.usuario_id = USUARIO_PADRAO
+            return None
+        g.usuario_id = session.get('usuario_id')
+        if g.usuario_id is None and request.endpoint not in ROTAS_LIVRES:
+            if request.path.startswith('/api/'):
+                return jsonify({'erro': 'login necessário'}), 401
+            return redirect(url_for('entrar', proximo=request.full_path))
+        return None
+
+    @app.context_processor
+    def usuario_nos_templates():
+        return {'multiusuario': app.config['MULTIUSUARIO'],
+                'logado': g.get('usuario_id') is not None}
+
+def entrar(usuario):
+    session.clear()
+    session['usuario_id'] = usuario.id
+    session.permanent = True
+
+def sair():
+    session.clear()
+
+def autenticar(nome, senha):
+    """Usuário com esse nome e senha (None se não bater)"""
+    usuario = Usuario.query.filter_by(nome=nome).first()
+    if usuario and usuario.confere_senha(senha):
+        return usuario
+    return None
+
+def cadastrar(nome, senha):
+    """Cria o usuário e o Alter Ego dele (None se o nome já existe)"""
+    if Usuario.query.filter_by(nome=nome).first():
+        return None
+    usuario = Usuario(nome=nome)
+    usuario.definir_senha(senha)
+    try:
+        db.session.add(usuario)
+        db.session.flush()
+        db.session.add(AlterEgo(usuario_id=usuario.id))
+        db.session.commit()
+    except IntegrityError:
+        # Outro cadastro com o mesmo nome passou pela consulta ao mesmo tempo (nome é unique)
+        db.session.rollback()
+        return None
+    return usuario
+
+if __name__ == '__main__':
+    import sys
+    from fabrica import contexto_cli
+
+    if len(sys.argv) != 3:
+        print("Uso: python usuarios.py <nome> <senha>")
+        sys.exit(1)
+    nome, senha = sys.argv[1], sys.argv[2]
+    with contexto_cli():
+        usuario = Usuario.query.filter_by(nome=nome).first()
+        if usuario:
+            usuario.definir_senha(senha)
+            db.session.commit()
+        else:
+            usuario = cadastrar(nome, senha)
+        print(f"🔑 Senha definida para {nome} (usuário {usuario.id})")